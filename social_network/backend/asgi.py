@@ -1,7 +1,15 @@
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+# AI endpoints await the AI backend on the server's event loop
+os.environ.setdefault("AI_ASYNC_VIEWS", "True")
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+from foodgram.services.ingredient_index import ingredient_index  # noqa: E402
+from foodgram.streaming import StreamingASGIHandler  # noqa: E402
+
+application = StreamingASGIHandler()
+ingredient_index.warm()
@@ -0,0 +1,79 @@
+from typing import Any, Optional
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """
+    Cache backend that keeps a short-lived in-process copy (L1) in front
+    of a cache shared by all workers (L2).
+
+    Reads hit L1 first and fall back to L2, writes go to both. Counters
+    (incr/decr) live only in L2, so invalidation reaches every worker
+    within OPTIONS['L1_TIMEOUT'] seconds.
+    """
+
+    def __init__(self, location: str, params: dict) -> None:
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l1_alias = options.get('L1', 'local')
+        self._l2_alias = options.get('L2', 'shared')
+        self.l1_timeout = int(options.get('L1_TIMEOUT', 5))
+
+    @property
+    def l1(self) -> BaseCache:
+        return caches[self._l1_alias]
+
+    @property
+    def l2(self) -> BaseCache:
+        return caches[self._l2_alias]
+
+    def _get_l1_timeout(self, timeout: Any) -> Optional[int]:
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def add(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None) -> bool:
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self.l1.set(key, value, self._get_l1_timeout(timeout), version=version)
+        return added
+
+    def get(self, key: str, default: Any = None, version: Optional[int] = None) -> Any:
+        value = self.l1.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            value = self.l2.get(key, _MISSING, version=version)
+            if value is _MISSING:
+                return default
+            self.l1.set(key, value, self.l1_timeout, version=version)
+        return value
+
+    def set(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None) -> None:
+        self.l2.set(key, value, timeout, version=version)
+        self.l1.set(key, value, self._get_l1_timeout(timeout), version=version)
+
+    def touch(self, key: str, timeout: Any = DEFAULT_TIMEOUT, version: Optional[int] = None) -> bool:
+        self.l1.delete(key, version=version)
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key: str, version: Optional[int] = None) -> bool:
+        self.l1.delete(key, version=version)
+        return self.l2.delete(key, version=version)
+
+    def incr(self, key: str, delta: int = 1, version: Optional[int] = None) -> int:
+        value = self.l2.incr(key, delta, version=version)
+        self.l1.delete(key, version=version)
+        return value
+
+    def has_key(self, key: str, version: Optional[int] = None) -> bool:
+        return self.l1.has_key(key, version=version) or self.l2.has_key(key, version=version)
+
+    def clear(self) -> None:
+        self.l1.clear()
+        self.l2.clear()
+
+    def close(self, **kwargs: Any) -> None:
+        self.l2.close(**kwargs)
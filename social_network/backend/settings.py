@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -95,8 +96,28 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 AI_API_URL = os.getenv('AI_API_URL')
 AI_API_KEY = os.getenv('AI_API_KEY')
+AI_TIMEOUT = float(os.getenv('AI_TIMEOUT', 60))
+AI_CONNECT_TIMEOUT = float(os.getenv('AI_CONNECT_TIMEOUT', 5))
+AI_ENDPOINT_TIMEOUTS = {
+    '/api/v1/recipes/ask': float(os.getenv('AI_ASK_TIMEOUT', 30)),
+    '/api/v1/recipes/generate-by-text': float(os.getenv('AI_GENERATE_TIMEOUT', 90)),
+    '/generate-image': float(os.getenv('AI_IMAGE_TIMEOUT', 150)),
+    '/api/v1/embeddings': float(os.getenv('AI_EMBED_TIMEOUT', 60)),
+}
+AI_MAX_CONNECTIONS = int(os.getenv('AI_MAX_CONNECTIONS', 50))
+# After AI_CIRCUIT_FAILURES consecutive timeouts/5xx AI calls fail fast
+# for AI_CIRCUIT_RESET_TIMEOUT seconds before a trial call is let through
+AI_CIRCUIT_FAILURES = int(os.getenv('AI_CIRCUIT_FAILURES', 5))
+AI_CIRCUIT_RESET_TIMEOUT = float(os.getenv('AI_CIRCUIT_RESET_TIMEOUT', 30))
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 
+# AI endpoints are async views when served by the ASGI entry point
+# (backend/asgi.py turns AI_ASYNC_VIEWS on unless it is set). Under WSGI,
+# runserver included, AI calls run on one background event loop per
+# process, at most AI_SYNC_MAX_CONCURRENCY at a time.
+AI_ASYNC_VIEWS = os.getenv('AI_ASYNC_VIEWS', 'False') == 'True'
+AI_SYNC_MAX_CONCURRENCY = int(os.getenv('AI_SYNC_MAX_CONCURRENCY', 32))
+
 DJOSER = {
     "LOGIN_FIELD": "email",
 }
@@ -108,11 +129,87 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
+# CACHE_BACKEND=locmem keeps a separate cache per worker. Any other value
+# puts a shared cache (L2) behind a short-lived per-worker LocMem copy (L1).
+SHARED_CACHE_BACKENDS = {
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'redis': 'django_redis.cache.RedisCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+CACHE_LOCATION = os.getenv('CACHE_LOCATION', '')
+CACHE_L1_TTL = int(os.getenv('CACHE_L1_TTL', 5))
+if CACHE_BACKEND != 'locmem' and CACHE_BACKEND not in SHARED_CACHE_BACKENDS:
+    raise ImproperlyConfigured(
+        f"CACHE_BACKEND={CACHE_BACKEND!r}: expected locmem or one of {', '.join(SHARED_CACHE_BACKENDS)}")
+
+LOCAL_CACHE = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'unique-snowflake',
 }
 
+if CACHE_BACKEND == 'locmem':
+    CACHES = {'default': LOCAL_CACHE}
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'backend.cache.TwoTierCache',
+            'OPTIONS': {'L1': 'local', 'L2': 'shared', 'L1_TIMEOUT': CACHE_L1_TTL},
+        },
+        'local': LOCAL_CACHE,
+        'shared': {
+            'BACKEND': SHARED_CACHE_BACKENDS[CACHE_BACKEND],
+            'LOCATION': CACHE_LOCATION,
+        },
+    }
+
 CACHE_TTL = int(os.getenv('CACHE_TTL', 900))
+RECIPE_CACHE_TTL = int(os.getenv('RECIPE_CACHE_TTL', 86400))
+INGREDIENT_AUTOCOMPLETE_MAX_AGE = int(os.getenv('INGREDIENT_AUTOCOMPLETE_MAX_AGE', 300))
+INGREDIENT_AUTOCOMPLETE_MAX_LIMIT = 50
+# How often, in seconds, a worker checks whether another one changed the
+# ingredient catalog its in-memory autocomplete index was built from
+INGREDIENT_INDEX_CHECK_INTERVAL = float(os.getenv('INGREDIENT_INDEX_CHECK_INTERVAL', 5))
+COMMENTS_MAX_LIMIT = 200
+
+VIEW_COUNT_FLUSH_INTERVAL = int(os.getenv('VIEW_COUNT_FLUSH_INTERVAL', 30))
+VIEW_COUNT_MAX_PENDING = int(os.getenv('VIEW_COUNT_MAX_PENDING', 500))
+
+# Authors with at least FEED_CELEBRITY_FOLLOWERS followers are merged into
+# subscription feeds at read time instead of being fanned out on publish.
+# The refresh_feed_celebrities command applies the threshold every
+# FEED_CELEBRITY_INTERVAL seconds.
+FEED_CELEBRITY_FOLLOWERS = int(os.getenv('FEED_CELEBRITY_FOLLOWERS', 1000))
+FEED_CELEBRITY_CACHE_TTL = int(os.getenv('FEED_CELEBRITY_CACHE_TTL', 300))
+FEED_CELEBRITY_INTERVAL = int(os.getenv('FEED_CELEBRITY_INTERVAL', 60))
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', 100))
+
+# Recipe vectors for the AI backend's /recipes/ask, encoded by the AI
+# backend's /api/v1/embeddings. Indexing is disabled while QDRANT_URL is
+# empty.
+QDRANT_URL = os.getenv('QDRANT_URL', '')
+QDRANT_API_KEY = os.getenv('QDRANT_API_KEY') or None
+QDRANT_COLLECTION = os.getenv('QDRANT_COLLECTION', 'recipes')
+VECTOR_INDEX_BATCH_SIZE = int(os.getenv('VECTOR_INDEX_BATCH_SIZE', 64))
+VECTOR_INDEX_INTERVAL = int(os.getenv('VECTOR_INDEX_INTERVAL', 5))
+
+# History, chef advice and drink pairings are generated once per recipe
+# content by the enrich_recipes command and served via ?expand= on the
+# recipe detail API. Recipes are not queued while this is off.
+RECIPE_ENRICHMENT_ENABLED = os.getenv('RECIPE_ENRICHMENT_ENABLED', 'False') == 'True'
+RECIPE_ENRICHMENT_BATCH_SIZE = int(os.getenv('RECIPE_ENRICHMENT_BATCH_SIZE', 10))
+RECIPE_ENRICHMENT_INTERVAL = int(os.getenv('RECIPE_ENRICHMENT_INTERVAL', 30))
+RECIPE_ENRICHMENT_MAX_ATTEMPTS = int(os.getenv('RECIPE_ENRICHMENT_MAX_ATTEMPTS', 5))
+
+# Telegram notifications are written to an outbox and delivered by the
+# send_telegram_notifications command. Messages queued for the same chat
+# between sends are merged into one digest; at most one message per chat
+# is sent every TELEGRAM_CHAT_INTERVAL seconds. A pass covers up to
+# TELEGRAM_OUTBOX_BATCH_SIZE chats.
+TELEGRAM_OUTBOX_BATCH_SIZE = int(os.getenv('TELEGRAM_OUTBOX_BATCH_SIZE', 100))
+TELEGRAM_OUTBOX_INTERVAL = int(os.getenv('TELEGRAM_OUTBOX_INTERVAL', 2))
+TELEGRAM_CHAT_INTERVAL = float(os.getenv('TELEGRAM_CHAT_INTERVAL', 1))
+TELEGRAM_CONCURRENCY = int(os.getenv('TELEGRAM_CONCURRENCY', 10))
+TELEGRAM_MAX_ATTEMPTS = int(os.getenv('TELEGRAM_MAX_ATTEMPTS', 8))
+TELEGRAM_RETRY_BASE = int(os.getenv('TELEGRAM_RETRY_BASE', 5))
@@ -5,3 +5,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+from foodgram.services.ingredient_index import ingredient_index  # noqa: E402
+
+ingredient_index.warm()
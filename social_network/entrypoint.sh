@@ -6,4 +6,4 @@ python3 manage.py migrate --no-input
 
 python3 manage.py collectstatic --no-input
 
-gunicorn backend.foodgram.wsgi:application --bind 0.0.0.0:8000
\ No newline at end of file
+gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker --bind 0.0.0.0:8000
\ No newline at end of file
@@ -7,3 +7,10 @@ class FoodgramConfig(AppConfig):
     """
     default_auto_field = "django.db.models.BigAutoField"
     name = "foodgram"
+
+    def ready(self) -> None:
+        from .services import (ingredient_index, recipe_cache, recipe_enrichment, recipe_search,  # noqa: F401
+                               recipe_vectors, subscription_feed)
+        from .services.shopping_list_pdf import register_fonts
+
+        register_fonts()
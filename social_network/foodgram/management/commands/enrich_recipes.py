@@ -0,0 +1,34 @@
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from foodgram.models import Recipe, RecipeEnrichmentQueue
+from foodgram.services.recipe_enrichment import drain_queue
+
+
+class Command(BaseCommand):
+    """
+    Command which generates history, chef advice and drink pairings for
+    queued recipes through the AI backend. Recipes whose content did not
+    change since the last generation are skipped.
+    """
+    help = 'Генерирует историю блюда, советы шефа и напитки для рецептов'
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument('--all', action='store_true', help='Поставить в очередь все рецепты')
+        parser.add_argument('--batch-size', type=int, default=settings.RECIPE_ENRICHMENT_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Разбирать очередь непрерывно')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if options['all']:
+            RecipeEnrichmentQueue.objects.bulk_create(
+                [RecipeEnrichmentQueue(recipe_id=pk) for pk in Recipe.objects.values_list('pk', flat=True)],
+                ignore_conflicts=True)
+        while True:
+            enriched, failed = drain_queue(options['batch_size'])
+            if enriched or failed:
+                self.stdout.write(f'Обогащено рецептов: {enriched}, с ошибкой: {failed}')
+            if not options['loop']:
+                return
+            time.sleep(settings.RECIPE_ENRICHMENT_INTERVAL)
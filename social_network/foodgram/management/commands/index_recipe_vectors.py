@@ -0,0 +1,36 @@
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from foodgram.services.recipe_vectors import build_indexer
+
+
+class Command(BaseCommand):
+    """
+    Command which keeps the Qdrant recipe collection used by the AI backend
+    up to date. Without --all it drains the queue filled by recipe signals.
+    """
+    help = 'Индексирует рецепты в Qdrant для семантического поиска'
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument('--all', action='store_true', help='Переиндексировать все рецепты')
+        parser.add_argument('--force', action='store_true', help='Кодировать заново даже неизмененные рецепты')
+        parser.add_argument('--batch-size', type=int, default=settings.VECTOR_INDEX_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Разбирать очередь непрерывно')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if not settings.QDRANT_URL:
+            raise CommandError('QDRANT_URL не задан')
+        indexer = build_indexer()
+        if options['all']:
+            indexed, skipped, deleted = indexer.reindex_all(options['batch_size'], force=options['force'])
+            self.stdout.write(f'Проиндексировано: {indexed}, без изменений: {skipped}, удалено: {deleted}')
+            return
+        while True:
+            processed = indexer.drain_queue(options['batch_size'])
+            if processed:
+                self.stdout.write(f'Обработано рецептов из очереди: {processed}')
+            if not options['loop']:
+                return
+            time.sleep(settings.VECTOR_INDEX_INTERVAL)
@@ -0,0 +1,27 @@
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from foodgram.services.subscription_feed import refresh_celebrities
+
+
+class Command(BaseCommand):
+    """
+    Command which marks authors with at least FEED_CELEBRITY_FOLLOWERS
+    followers as celebrities, whose recipes are read into subscription
+    feeds on demand, and backfills the feeds of authors that dropped below.
+    """
+    help = 'Обновляет список авторов, рецепты которых не раскладываются по лентам подписок'
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument('--loop', action='store_true', help='Обновлять непрерывно')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        while True:
+            promoted, demoted = refresh_celebrities()
+            if promoted or demoted:
+                self.stdout.write(f'Новых популярных авторов: {promoted}, перестали быть популярными: {demoted}')
+            if not options['loop']:
+                return
+            time.sleep(settings.FEED_CELEBRITY_INTERVAL)
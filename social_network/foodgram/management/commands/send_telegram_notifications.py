@@ -0,0 +1,30 @@
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from foodgram.services.telegram_outbox import TelegramOutbox
+
+
+class Command(BaseCommand):
+    """
+    Command which delivers the Telegram notification outbox. Messages
+    queued for one chat since the previous pass are sent as one digest.
+    """
+    help = 'Отправляет накопленные уведомления в Telegram'
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument('--batch-size', type=int, default=settings.TELEGRAM_OUTBOX_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Отправлять уведомления непрерывно')
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        if not settings.TELEGRAM_BOT_TOKEN:
+            raise CommandError('TELEGRAM_BOT_TOKEN не задан')
+        outbox = TelegramOutbox()
+        while True:
+            sent, failed = outbox.drain(options['batch_size'])
+            if sent or failed:
+                self.stdout.write(f'Отправлено уведомлений: {sent}, с ошибкой: {failed}')
+            if not options['loop']:
+                return
+            time.sleep(settings.TELEGRAM_OUTBOX_INTERVAL)
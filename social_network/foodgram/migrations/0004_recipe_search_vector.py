@@ -0,0 +1,59 @@
+# Generated by Django 3.2.20 on 2026-10-18 02:35
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+class AddIndexOnPostgres(migrations.AddIndex):
+    """GIN indexes only exist on PostgreSQL; other backends (SQLite in tests) skip them."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+def fill_search_vectors(apps, schema_editor):
+    """Same document as foodgram.services.recipe_search, built from the historical models"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    def names(through, field):
+        return Subquery(apps.get_model('foodgram', through).objects.filter(recipe=OuterRef('pk')).values(
+            'recipe').annotate(names=StringAgg(field, ' ')).values('names'))
+
+    config = 'russian'
+    author = Subquery(apps.get_model(settings.AUTH_USER_MODEL).objects.filter(pk=OuterRef('author_id')).values(
+        'username'))
+    apps.get_model('foodgram', 'Recipe').objects.update(search_vector=SearchVector('name', weight='A', config=config)
+        + SearchVector(names('TagsInRecipe', 'tag__name'), names('IngredientInRecipe', 'ingredient__name'),
+            weight='B', config=config)
+        + SearchVector('text', weight='C', config=config) + SearchVector(author, weight='D', config=config))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0003_remove_comment_unique_comment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Full-text search document, maintained automatically', null=True, verbose_name='Search vector'),
+        ),
+        AddIndexOnPostgres(
+            model_name='recipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_gin'),
+        ),
+        migrations.RunPython(fill_search_vectors, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.2.20 on 2026-10-18 02:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0004_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-created_at', '-id'], name='recipe_created_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='recipe_author_created_at_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.20 on 2026-10-18 02:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    Follow = apps.get_model('users', 'Follow')
+    Recipe = apps.get_model('foodgram', 'Recipe')
+    FeedEntry = apps.get_model('foodgram', 'FeedEntry')
+    for follow in Follow.objects.iterator():
+        recipes = Recipe.objects.filter(author_id=follow.author_id).order_by('-created_at', '-id')[
+            :settings.FEED_BACKFILL_SIZE]
+        FeedEntry.objects.bulk_create(
+            [FeedEntry(user_id=follow.user_id, recipe_id=recipe.id, author_id=follow.author_id,
+                created_at=recipe.created_at) for recipe in recipes], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('foodgram', '0005_recipe_keyset_indexes'),
+        ('users', '0003_user_telegram_notify'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(verbose_name='Recipe created at')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Recipe author')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='foodgram.recipe', verbose_name='Recipe')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Follower')),
+            ],
+            options={
+                'verbose_name': 'Feed entry',
+                'verbose_name_plural': 'Feed entries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', '-created_at', '-recipe'], name='feed_entry_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feedentry',
+            index=models.Index(fields=['user', 'author'], name='feed_entry_user_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_entry'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.20 on 2026-10-18 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0006_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeVectorQueue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(db_index=True, verbose_name='Recipe ID')),
+                ('queued_at', models.DateTimeField(auto_now_add=True, verbose_name='Queued at')),
+            ],
+            options={
+                'verbose_name': 'Recipe vector queue',
+                'verbose_name_plural': 'Recipe vector queue',
+            },
+        ),
+    ]
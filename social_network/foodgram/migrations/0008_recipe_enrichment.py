@@ -0,0 +1,30 @@
+# Generated by Django 3.2.20 on 2026-10-18 02:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0007_recipevectorqueue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeEnrichmentQueue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe_id', models.BigIntegerField(db_index=True, verbose_name='Recipe ID')),
+                ('queued_at', models.DateTimeField(auto_now_add=True, verbose_name='Queued at')),
+            ],
+            options={
+                'verbose_name': 'Recipe enrichment queue',
+                'verbose_name_plural': 'Recipe enrichment queue',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipehistory',
+            name='source_hash',
+            field=models.CharField(blank=True, default='', help_text='Hash of the recipe content the enrichments were generated from', max_length=64, verbose_name='Source hash'),
+        ),
+    ]
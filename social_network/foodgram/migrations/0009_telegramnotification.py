@@ -0,0 +1,31 @@
+# Generated by Django 3.2.20 on 2026-10-18 02:52
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0008_recipe_enrichment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TelegramNotification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chat_id', models.CharField(max_length=100, verbose_name='Chat ID')),
+                ('text', models.TextField(verbose_name='Text')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created at')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Attempts')),
+                ('next_attempt_at', models.DateTimeField(blank=True, db_index=True, default=django.utils.timezone.now, null=True, verbose_name='Next attempt at')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Last error')),
+            ],
+            options={
+                'verbose_name': 'Telegram notification',
+                'verbose_name_plural': 'Telegram notifications',
+                'ordering': ['pk'],
+            },
+        ),
+    ]
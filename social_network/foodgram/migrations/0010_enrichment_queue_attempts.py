@@ -0,0 +1,41 @@
+# Generated by Django 3.2.20 on 2026-10-18 03:09
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def drop_duplicate_rows(apps, schema_editor):
+    queue = apps.get_model('foodgram', 'RecipeEnrichmentQueue')
+    first = queue.objects.values('recipe_id').annotate(first_pk=models.Min('pk')).values('first_pk')
+    queue.objects.exclude(pk__in=first).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0009_telegramnotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeenrichmentqueue',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Attempts'),
+        ),
+        migrations.AddField(
+            model_name='recipeenrichmentqueue',
+            name='last_error',
+            field=models.TextField(blank=True, default='', verbose_name='Last error'),
+        ),
+        migrations.AlterField(
+            model_name='recipeenrichmentqueue',
+            name='queued_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Bumped when the recipe changes again while it is queued', verbose_name='Queued at'),
+        ),
+        migrations.RunPython(drop_duplicate_rows, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='recipeenrichmentqueue',
+            name='recipe_id',
+            field=models.BigIntegerField(unique=True, verbose_name='Recipe ID'),
+        ),
+    ]
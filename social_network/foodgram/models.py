@@ -1,8 +1,11 @@
-from typing import Any, Dict
+from typing import Any, Dict, Set
 
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -72,11 +75,16 @@ class Recipe(models.Model):
     image_generation_prompt = models.TextField(verbose_name="Image generation prompt",
         help_text="Prompt for generating recipe image", null=True, blank=True)
     steps = models.JSONField(verbose_name="Cooking steps", help_text="List of cooking steps", null=True, blank=True)
+    search_vector = SearchVectorField(null=True, editable=False, verbose_name="Search vector",
+        help_text="Full-text search document, maintained automatically")
 
     class Meta:
         ordering = ["-created_at"]
         verbose_name = "Recipe"
         verbose_name_plural = "Recipes"
+        indexes = [GinIndex(fields=["search_vector"], name="recipe_search_vector_gin"),
+            models.Index(fields=["-created_at", "-id"], name="recipe_created_at_id_idx"),
+            models.Index(fields=["author", "-created_at", "-id"], name="recipe_author_created_at_idx")]
 
     def __str__(self) -> str:
         return self.name
@@ -84,6 +92,31 @@ class Recipe(models.Model):
     def to_dict(self) -> Dict[str, Any]:
         return {'id': self.id, 'name': self.name, 'author': self.author.username, 'cooking_time': self.cooking_time}
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_values = dict(zip(field_names, values))
+        return instance
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        saved = getattr(self, '_saved_values', {})
+        saved.update({field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and (update_fields is None or field.name in update_fields)})
+        self._saved_values = saved
+
+    def changed_fields(self) -> Set[str]:
+        """
+        Concrete fields whose value differs from the last one loaded from
+        or saved to the database; every field for an unsaved instance.
+        Meant for post_save receivers, which run before the snapshot is
+        refreshed.
+        """
+        saved = getattr(self, '_saved_values', {})
+        return {field.attname for field in self._meta.concrete_fields
+            if field.attname not in saved or saved[field.attname] != getattr(self, field.attname)}
+
 
 class TagsInRecipe(models.Model):
     """
@@ -171,6 +204,8 @@ class RecipeHistory(models.Model):
         null=True, blank=True)
     cultural_significance = models.TextField(verbose_name="Cultural significance",
         help_text="Cultural significance of the recipe", null=True, blank=True)
+    source_hash = models.CharField(max_length=64, blank=True, default='', verbose_name="Source hash",
+        help_text="Hash of the recipe content the enrichments were generated from")
 
 
 class ChefAdvice(models.Model):
@@ -190,3 +225,76 @@ class DrinkPairing(models.Model):
     type = models.CharField(max_length=100, verbose_name="Drink type", help_text="Type of the drink")
     description = models.TextField(verbose_name="Drink description", help_text="Description of the drink")
     pairing_reason = models.TextField(verbose_name="Pairing reason", help_text="Reason for pairing with the recipe")
+
+
+class FeedEntry(models.Model):
+    """
+    Materialized subscription feed: one row per (follower, recipe), written
+    when a followed author publishes. created_at is copied from the recipe
+    so a feed page is a range scan over (user, created_at, recipe).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='feed_entries', verbose_name="Follower")
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='feed_entries', verbose_name="Recipe")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+', verbose_name="Recipe author")
+    created_at = models.DateTimeField(verbose_name="Recipe created at")
+
+    class Meta:
+        verbose_name = "Feed entry"
+        verbose_name_plural = "Feed entries"
+        constraints = [models.UniqueConstraint(fields=['user', 'recipe'], name='unique_feed_entry')]
+        indexes = [models.Index(fields=['user', '-created_at', '-recipe'], name='feed_entry_user_created_idx'),
+            models.Index(fields=['user', 'author'], name='feed_entry_user_author_idx')]
+
+
+class RecipeVectorQueue(models.Model):
+    """
+    Recipes whose Qdrant vectors are stale. Rows are appended by signals
+    and drained by the index_recipe_vectors command; recipe_id is not a
+    foreign key so deletions stay queued until the point is removed.
+    """
+    recipe_id = models.BigIntegerField(db_index=True, verbose_name="Recipe ID")
+    queued_at = models.DateTimeField(auto_now_add=True, verbose_name="Queued at")
+
+    class Meta:
+        verbose_name = "Recipe vector queue"
+        verbose_name_plural = verbose_name
+
+
+class RecipeEnrichmentQueue(models.Model):
+    """
+    Recipes whose history, chef advice and drink pairings should be
+    (re)generated by the AI backend. There is one row per recipe; rows are
+    added by signals and drained by the enrich_recipes command, and rows
+    that failed RECIPE_ENRICHMENT_MAX_ATTEMPTS times stay parked until the
+    recipe changes again.
+    """
+    recipe_id = models.BigIntegerField(unique=True, verbose_name="Recipe ID")
+    queued_at = models.DateTimeField(default=timezone.now, verbose_name="Queued at",
+        help_text="Bumped when the recipe changes again while it is queued")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Attempts")
+    last_error = models.TextField(blank=True, default='', verbose_name="Last error")
+
+    class Meta:
+        verbose_name = "Recipe enrichment queue"
+        verbose_name_plural = verbose_name
+
+
+class TelegramNotification(models.Model):
+    """
+    Outbox of Telegram messages. Rows are written in the transaction that
+    produced the event and sent by the send_telegram_notifications command;
+    next_attempt_at is cleared once delivery is given up.
+    """
+    chat_id = models.CharField(max_length=100, verbose_name="Chat ID")
+    text = models.TextField(verbose_name="Text")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Created at")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Attempts")
+    next_attempt_at = models.DateTimeField(null=True, blank=True, default=timezone.now, db_index=True,
+        verbose_name="Next attempt at")
+    last_error = models.TextField(blank=True, default='', verbose_name="Last error")
+
+    class Meta:
+        ordering = ['pk']
+        verbose_name = "Telegram notification"
+        verbose_name_plural = "Telegram notifications"
+
@@ -1,4 +1,16 @@
-from rest_framework.pagination import PageNumberPagination
+import binascii
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CartCustomPagination(PageNumberPagination):
@@ -8,3 +20,130 @@ class CartCustomPagination(PageNumberPagination):
     """
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination on (created_at, id): the cursor carries the values
+    of every ordering field of the row a page stops at, and the next page
+    is the rows strictly past that tuple. Each page is a range scan over
+    the matching index, so page 500 costs the same as page 1, and rows
+    sharing a created_at or inserted while paging are never skipped or
+    repeated. COUNT(*) is only run when the client asks for it with
+    ?count=true.
+    """
+    page_size = CartCustomPagination.page_size
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    count_query_param = 'count'
+
+    def __init__(self, ordering: Optional[Sequence[str]] = None) -> None:
+        if ordering is not None:
+            self.ordering = tuple(ordering)
+        self.count: Optional[int] = None
+        self.next_position: Optional[List[Any]] = None
+        self.previous_position: Optional[List[Any]] = None
+
+    def paginate_queryset(self, queryset: Any, request: Any, view: Any = None) -> Optional[List[Any]]:
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true'):
+            self.count = queryset.count()
+
+        position, reverse = self.decode_position(request)
+        ordering = [_reverse(field) for field in self.ordering] if reverse else list(self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(_after(ordering, position))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+
+        page = list(queryset[:self.page_size + 1])
+        has_more = len(page) > self.page_size
+        page = page[:self.page_size]
+        if reverse:
+            page.reverse()
+        has_next, has_previous = (position is not None, has_more) if reverse else (has_more, position is not None)
+        self.next_position = self._position(page[-1]) if page and has_next else None
+        self.previous_position = self._position(page[0]) if page and has_previous else None
+        return page
+
+    def get_next_link(self) -> Optional[str]:
+        if self.next_position is None:
+            return None
+        return self.encode_position(self.next_position, reverse=False)
+
+    def get_previous_link(self) -> Optional[str]:
+        if self.previous_position is None:
+            return None
+        return self.encode_position(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data: Any) -> Response:
+        payload = OrderedDict([('next', self.get_next_link()), ('previous', self.get_previous_link())])
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['results'] = data
+        return Response(payload)
+
+    def decode_position(self, request: Any) -> Tuple[Optional[List[Any]], bool]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii'), altchars=b'-_', validate=True))
+            position, reverse = cursor['p'], bool(cursor.get('r'))
+        except (binascii.Error, KeyError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_position(self, position: List[Any], reverse: bool) -> str:
+        cursor = {'p': position, 'r': True} if reverse else {'p': position}
+        encoded = b64encode(json.dumps(cursor, separators=(',', ':')).encode(), altchars=b'-_').decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _position(self, instance: Any) -> List[Any]:
+        values = [getattr(instance, field.lstrip('-')) for field in self.ordering]
+        return [value.isoformat() if isinstance(value, datetime) else value for value in values]
+
+
+class FeedPagination(CartCustomPagination):
+    """
+    Page-number pagination by default. A ?cursor= parameter (or
+    ?pagination=cursor for the first page) switches to KeysetPagination,
+    which infinite-scroll clients should use. Views may override the
+    keyset ordering with a cursor_ordering attribute.
+    """
+    cursor_pagination_class = KeysetPagination
+
+    def __init__(self) -> None:
+        self.keyset: Optional[KeysetPagination] = None
+
+    def paginate_queryset(self, queryset: Any, request: Any, view: Any = None) -> Optional[List[Any]]:
+        if 'cursor' in request.query_params or request.query_params.get('pagination') == 'cursor':
+            self.keyset = self.cursor_pagination_class(getattr(view, 'cursor_ordering', None))
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data: Any) -> Response:
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+def _reverse(field: str) -> str:
+    return field[1:] if field.startswith('-') else f'-{field}'
+
+
+def _after(ordering: Sequence[str], position: Sequence[Any]) -> Q:
+    """Rows that come strictly after `position` in `ordering`, compared as a tuple"""
+    condition, equal = Q(), {}
+    for field, value in zip(ordering, position):
+        name = field.lstrip('-')
+        condition |= Q(**equal, **{f'{name}__{"lt" if field.startswith("-") else "gt"}': value})
+        equal[name] = value
+    return condition
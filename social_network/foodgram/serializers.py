@@ -7,6 +7,8 @@ from typing import Dict, Any, List
 
 from users.serializers import CustomUserManipulateSerializer
 from . import models
+from .services.recipe_cache import RECIPES, bump_generation, versioned_key
+from .services.recipe_search import update_search_vectors
 
 # this block converts information stored in a database,
 # defined using Django models, into a format that
@@ -46,6 +48,29 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "measurement_unit"]
 
 
+class RecipeHistorySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.RecipeHistory
+        fields = ["history_text", "interesting_facts", "cultural_significance"]
+
+
+class ChefAdviceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.ChefAdvice
+        fields = ["tips", "variations", "common_mistakes", "serving_suggestions"]
+
+
+class DrinkPairingSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.DrinkPairing
+        fields = ["name", "type", "description", "pairing_reason"]
+
+
+class IngredientResolveSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=250)
+    measurement_unit = serializers.CharField(max_length=50)
+
+
 class ShowRecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(read_only=True, many=True)
     image = Base64ImageField()
@@ -87,6 +112,9 @@ class ShowRecipeSerializer(serializers.ModelSerializer):
         ]
 
     def get_is_favorited(self, obj: models.Recipe) -> bool:
+        favorited_ids = self.context.get("favorited_ids")
+        if favorited_ids is not None:
+            return obj.id in favorited_ids
         request = self.context.get("request")
         if request is None or request.user.is_anonymous:
             return False
@@ -96,6 +124,9 @@ class ShowRecipeSerializer(serializers.ModelSerializer):
         ).exists()
 
     def get_is_in_shopping_cart(self, obj: models.Recipe) -> bool:
+        in_shopping_cart_ids = self.context.get("in_shopping_cart_ids")
+        if in_shopping_cart_ids is not None:
+            return obj.id in in_shopping_cart_ids
         request_user = self.context["request"].user
         if request_user.is_anonymous:
             return False
@@ -188,6 +219,9 @@ class CreateRecipeSerializer(serializers.ModelSerializer):
                 amount=ingredient['amount']
             ) for ingredient in ingredients_data
         ])
+        # bulk_create skips post_save, so caches and the search vector are refreshed here
+        bump_generation(RECIPES)
+        update_search_vectors(models.Recipe.objects.filter(pk=recipe.pk))
 
     def create(self, validated_data: Dict[str, Any]) -> models.Recipe:
         request = self.context.get('request')
@@ -254,13 +288,13 @@ class ShoppingCartSerializer(FavoriteSerializer):
 
 class RecipeSerializer(serializers.ModelSerializer):
     def to_representation(self, instance: models.Recipe) -> Dict[str, Any]:
-        cache_key = f'recipe_{instance.id}'
+        cache_key = versioned_key(RECIPES, 'recipe', instance.id)
         cached_data = cache.get(cache_key)
         if cached_data:
             return cached_data
             
         data = super().to_representation(instance)
-        cache.set(cache_key, data, settings.CACHE_TTL)
+        cache.set(cache_key, data, settings.RECIPE_CACHE_TTL)
         return data
 
     def validate(self, data: Dict[str, Any]) -> Dict[str, Any]:
@@ -296,3 +330,13 @@ class CommentSerializer(serializers.ModelSerializer):
             context=self.context
         ).data
         return representation
+
+
+class RecipeCommentSerializer(CommentSerializer):
+    """
+    Comment with the id of its recipe, for lists spanning several recipes.
+    """
+
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ('recipe',)
+        read_only_fields = ('author', 'recipe')
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+from typing import Any, Coroutine, Optional, TypeVar
+
+from django.conf import settings
+
+T = TypeVar('T')
+
+
+class BackgroundLoop:
+    """
+    One event loop in a daemon thread, shared by the sync request threads
+    of a WSGI worker. Coroutines are submitted to it instead of creating
+    an event loop per call; the number of callers waiting on it at once
+    is bounded, the rest block until a slot frees up.
+
+    This stands in for a bounded thread pool on purpose: the WSGI worker
+    threads already are the pool, and a pool thread would need an event
+    loop of its own per call, while ai_service keeps one pooled client
+    per loop. With a single loop every request thread shares the same
+    connections.
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='ai-loop', daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        with self._slots:
+            return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+
+ai_loop = BackgroundLoop(settings.AI_SYNC_MAX_CONCURRENCY)
@@ -1,30 +1,136 @@
+import asyncio
+import json
+import threading
+import time
+import weakref
+from typing import AsyncIterator, Dict, Any, List, Optional
+
 import httpx
-from typing import Dict, Any, Optional
 from django.conf import settings
 
 
+class CircuitBreaker:
+    """
+    Stops calling the AI backend after `failure_threshold` consecutive
+    timeouts, connection errors or 5xx responses. While open, calls fail
+    immediately; after `reset_timeout` seconds one trial call is let
+    through, and its outcome closes or reopens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_running = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+
+circuit_breaker = CircuitBreaker(settings.AI_CIRCUIT_FAILURES, settings.AI_CIRCUIT_RESET_TIMEOUT)
+
+# httpx clients are bound to the event loop they were created on, so the
+# pool is shared by everything running on one loop (the ASGI server loop
+# or the background loop of ai_loop).
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=settings.AI_API_URL or "",
+            headers={"X-API-Key": settings.AI_API_KEY or ""},
+            timeout=httpx.Timeout(settings.AI_TIMEOUT, connect=settings.AI_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.AI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AI_MAX_CONNECTIONS
+            )
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_client() -> None:
+    """Closes the client of the running loop; for loops that are about to end"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def sse_event(event: str, data: Any) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode()
+
+
 class AIService:
+    UNAVAILABLE = "AI сервис временно недоступен"
+
     def __init__(self) -> None:
-        self.base_url = settings.AI_API_URL
-        self.api_key = settings.AI_API_KEY
-        self.timeout = 60
-        self.headers = {"X-API-Key": self.api_key}
+        self.timeouts = settings.AI_ENDPOINT_TIMEOUTS
+
+    def _timeout(self, endpoint: str) -> httpx.Timeout:
+        return httpx.Timeout(
+            self.timeouts.get(endpoint, settings.AI_TIMEOUT),
+            connect=settings.AI_CONNECT_TIMEOUT
+        )
+
+    async def _send(self, method: str, endpoint: str, json_data: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        """
+        Request through the shared client and circuit breaker. Raises
+        httpx.HTTPError on failure and RuntimeError while the circuit is open.
+        """
+        if not circuit_breaker.allow():
+            raise RuntimeError(self.UNAVAILABLE)
+        # Anything but a response below 500 counts as a failure, including
+        # cancellation, so a half-open trial always settles the circuit
+        backend_up = False
+        try:
+            response = await get_client().request(method, endpoint, json=json_data, timeout=self._timeout(endpoint))
+            backend_up = response.status_code < 500
+            response.raise_for_status()
+        finally:
+            if backend_up:
+                circuit_breaker.record_success()
+            else:
+                circuit_breaker.record_failure()
+        return response
 
     async def _make_request(
         self,
         endpoint: str,
-        json_data: Dict[str, Any]
+        json_data: Optional[Dict[str, Any]] = None,
+        method: str = "POST"
     ) -> Dict[str, Any]:
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}{endpoint}",
-                    json=json_data,
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.json()
-        except httpx.ReadTimeout:
+            response = await self._send(method, endpoint, json_data)
+            return response.json()
+        except httpx.TimeoutException:
             return {"error": "AI сервис не отвечает (timeout)"}
         except Exception as e:
             return {"error": str(e)}
@@ -44,16 +150,28 @@ class AIService:
             }
         )
 
+    async def generate_recipe_history(self, recipe: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._make_request(
+            "/api/v1/recipes/history",
+            {"recipe": recipe}
+        )
+
+    async def generate_chef_advice(self, recipe: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._make_request(
+            "/api/v1/recipes/chef-advice",
+            {"recipe": recipe}
+        )
+
+    async def generate_drink_pairings(self, recipe: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._make_request(
+            "/api/v1/recipes/drink-pairings",
+            {"recipe": recipe}
+        )
+
     async def generate_image(self, prompt: str) -> Optional[bytes]:
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    f"{self.base_url}/generate-image",
-                    json={"prompt": prompt},
-                    headers=self.headers
-                )
-                response.raise_for_status()
-                return response.content
+            response = await self._send("POST", "/generate-image", {"prompt": prompt})
+            return response.content
         except Exception:
             return None
 
@@ -61,4 +179,69 @@ class AIService:
         return await self._make_request(
             "/api/v1/recipes/ask",
             {"question": question}
-        ) 
\ No newline at end of file
+        )
+
+    async def ask_stream(self, question: str) -> AsyncIterator[bytes]:
+        """
+        Server-sent events of the AI backend's streamed answer, relayed
+        byte for byte as they arrive. Failures become an "error" event.
+        """
+        if not circuit_breaker.allow():
+            yield sse_event("error", {"detail": self.UNAVAILABLE})
+            return
+        # As in _send, the circuit is settled however the stream ends,
+        # including cancellation and the client closing it early
+        backend_up = False
+        try:
+            async with get_client().stream("POST", "/api/v1/recipes/ask/stream", json={"question": question},
+                    timeout=self._timeout("/api/v1/recipes/ask")) as response:
+                backend_up = response.status_code < 500
+                if response.status_code != 200:
+                    await response.aread()
+                    yield sse_event("error", {"detail": f"{response.status_code} {response.text}"})
+                    return
+                async for chunk in response.aiter_raw():
+                    yield chunk
+        except httpx.TimeoutException:
+            backend_up = False
+            yield sse_event("error", {"detail": "AI сервис не отвечает (timeout)"})
+        except httpx.TransportError as e:
+            backend_up = False
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            if backend_up:
+                circuit_breaker.record_success()
+            else:
+                circuit_breaker.record_failure()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Sentence embeddings from the AI backend's model, the one it encodes
+        /recipes/ask questions with. Raises like _send.
+        """
+        response = await self._send("POST", "/api/v1/embeddings", {"texts": texts})
+        return response.json()["vectors"]
+
+    async def submit_job(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        callback_url: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Queues a long generation ("recipe" or "image") on the AI backend and
+        returns the job ({"id", "status", ...}) without waiting for it.
+        """
+        return await self._make_request(
+            "/api/v1/jobs",
+            {
+                "kind": kind,
+                "params": params,
+                "callback_url": callback_url
+            }
+        )
+
+    async def get_job(self, job_id: str) -> Dict[str, Any]:
+        """Job status; "result" is filled once "status" is "done"."""
+        return await self._make_request(f"/api/v1/jobs/{job_id}", method="GET")
+
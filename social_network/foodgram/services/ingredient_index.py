@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from foodgram.models import Ingredient
+from foodgram.services.recipe_cache import bump_generation, get_generation
+
+INGREDIENTS = 'ingredients'
+
+logger = logging.getLogger(__name__)
+
+
+class IngredientIndex:
+    """
+    Process-local sorted array of ingredients for autocomplete.
+
+    Prefix matches are found by binary search over case-folded names,
+    infix matches by a scan of the same array. The server entry points
+    build it at startup; afterwards it is rebuilt from the database only
+    when the shared 'ingredients' cache generation changes, so every
+    worker picks up edits made by the others. The generation is read at
+    most once per check_interval seconds, or on the next search after an
+    edit made by this process.
+    """
+
+    def __init__(self, check_interval: float) -> None:
+        self.check_interval = check_interval
+        self._keys: List[str] = []
+        self._entries: List[Tuple[int, str, str]] = []
+        self._generation: Optional[int] = None
+        self._checked_at = float('-inf')
+        self._lock = threading.Lock()
+
+    def warm(self) -> None:
+        """Builds the index ahead of the first search; without a migrated database it is built on first use"""
+        try:
+            self._ensure_fresh()
+        except DatabaseError as e:
+            logger.warning(f"Индекс ингредиентов не построен при старте: {e}")
+
+    def expire(self) -> None:
+        """Makes the next search check the generation, after a change made in this process"""
+        self._checked_at = float('-inf')
+
+    def _ensure_fresh(self) -> None:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return
+        generation = get_generation(INGREDIENTS)
+        self._checked_at = now
+        if generation == self._generation:
+            return
+        with self._lock:
+            if generation == self._generation:
+                return
+            rows = sorted(Ingredient.objects.values_list('id', 'name', 'measurement_unit'),
+                          key=lambda row: (row[1].casefold(), row[0]))
+            self._keys = [name.casefold() for _, name, _ in rows]
+            self._entries = rows
+            self._generation = generation
+
+    def search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        self._ensure_fresh()
+        query = query.strip().casefold()
+        if not query or limit <= 0:
+            return []
+        keys, entries = self._keys, self._entries
+        matches: List[int] = []
+        i = bisect_left(keys, query)
+        while i < len(keys) and keys[i].startswith(query) and len(matches) < limit:
+            matches.append(i)
+            i += 1
+        if len(matches) < limit:
+            for i, key in enumerate(keys):
+                if query in key and not key.startswith(query):
+                    matches.append(i)
+                    if len(matches) == limit:
+                        break
+        return [{'id': entries[i][0], 'name': entries[i][1], 'measurement_unit': entries[i][2]} for i in matches]
+
+    def lookup(self, name: str, measurement_unit: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Ingredient with exactly this name, ignoring case; one with the same
+        measurement unit is preferred when several share the name.
+        """
+        self._ensure_fresh()
+        key = name.strip().casefold()
+        keys, entries = self._keys, self._entries
+        i = bisect_left(keys, key)
+        found = None
+        while i < len(keys) and keys[i] == key:
+            if found is None or entries[i][2] == measurement_unit:
+                found = entries[i]
+            if entries[i][2] == measurement_unit:
+                break
+            i += 1
+        if found is None:
+            return None
+        return {'id': found[0], 'name': found[1], 'measurement_unit': found[2]}
+
+
+ingredient_index = IngredientIndex(settings.INGREDIENT_INDEX_CHECK_INTERVAL)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender: Any, **kwargs: Any) -> None:
+    bump_generation(INGREDIENTS)
+    ingredient_index.expire()
@@ -0,0 +1,42 @@
+from functools import reduce
+from operator import or_
+from typing import Any, Dict, List, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from foodgram.models import Ingredient
+from foodgram.services.ingredient_index import INGREDIENTS, ingredient_index
+from foodgram.services.recipe_cache import bump_generation
+
+
+def _key(name: str, measurement_unit: str) -> Tuple[str, str]:
+    return name.strip().casefold(), measurement_unit.strip()
+
+
+def resolve_ingredients(items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """
+    Maps (name, measurement_unit) pairs to catalog ingredients, matching
+    names case-insensitively through the in-memory index. Missing ones are
+    created in a single transaction. The result keeps the input order.
+    """
+    resolved = [ingredient_index.lookup(name, unit) for name, unit in items]
+    missing: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    for (name, unit), found in zip(items, resolved):
+        if found is None:
+            missing.setdefault(_key(name, unit), (name.strip(), unit.strip()))
+    if missing:
+        with transaction.atomic():
+            Ingredient.objects.bulk_create([Ingredient(name=name, measurement_unit=unit)
+                for name, unit in missing.values()], ignore_conflicts=True)
+            created = Ingredient.objects.filter(
+                reduce(or_, (Q(name=name, measurement_unit=unit) for name, unit in missing.values())))
+            by_key = {_key(ingredient.name, ingredient.measurement_unit): ingredient for ingredient in created}
+        bump_generation(INGREDIENTS)
+        ingredient_index.expire()
+        for i, (name, unit) in enumerate(items):
+            if resolved[i] is None:
+                ingredient = by_key[_key(name, unit)]
+                resolved[i] = {'id': ingredient.id, 'name': ingredient.name,
+                    'measurement_unit': ingredient.measurement_unit}
+    return resolved
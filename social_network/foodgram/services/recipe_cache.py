@@ -0,0 +1,146 @@
+import copy
+import hashlib
+import time
+from typing import Any, Dict, List
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from users.models import Follow, User
+
+from foodgram.models import Favorite, Ingredient, IngredientInRecipe, Recipe, ShoppingCart, Tag, TagsInRecipe
+from foodgram.utils import load_recipe_flags
+
+RECIPES = 'recipes'
+USER_SPECIFIC_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+# Counters change on every view and favorite, so cached payloads get them
+# from the database on each read instead of being invalidated
+COUNTER_FIELDS = ('views_count', 'favorites_count')
+# User fields shown as a recipe's author
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+def user_flags_resource(user_id: int) -> str:
+    return f'recipe_flags_{user_id}'
+
+
+def shopping_cart_resource(user_id: int) -> str:
+    return f'shopping_cart_{user_id}'
+
+
+def get_generation(resource: str) -> int:
+    """
+    Current generation of a cached resource. A lost counter is re-seeded
+    from the clock, so it never goes back to a generation already used.
+    """
+    key = f'generation_{resource}'
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(resource: str) -> None:
+    key = f'generation_{resource}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+
+def versioned_key(resource: str, *parts: Any) -> str:
+    digest = hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+    return f'{resource}:{get_generation(resource)}:{digest}'
+
+
+def recipe_list_cache_key(request: Any) -> str:
+    """
+    Key for the shared part of a recipe list page. Only filters that
+    depend on the requesting user make the key user-specific.
+    """
+    params = sorted(request.query_params.lists())
+    if request.user.is_authenticated and any(request.query_params.get(p) for p in USER_SPECIFIC_PARAMS):
+        resource = user_flags_resource(request.user.id)
+        return versioned_key(RECIPES, params, resource, get_generation(resource))
+    return versioned_key(RECIPES, params)
+
+
+def apply_live_fields(user: Any, data: Any) -> Any:
+    """
+    Copy of a cached, user-independent recipe list payload with current
+    counters and the requesting user's is_favorited / is_in_shopping_cart
+    / is_subscribed flags. The cached payload itself is left untouched.
+    """
+    data = copy.deepcopy(data)
+    recipes: List[Dict[str, Any]] = data['results'] if isinstance(data, dict) else data
+    if recipes:
+        apply_counters(recipes)
+        if user.is_authenticated:
+            apply_user_flags(user, recipes)
+    return data
+
+
+def apply_counters(recipes: List[Dict[str, Any]]) -> None:
+    counters = {row[0]: row[1:] for row in
+        Recipe.objects.filter(pk__in=[recipe['id'] for recipe in recipes]).values_list('pk', *COUNTER_FIELDS)}
+    for recipe in recipes:
+        if recipe['id'] in counters:
+            recipe.update(zip(COUNTER_FIELDS, counters[recipe['id']]))
+
+
+def apply_user_flags(user: Any, recipes: List[Dict[str, Any]]) -> None:
+    recipe_ids = sorted(recipe['id'] for recipe in recipes)
+    author_ids = {recipe['author']['id'] for recipe in recipes}
+    key = versioned_key(user_flags_resource(user.id), recipe_ids)
+    flags = cache.get(key)
+    if flags is None:
+        flags = load_recipe_flags(user, recipe_ids, author_ids)
+        cache.set(key, flags, settings.RECIPE_CACHE_TTL)
+    for recipe in recipes:
+        recipe['is_favorited'] = recipe['id'] in flags['favorited_ids']
+        recipe['is_in_shopping_cart'] = recipe['id'] in flags['in_shopping_cart_ids']
+        recipe['author']['is_subscribed'] = recipe['author']['id'] in flags['subscribed_author_ids']
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_changed_recipe(sender: Any, instance: Recipe, **kwargs: Any) -> None:
+    if instance.changed_fields() - set(COUNTER_FIELDS):
+        bump_generation(RECIPES)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author(sender: Any, instance: Any, update_fields: Any = None, **kwargs: Any) -> None:
+    if update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        bump_generation(RECIPES)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+@receiver(post_save, sender=TagsInRecipe)
+@receiver(post_delete, sender=TagsInRecipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=TagsInRecipe)
+def invalidate_recipes(sender: Any, **kwargs: Any) -> None:
+    bump_generation(RECIPES)
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_user_flags(sender: Any, instance: Any, **kwargs: Any) -> None:
+    bump_generation(user_flags_resource(instance.user_id))
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_shopping_cart(sender: Any, instance: ShoppingCart, **kwargs: Any) -> None:
+    bump_generation(shopping_cart_resource(instance.user_id))
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from foodgram.models import ChefAdvice, DrinkPairing, IngredientInRecipe, Recipe, RecipeEnrichmentQueue, RecipeHistory
+from foodgram.services.ai_service import AIService, close_client
+from foodgram.services.recipe_vectors import content_hash
+
+logger = logging.getLogger(__name__)
+
+# ?expand= value -> related name on Recipe
+EXPANSIONS = {'history': 'history', 'advice': 'chef_advice', 'pairings': 'drink_pairings'}
+
+# Recipe fields that go into recipe_ai_payload, besides the ingredients
+CONTENT_FIELDS = {'name', 'text', 'steps', 'cooking_time', 'difficulty', 'image_generation_prompt'}
+PAIRING_FIELDS = ('name', 'type', 'description', 'pairing_reason')
+
+
+class EnrichmentError(Exception):
+    pass
+
+
+def parse_expand(value: str) -> List[str]:
+    """Validated list of expansions from a comma separated ?expand= value"""
+    expand = [item.strip() for item in value.split(',') if item.strip()]
+    unknown = [item for item in expand if item not in EXPANSIONS]
+    if unknown:
+        raise ValueError(f"Неизвестные значения expand: {', '.join(unknown)}. "
+                         f"Допустимые: {', '.join(EXPANSIONS)}")
+    return expand
+
+
+def expansion_prefetches(expand: Iterable[str]) -> List[str]:
+    return [EXPANSIONS[item] for item in expand]
+
+
+def recipe_ai_payload(recipe: Recipe) -> Dict[str, Any]:
+    """Recipe in the shape of the AI backend's RecipeResponse model"""
+    return {'name': recipe.name, 'description': recipe.text,
+        'ingredients': [{'name': amount.ingredient.name, 'amount': amount.amount,
+            'unit': amount.ingredient.measurement_unit} for amount in recipe.ingredients_amount.all()],
+        'steps': recipe.steps or [], 'cooking_time': recipe.cooking_time, 'difficulty': recipe.difficulty or '',
+        'image_generation_prompt': recipe.image_generation_prompt or ''}
+
+
+async def generate_enrichments(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    ai_service = AIService()
+    try:
+        results = await asyncio.gather(ai_service.generate_recipe_history(payload),
+            ai_service.generate_chef_advice(payload), ai_service.generate_drink_pairings(payload))
+    finally:
+        await close_client()
+    for result in results:
+        if isinstance(result, dict) and 'error' in result:
+            raise EnrichmentError(result['error'])
+    validate_enrichments(*results)
+    return results[0], results[1], results[2]
+
+
+def validate_enrichments(history: Any, advice: Any, pairings: Any) -> None:
+    """Raises EnrichmentError unless the responses have the shape store_enrichments expects"""
+    if not isinstance(history, dict) or not isinstance(history.get('history'), str):
+        raise EnrichmentError(f'Некорректная история блюда: {history!r}')
+    if not isinstance(advice, dict):
+        raise EnrichmentError(f'Некорректные советы шефа: {advice!r}')
+    if not isinstance(pairings, dict) or not isinstance(pairings.get('pairings', []), list):
+        raise EnrichmentError(f'Некорректные напитки: {pairings!r}')
+    for pairing in pairings.get('pairings', []):
+        if not isinstance(pairing, dict) or not all(isinstance(pairing.get(field), str) for field in PAIRING_FIELDS):
+            raise EnrichmentError(f'Некорректный напиток: {pairing!r}')
+
+
+def store_enrichments(recipe: Recipe, source_hash: str, history: Dict[str, Any], advice: Dict[str, Any],
+        pairings: Dict[str, Any]) -> None:
+    """Replaces everything previously generated for the recipe"""
+    with transaction.atomic():
+        RecipeHistory.objects.filter(recipe=recipe).delete()
+        ChefAdvice.objects.filter(recipe=recipe).delete()
+        DrinkPairing.objects.filter(recipe=recipe).delete()
+        RecipeHistory.objects.create(recipe=recipe, source_hash=source_hash, history_text=history['history'],
+            interesting_facts=history.get('interesting_facts'),
+            cultural_significance=history.get('cultural_significance'))
+        ChefAdvice.objects.create(recipe=recipe, tips=advice.get('tips'), variations=advice.get('variations'),
+            common_mistakes=advice.get('common_mistakes'), serving_suggestions=advice.get('serving_suggestions'))
+        DrinkPairing.objects.bulk_create([DrinkPairing(recipe=recipe, name=pairing['name'], type=pairing['type'],
+            description=pairing['description'], pairing_reason=pairing['pairing_reason'])
+            for pairing in pairings.get('pairings', [])])
+
+
+def enrich_recipe(recipe: Recipe, force: bool = False) -> bool:
+    """
+    Generates and stores enrichments unless they were already generated
+    from the same recipe content. Returns whether the AI backend was called.
+    """
+    payload = recipe_ai_payload(recipe)
+    source_hash = content_hash(payload)
+    if not force and RecipeHistory.objects.filter(recipe=recipe, source_hash=source_hash).exists():
+        return False
+    history, advice, pairings = asyncio.run(generate_enrichments(payload))
+    store_enrichments(recipe, source_hash, history, advice, pairings)
+    return True
+
+
+def drain_queue(batch_size: int) -> Tuple[int, int]:
+    """
+    Enriches queued recipes batch by batch. A failed recipe stays queued
+    with its attempt counted and is parked after
+    RECIPE_ENRICHMENT_MAX_ATTEMPTS failures; rows with fewer failures are
+    taken first. Returns (enriched, failed) counts.
+    """
+    enriched, failed = 0, set()
+    while True:
+        started = timezone.now()
+        rows = list(RecipeEnrichmentQueue.objects.filter(attempts__lt=settings.RECIPE_ENRICHMENT_MAX_ATTEMPTS).exclude(
+            recipe_id__in=failed).order_by('attempts', 'pk')[:batch_size])
+        if not rows:
+            return enriched, len(failed)
+        recipes = Recipe.objects.filter(pk__in=[row.recipe_id for row in rows]).prefetch_related(
+            'ingredients_amount__ingredient')
+        errors = {}
+        for recipe in recipes:
+            try:
+                enriched += enrich_recipe(recipe)
+            except EnrichmentError as e:
+                logger.warning(f"Не удалось обогатить рецепт {recipe.pk}: {e}")
+                errors[recipe.pk] = str(e)
+            except Exception as e:
+                logger.exception(f"Ошибка при обогащении рецепта {recipe.pk}")
+                errors[recipe.pk] = f'{type(e).__name__}: {e}'
+        for row in rows:
+            if row.recipe_id in errors:
+                row.attempts += 1
+                row.last_error = errors[row.recipe_id]
+        RecipeEnrichmentQueue.objects.bulk_update([row for row in rows if row.recipe_id in errors],
+            ['attempts', 'last_error'])
+        # Rows bumped by a change made while the batch was running stay queued
+        done = [row.recipe_id for row in rows if row.recipe_id not in errors]
+        RecipeEnrichmentQueue.objects.filter(recipe_id__in=done, queued_at__lte=started).delete()
+        failed.update(errors)
+
+
+def enqueue(recipe_ids: Iterable[int], changed: bool = True) -> None:
+    """
+    Queues recipes that are not queued yet. With `changed` (the recipe
+    content changed) already queued rows are bumped and parked ones get
+    their attempts back.
+    """
+    if not settings.RECIPE_ENRICHMENT_ENABLED:
+        return
+    recipe_ids = set(recipe_ids)
+    queued = RecipeEnrichmentQueue.objects.filter(recipe_id__in=recipe_ids)
+    if changed:
+        queued.update(queued_at=timezone.now(), attempts=0)
+    queued_ids = set(queued.values_list('recipe_id', flat=True))
+    RecipeEnrichmentQueue.objects.bulk_create(
+        [RecipeEnrichmentQueue(recipe_id=pk) for pk in recipe_ids - queued_ids], ignore_conflicts=True)
+
+
+@receiver(post_save, sender=Recipe)
+def enqueue_recipe(sender: Any, instance: Recipe, **kwargs: Any) -> None:
+    if instance.changed_fields() & CONTENT_FIELDS:
+        enqueue([instance.pk])
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+def enqueue_ingredient_recipe(sender: Any, instance: IngredientInRecipe, **kwargs: Any) -> None:
+    enqueue([instance.recipe_id])
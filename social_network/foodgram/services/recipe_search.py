@@ -0,0 +1,113 @@
+import re
+from typing import Any, Iterable
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, OuterRef, Q, QuerySet, Subquery
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from users.models import User
+
+from foodgram.models import Ingredient, IngredientInRecipe, Recipe, Tag, TagsInRecipe
+
+SEARCH_CONFIG = 'russian'
+# Recipe fields that go into the search document, besides tags and ingredients
+SEARCH_FIELDS = {'name', 'text', 'author_id'}
+
+
+def full_text_search_enabled() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def _names(through: Any, field: str) -> Subquery:
+    return Subquery(through.objects.filter(recipe=OuterRef('pk')).values('recipe').annotate(
+        names=StringAgg(field, ' ')).values('names'))
+
+
+def update_search_vectors(recipes: QuerySet) -> None:
+    """
+    Recomputes Recipe.search_vector from the name, tags, ingredients,
+    description and author of every recipe in the queryset with a single
+    UPDATE.
+    """
+    if not full_text_search_enabled():
+        return
+    tags, ingredients = _names(TagsInRecipe, 'tag__name'), _names(IngredientInRecipe, 'ingredient__name')
+    author = Subquery(User.objects.filter(pk=OuterRef('author_id')).values('username'))
+    recipes.update(search_vector=SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(tags, ingredients, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+        + SearchVector(author, weight='D', config=SEARCH_CONFIG))
+
+
+def search_recipes(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Ranked full-text search with Russian stemming and prefix matching on
+    PostgreSQL. Other databases (SQLite in tests) fall back to icontains.
+    """
+    if not full_text_search_enabled():
+        return queryset.filter(Q(name__icontains=query) | Q(text__icontains=query) | Q(
+            author__username__icontains=query) | Q(ingredients__name__icontains=query) | Q(
+            tags__name__icontains=query)).distinct()
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return queryset
+    search_query = SearchQuery(' & '.join(f'{term}:*' for term in terms), config=SEARCH_CONFIG, search_type='raw')
+    return queryset.filter(search_vector=search_query).annotate(
+        rank=SearchRank(F('search_vector'), search_query)).order_by('-rank', '-created_at')
+
+
+def _update_recipes(recipe_ids: Iterable[int]) -> None:
+    if not full_text_search_enabled():
+        return
+    update_search_vectors(Recipe.objects.filter(pk__in=list(recipe_ids)))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_vector(sender: Any, instance: Recipe, **kwargs: Any) -> None:
+    if instance.changed_fields() & SEARCH_FIELDS:
+        _update_recipes([instance.pk])
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+@receiver(post_save, sender=TagsInRecipe)
+@receiver(post_delete, sender=TagsInRecipe)
+def update_related_recipe_search_vector(sender: Any, instance: Any, **kwargs: Any) -> None:
+    _update_recipes([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=TagsInRecipe)
+def update_tagged_recipe_search_vector(sender: Any, instance: Any, action: str, reverse: bool, pk_set: Any,
+                                       **kwargs: Any) -> None:
+    if reverse and action == 'pre_clear' and full_text_search_enabled():
+        # After the clear the tag has no recipes left to look up
+        instance._search_cleared_recipe_ids = list(Recipe.objects.filter(tags=instance).values_list('pk', flat=True))
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        _update_recipes([instance.pk])
+    elif action == 'post_clear':
+        _update_recipes(instance.__dict__.pop('_search_cleared_recipe_ids', []))
+    else:
+        _update_recipes(pk_set)
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_recipes_search_vector(sender: Any, instance: Ingredient, created: bool, **kwargs: Any) -> None:
+    if not created:
+        update_search_vectors(Recipe.objects.filter(ingredients=instance))
+
+
+@receiver(post_save, sender=Tag)
+def update_tag_recipes_search_vector(sender: Any, instance: Tag, created: bool, **kwargs: Any) -> None:
+    if not created:
+        update_search_vectors(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=User)
+def update_author_recipes_search_vector(sender: Any, instance: User, created: bool, update_fields: Any = None,
+                                        **kwargs: Any) -> None:
+    if not created and (update_fields is None or 'username' in update_fields):
+        update_search_vectors(Recipe.objects.filter(author=instance))
@@ -0,0 +1,164 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from foodgram.models import IngredientInRecipe, Recipe, RecipeVectorQueue, TagsInRecipe
+from foodgram.services.ai_service import AIService, close_client
+
+TEXT_FIELDS = ('name', 'text', 'ingredients', 'tags')
+
+Encoder = Callable[[List[str]], List[List[float]]]
+
+
+def recipe_payload(recipe: Recipe) -> Dict[str, Any]:
+    """
+    Payload stored next to the vector; these are the fields the AI
+    backend's /recipes/ask reads back from search hits.
+    """
+    amounts = list(recipe.ingredients_amount.all())
+    return {'id': recipe.pk, 'name': recipe.name, 'text': recipe.text,
+        'ingredients': [amount.ingredient.name for amount in amounts],
+        'amounts': [amount.amount for amount in amounts],
+        'units': [amount.ingredient.measurement_unit for amount in amounts],
+        'tags': [tag.name for tag in recipe.tags.all()]}
+
+
+def content_hash(payload: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def recipe_document(payload: Dict[str, Any]) -> str:
+    return (f"{payload['name']}. {payload['text']}\n"
+            f"Ингредиенты: {', '.join(payload['ingredients'])}\nТеги: {', '.join(payload['tags'])}")
+
+
+class RecipeVectorIndexer:
+    """
+    Keeps the Qdrant recipe collection in sync with the database. Each
+    point stores a content hash of its payload, so recipes whose name,
+    text, ingredients and tags did not change are not re-encoded.
+    """
+
+    def __init__(self, client: Any, encode: Encoder, collection: str) -> None:
+        self.client = client
+        self.encode = encode
+        self.collection = collection
+
+    def _ensure_collection(self, size: int) -> None:
+        from qdrant_client import models
+
+        if self.collection in {collection.name for collection in self.client.get_collections().collections}:
+            return
+        self.client.create_collection(self.collection,
+            vectors_config=models.VectorParams(size=size, distance=models.Distance.COSINE))
+        for field in TEXT_FIELDS:
+            self.client.create_payload_index(self.collection, field_name=field,
+                field_schema=models.TextIndexParams(type='text', tokenizer=models.TokenizerType.WORD, lowercase=True))
+
+    def _stored_hashes(self, ids: List[int]) -> Dict[int, str]:
+        if self.collection not in {collection.name for collection in self.client.get_collections().collections}:
+            return {}
+        points = self.client.retrieve(self.collection, ids=ids, with_payload=['content_hash'], with_vectors=False)
+        return {point.id: point.payload.get('content_hash') for point in points}
+
+    def index(self, recipe_ids: Iterable[int], force: bool = False) -> Tuple[int, int, int]:
+        """
+        Re-embeds the given recipes and removes points of recipes that no
+        longer exist. Returns (indexed, skipped, deleted) counts.
+        """
+        from qdrant_client import models
+
+        recipe_ids = sorted(set(recipe_ids))
+        recipes = Recipe.objects.filter(pk__in=recipe_ids).prefetch_related('ingredients_amount__ingredient', 'tags')
+        payloads = {recipe.pk: recipe_payload(recipe) for recipe in recipes}
+        for payload in payloads.values():
+            payload['content_hash'] = content_hash(payload)
+
+        deleted = [pk for pk in recipe_ids if pk not in payloads]
+        if deleted and self._stored_hashes(deleted):
+            self.client.delete(self.collection, points_selector=models.PointIdsList(points=deleted))
+
+        stored = {} if force else self._stored_hashes(list(payloads))
+        changed = [payload for pk, payload in payloads.items() if stored.get(pk) != payload['content_hash']]
+        if changed:
+            vectors = self.encode([recipe_document(payload) for payload in changed])
+            self._ensure_collection(len(vectors[0]))
+            self.client.upsert(self.collection,
+                points=[models.PointStruct(id=payload['id'], vector=list(vector), payload=payload) for payload, vector
+                    in zip(changed, vectors)])
+        return len(changed), len(payloads) - len(changed), len(deleted)
+
+    def reindex_all(self, batch_size: int, force: bool = False) -> Tuple[int, int, int]:
+        totals = [0, 0, 0]
+        recipe_ids = list(Recipe.objects.order_by('pk').values_list('pk', flat=True))
+        for start in range(0, len(recipe_ids), batch_size):
+            for i, count in enumerate(self.index(recipe_ids[start:start + batch_size], force=force)):
+                totals[i] += count
+        return totals[0], totals[1], totals[2]
+
+    def drain_queue(self, batch_size: int) -> int:
+        """
+        Indexes queued recipes batch by batch. Rows queued while a batch is
+        being encoded have a higher pk and are kept for the next pass.
+        """
+        processed = 0
+        while True:
+            rows = list(RecipeVectorQueue.objects.order_by('pk').values_list('pk', 'recipe_id')[:batch_size])
+            if not rows:
+                return processed
+            recipe_ids = {recipe_id for _, recipe_id in rows}
+            self.index(recipe_ids)
+            RecipeVectorQueue.objects.filter(pk__lte=rows[-1][0], recipe_id__in=recipe_ids).delete()
+            processed += len(recipe_ids)
+
+
+def embed(texts: List[str]) -> List[List[float]]:
+    """
+    Encodes texts with the AI backend's embedding model, the same one it
+    encodes /recipes/ask questions with.
+    """
+    async def run() -> List[List[float]]:
+        try:
+            return await AIService().embed(texts)
+        finally:
+            await close_client()
+
+    return asyncio.run(run())
+
+
+def build_indexer() -> RecipeVectorIndexer:
+    """Indexer backed by the Qdrant server from settings and the AI backend's embeddings."""
+    from qdrant_client import QdrantClient
+
+    client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
+    return RecipeVectorIndexer(client, embed, settings.QDRANT_COLLECTION)
+
+
+def enqueue(recipe_ids: Iterable[int]) -> None:
+    if settings.QDRANT_URL:
+        RecipeVectorQueue.objects.bulk_create([RecipeVectorQueue(recipe_id=pk) for pk in set(recipe_ids)])
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def enqueue_recipe(sender: Any, instance: Recipe, **kwargs: Any) -> None:
+    enqueue([instance.pk])
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+@receiver(post_save, sender=TagsInRecipe)
+@receiver(post_delete, sender=TagsInRecipe)
+def enqueue_related_recipe(sender: Any, instance: Any, **kwargs: Any) -> None:
+    enqueue([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=TagsInRecipe)
+def enqueue_tagged_recipes(sender: Any, instance: Any, action: str, reverse: bool, pk_set: Any, **kwargs: Any) -> None:
+    if action.startswith('post_'):
+        enqueue((pk_set or []) if reverse else [instance.pk])
@@ -0,0 +1,34 @@
+from typing import Any, Dict, List
+
+from django.db.models import Sum
+
+from foodgram.models import IngredientInRecipe, Recipe
+
+
+def aggregate_shopping_list(user: Any) -> List[Dict[str, Any]]:
+    """
+    Sums ingredient amounts across every recipe in the user's shopping cart.
+
+    Runs a single GROUP BY query, so the cost depends on the number of
+    distinct ingredients rather than on recipes times ingredients.
+    """
+    rows = IngredientInRecipe.objects.filter(recipe__is_in_shopping_cart__user=user).values(
+        'ingredient__name', 'ingredient__measurement_unit').annotate(total=Sum('amount')).order_by('ingredient__name')
+    return [{'name': row['ingredient__name'], 'measurement_unit': row['ingredient__measurement_unit'],
+             'amount': row['total'] or 0} for row in rows]
+
+
+def shopping_list_by_recipe(user: Any) -> Dict[Recipe, List[Dict[str, Any]]]:
+    """
+    Groups the ingredients of the user's shopping cart by recipe,
+    loading all ingredient rows in one query.
+    """
+    recipes = Recipe.objects.filter(is_in_shopping_cart__user=user).order_by('name')
+    ingredients_by_recipe: Dict[Recipe, List[Dict[str, Any]]] = {recipe: [] for recipe in recipes}
+    recipes_by_id = {recipe.id: recipe for recipe in ingredients_by_recipe}
+    rows = IngredientInRecipe.objects.filter(recipe_id__in=list(recipes_by_id)).values(
+        'recipe_id', 'ingredient__name', 'ingredient__measurement_unit', 'amount').order_by('ingredient__name')
+    for row in rows:
+        ingredients_by_recipe[recipes_by_id[row['recipe_id']]].append(
+            {'name': row['ingredient__name'], 'amount': row['amount'], 'unit': row['ingredient__measurement_unit']})
+    return ingredients_by_recipe
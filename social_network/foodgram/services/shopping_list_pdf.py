@@ -0,0 +1,66 @@
+import io
+import os
+from typing import Any, Dict, List
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from foodgram.services.recipe_cache import RECIPES, get_generation, shopping_cart_resource
+
+FONT_NAME = 'RunicRegular'
+FONT_PATH = os.path.join(settings.BASE_DIR, 'data', 'RunicRegular.ttf')
+
+TITLE_FONT_SIZE = 32
+LINE_FONT_SIZE = 18
+LINE_HEIGHT = 30
+LEFT_MARGIN = 55
+TOP_OFFSET = 42
+BOTTOM_MARGIN = 50
+
+
+def register_fonts() -> None:
+    """
+    Registers the TTF font used by the shopping list PDF.
+    Called once from FoodgramConfig.ready().
+    """
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH, 'UTF-8'))
+
+
+def shopping_list_cache_key(user_id: int) -> str:
+    """
+    Key of the user's rendered PDF. It carries the generation of the
+    cart, bumped when a recipe is added or removed, and of recipes,
+    bumped when their ingredients change, so a cache hit needs no
+    aggregation query.
+    """
+    cart = shopping_cart_resource(user_id)
+    return f'shopping_cart_pdf_{user_id}_{get_generation(cart)}_{get_generation(RECIPES)}'
+
+
+def render_shopping_list_pdf(buying_list: List[Dict[str, Any]]) -> bytes:
+    """
+    Renders the aggregated shopping list, starting a new page whenever
+    the current one is full.
+    """
+    register_fonts()
+    buffer = io.BytesIO()
+    width, height = A4
+    page = canvas.Canvas(buffer, pagesize=A4)
+    page.setFont(FONT_NAME, size=TITLE_FONT_SIZE)
+    page.drawString(200, height - TOP_OFFSET, 'Buying list')
+    page.setFont(FONT_NAME, size=LINE_FONT_SIZE)
+    y = height - TOP_OFFSET - 2 * LINE_HEIGHT
+    for i, item in enumerate(buying_list, 1):
+        if y < BOTTOM_MARGIN:
+            page.showPage()
+            page.setFont(FONT_NAME, size=LINE_FONT_SIZE)
+            y = height - TOP_OFFSET
+        page.drawString(LEFT_MARGIN, y, f'{i}. {item["name"]} - {item["amount"]} {item["measurement_unit"]}')
+        y -= LINE_HEIGHT
+    page.showPage()
+    page.save()
+    return buffer.getvalue()
@@ -0,0 +1,137 @@
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q, QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from users.models import Follow, User
+
+from foodgram.models import FeedEntry, Recipe
+
+CELEBRITIES_KEY = 'feed_celebrity_authors'
+
+Position = Tuple[datetime, int]
+
+
+def celebrity_author_ids() -> FrozenSet[int]:
+    """
+    Authors with too many followers to fan out on write, as last marked by
+    refresh_celebrities. Cached, so feed reads may see a change late;
+    writes check the flag in the database with is_celebrity.
+    """
+    author_ids = cache.get(CELEBRITIES_KEY)
+    if author_ids is None:
+        author_ids = frozenset(User.objects.filter(feed_celebrity=True).values_list('pk', flat=True))
+        cache.set(CELEBRITIES_KEY, author_ids, settings.FEED_CELEBRITY_CACHE_TTL)
+    return author_ids
+
+
+def is_celebrity(author_id: int) -> bool:
+    return User.objects.filter(pk=author_id, feed_celebrity=True).exists()
+
+
+def refresh_celebrities() -> Tuple[int, int]:
+    """
+    Marks authors that reached FEED_CELEBRITY_FOLLOWERS as celebrities and
+    unmarks those that dropped below it, backfilling their followers'
+    feeds. An author is unmarked before the backfill, so recipes published
+    meanwhile are fanned out; until the cache expires, feeds still read
+    them directly. Returns (promoted, demoted) counts.
+    """
+    threshold = settings.FEED_CELEBRITY_FOLLOWERS
+    promoted = User.objects.filter(feed_celebrity=False, followers_count__gte=threshold).update(feed_celebrity=True)
+    demoted = list(User.objects.filter(feed_celebrity=True, followers_count__lt=threshold).values_list('pk', flat=True))
+    for author_id in demoted:
+        if User.objects.filter(pk=author_id, feed_celebrity=True, followers_count__lt=threshold).update(
+                feed_celebrity=False):
+            backfill(Follow.objects.filter(author_id=author_id).values_list('user_id', flat=True), author_id)
+    if promoted or demoted:
+        cache.delete(CELEBRITIES_KEY)
+    return promoted, len(demoted)
+
+
+def backfill(user_ids: Iterable[int], author_id: int) -> None:
+    recipes = list(Recipe.objects.filter(author_id=author_id).order_by('-created_at', '-id').values_list(
+        'id', 'created_at')[:settings.FEED_BACKFILL_SIZE])
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, recipe_id=recipe_id, author_id=author_id, created_at=created_at) for user_id in
+            user_ids for recipe_id, created_at in recipes], batch_size=1000, ignore_conflicts=True)
+
+
+def fan_out(recipe: Recipe) -> None:
+    if is_celebrity(recipe.author_id):
+        return
+    follower_ids = Follow.objects.filter(author_id=recipe.author_id).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        [FeedEntry(user_id=user_id, recipe=recipe, author_id=recipe.author_id, created_at=recipe.created_at) for
+            user_id in follower_ids.iterator()], batch_size=1000, ignore_conflicts=True)
+
+
+def encode_cursor(position: Position) -> str:
+    return f'{position[0].isoformat()}_{position[1]}'
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Position]:
+    if not cursor:
+        return None
+    try:
+        created_at, pk = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(pk)
+    except ValueError:
+        return None
+
+
+def _before(queryset: QuerySet, position: Optional[Position], id_field: str) -> QuerySet:
+    if position is None:
+        return queryset
+    created_at, pk = position
+    return queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{id_field}__lt': pk}))
+
+
+def subscription_feed(user: Any, limit: int, cursor: Optional[str] = None) -> Tuple[List[Recipe], Optional[str]]:
+    """
+    Newest recipes of the authors the user follows, limit per page, older
+    than cursor. Materialized FeedEntry rows are merged with recipes of
+    followed celebrity authors read directly, so the cost depends on the
+    page size and not on the number of follows.
+    """
+    position = decode_cursor(cursor)
+    entries = _before(FeedEntry.objects.filter(user=user), position, 'recipe_id')
+    rows: Dict[int, datetime] = {pk: created_at for created_at, pk in
+        entries.order_by('-created_at', '-recipe_id').values_list('created_at', 'recipe_id')[:limit + 1]}
+    celebrities = celebrity_author_ids()
+    if celebrities:
+        followed = list(Follow.objects.filter(user=user, author_id__in=celebrities).values_list('author_id', flat=True))
+        if followed:
+            recipes = _before(Recipe.objects.filter(author_id__in=followed), position, 'id')
+            rows.update({pk: created_at for created_at, pk in
+                recipes.order_by('-created_at', '-id').values_list('created_at', 'id')[:limit + 1]})
+    page = sorted(((created_at, pk) for pk, created_at in rows.items()), reverse=True)[:limit + 1]
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    page = page[:limit]
+    recipes_by_id = Recipe.objects.select_related('author').prefetch_related('ingredients', 'tags').in_bulk(
+        [pk for _, pk in page])
+    return [recipes_by_id[pk] for _, pk in page if pk in recipes_by_id], next_cursor
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_new_recipe(sender: Any, instance: Recipe, created: bool, **kwargs: Any) -> None:
+    if created:
+        fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_new_follow(sender: Any, instance: Follow, created: bool, **kwargs: Any) -> None:
+    if not created:
+        return
+    User.objects.filter(pk=instance.author_id).update(followers_count=F('followers_count') + 1)
+    if not is_celebrity(instance.author_id):
+        backfill([instance.user_id], instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_unfollowed_entries(sender: Any, instance: Follow, **kwargs: Any) -> None:
+    User.objects.filter(pk=instance.author_id, followers_count__gt=0).update(followers_count=F('followers_count') - 1)
+    FeedEntry.objects.filter(user_id=instance.user_id, author_id=instance.author_id).delete()
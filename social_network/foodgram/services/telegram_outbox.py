@@ -0,0 +1,146 @@
+import asyncio
+import html
+import logging
+import re
+import time
+from datetime import timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from foodgram.models import TelegramNotification
+
+logger = logging.getLogger(__name__)
+
+MAX_MESSAGE_LENGTH = 4096
+# Notifications fetched per chat and pass; the digest takes as many as fit
+MAX_DIGEST_SIZE = 50
+
+# (chat_id, text) -> (error or None, seconds Telegram asked to wait or None)
+Sender = Callable[[httpx.AsyncClient, str, str], Awaitable[Tuple[Optional[str], Optional[int]]]]
+
+
+def enqueue_notification(chat_id: str, text: str) -> None:
+    """
+    Queues a message for delivery. Call inside the transaction that
+    produced the event, so the message exists only if the event does.
+    """
+    if chat_id and settings.TELEGRAM_BOT_TOKEN:
+        TelegramNotification.objects.create(chat_id=chat_id, text=text)
+
+
+def _digest_text(texts: List[str]) -> str:
+    if len(texts) == 1:
+        return texts[0]
+    return f'🔔 Новых уведомлений: {len(texts)}\n\n' + '\n\n'.join(texts)
+
+
+def digest(texts: List[str]) -> Tuple[str, int]:
+    """
+    One HTML message from the leading texts that fit in
+    MAX_MESSAGE_LENGTH, escaped for parse_mode=HTML. Returns the message
+    and how many texts it covers; the rest are left for a later message.
+    A single text that is too long on its own is cut.
+    """
+    escaped = [html.escape(text, quote=False) for text in texts]
+    count = len(escaped)
+    while count > 1 and len(_digest_text(escaped[:count])) > MAX_MESSAGE_LENGTH:
+        count -= 1
+    text = _digest_text(escaped[:count])
+    if len(text) > MAX_MESSAGE_LENGTH:
+        # Do not leave half of an escaped entity such as &amp; at the cut
+        text = re.sub(r'&[^;\s]*$', '', text[:MAX_MESSAGE_LENGTH - 1]) + '…'
+    return text, count
+
+
+async def send_message(client: httpx.AsyncClient, chat_id: str, text: str) -> Tuple[Optional[str], Optional[int]]:
+    try:
+        response = await client.post(f'/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage',
+            data={'chat_id': chat_id, 'text': text, 'parse_mode': 'HTML'})
+    except httpx.HTTPError as e:
+        return f'{type(e).__name__}: {e}', None
+    if response.status_code == 200:
+        return None, None
+    retry_after = None
+    if response.status_code == 429:
+        retry_after = response.json().get('parameters', {}).get('retry_after')
+    return f'{response.status_code} {response.text}', retry_after
+
+
+class TelegramOutbox:
+    """
+    Delivers queued notifications: due rows are grouped by chat, each
+    chat gets at most one (digest) message per pass and per
+    TELEGRAM_CHAT_INTERVAL, and rows that do not fit in that message wait
+    for the next one. Sends run concurrently over one pooled client, and
+    failures are retried with exponential backoff.
+    """
+
+    def __init__(self, send: Sender = send_message) -> None:
+        self.send = send
+        self._last_sent: Dict[str, float] = {}
+
+    def _due(self, batch_size: int) -> Dict[str, List[TelegramNotification]]:
+        """
+        Due notifications of up to batch_size chats, oldest chats first.
+        Chats sent to within TELEGRAM_CHAT_INTERVAL are skipped in the
+        query, and each chat contributes at most MAX_DIGEST_SIZE rows, so
+        one busy chat cannot take the whole batch.
+        """
+        now = time.monotonic()
+        self._last_sent = {chat_id: sent_at for chat_id, sent_at in self._last_sent.items()
+            if now - sent_at < settings.TELEGRAM_CHAT_INTERVAL}
+        due = TelegramNotification.objects.filter(next_attempt_at__lte=timezone.now()).exclude(
+            chat_id__in=list(self._last_sent))
+        chat_ids = due.values('chat_id').annotate(oldest=Min('pk')).order_by('oldest').values_list('chat_id',
+            flat=True)[:batch_size]
+        return {chat_id: list(due.filter(chat_id=chat_id).order_by('pk')[:MAX_DIGEST_SIZE]) for chat_id in chat_ids}
+
+    async def _send_all(self, messages: Dict[str, str]) -> Dict[str, Tuple[Optional[str], Optional[int]]]:
+        semaphore = asyncio.Semaphore(settings.TELEGRAM_CONCURRENCY)
+
+        async def send(client: httpx.AsyncClient, chat_id: str, text: str) -> Tuple[Optional[str], Optional[int]]:
+            async with semaphore:
+                return await self.send(client, chat_id, text)
+
+        async with httpx.AsyncClient(base_url='https://api.telegram.org', timeout=10,
+                limits=httpx.Limits(max_connections=settings.TELEGRAM_CONCURRENCY)) as client:
+            results = await asyncio.gather(*(send(client, chat_id, text) for chat_id, text in messages.items()))
+        return dict(zip(messages, results))
+
+    def _reschedule(self, notifications: List[TelegramNotification], error: str, retry_after: Optional[int]) -> None:
+        for notification in notifications:
+            notification.attempts += 1
+            notification.last_error = error
+            if notification.attempts >= settings.TELEGRAM_MAX_ATTEMPTS:
+                notification.next_attempt_at = None
+                logger.error(f'Уведомление {notification.pk} для {notification.chat_id} не доставлено: {error}')
+            else:
+                delay = retry_after or settings.TELEGRAM_RETRY_BASE * 2 ** (notification.attempts - 1)
+                notification.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        TelegramNotification.objects.bulk_update(notifications, ['attempts', 'last_error', 'next_attempt_at'])
+
+    def drain(self, batch_size: int) -> Tuple[int, int]:
+        """One delivery pass over up to batch_size chats. Returns (sent, failed) notification counts."""
+        chats = self._due(batch_size)
+        if not chats:
+            return 0, 0
+        messages = {}
+        for chat_id, notifications in chats.items():
+            messages[chat_id], count = digest([notification.text for notification in notifications])
+            chats[chat_id] = notifications[:count]
+        results = asyncio.run(self._send_all(messages))
+        sent, failed = 0, 0
+        for chat_id, (error, retry_after) in results.items():
+            notifications = chats[chat_id]
+            self._last_sent[chat_id] = time.monotonic()
+            if error is None:
+                TelegramNotification.objects.filter(pk__in=[notification.pk for notification in notifications]).delete()
+                sent += len(notifications)
+            else:
+                self._reschedule(notifications, error, retry_after)
+                failed += len(notifications)
+        return sent, failed
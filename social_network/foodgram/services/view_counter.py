@@ -0,0 +1,96 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+
+from foodgram.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+
+class RecipeViewCounter:
+    """
+    Write-behind counter for recipe views.
+
+    Views are accumulated in process memory and written to the database
+    in bulk as atomic F() updates, so a popular recipe costs one UPDATE
+    per flush interval instead of one row rewrite per page view. A daemon
+    thread flushes every flush_interval seconds even when no views come
+    in, so a killed worker loses at most one interval of views.
+    """
+
+    def __init__(self, flush_interval: int, max_pending: int) -> None:
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._timer_pid = None
+        self._stopped = threading.Event()
+
+    def _start_timer(self) -> None:
+        # Started lazily and per process, since threads do not survive a fork
+        with self._lock:
+            if self._timer_pid == os.getpid():
+                return
+            self._timer_pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name='view-counter', daemon=True).start()
+
+    def _flush_periodically(self) -> None:
+        while not self._stopped.wait(max(self.flush_interval, 1)):
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+                close_old_connections()
+
+    def record(self, recipe_id: int) -> None:
+        """Call before reading views_count, so an inline flush is already in the value read"""
+        self._start_timer()
+        with self._lock:
+            self._pending[recipe_id] += 1
+            should_flush = (len(self._pending) >= self.max_pending
+                            or time.monotonic() - self._last_flush >= self.flush_interval)
+        if should_flush:
+            self.flush()
+
+    def close(self) -> None:
+        self._stopped.set()
+        self.flush()
+
+    def pending(self, recipe_id: int) -> int:
+        with self._lock:
+            return self._pending.get(recipe_id, 0)
+
+    def flush(self) -> int:
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        by_increment: Dict[int, List[int]] = defaultdict(list)
+        for recipe_id, increment in pending.items():
+            by_increment[increment].append(recipe_id)
+        try:
+            with transaction.atomic():
+                for increment, recipe_ids in by_increment.items():
+                    Recipe.objects.filter(pk__in=recipe_ids).update(
+                        views_count=Coalesce(F('views_count'), 0) + increment)
+        except Exception as e:
+            logger.error(f"Не удалось сохранить просмотры рецептов: {e}")
+            with self._lock:
+                self._pending.update(pending)
+            return 0
+        return sum(pending.values())
+
+
+recipe_view_counter = RecipeViewCounter(flush_interval=settings.VIEW_COUNT_FLUSH_INTERVAL,
+                                        max_pending=settings.VIEW_COUNT_MAX_PENDING)
+atexit.register(recipe_view_counter.close)
@@ -0,0 +1,92 @@
+from typing import AsyncIterator, Iterator
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.http import HttpRequest, StreamingHttpResponse
+
+from .services.ai_loop import ai_loop
+
+EVENT_STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+class AsyncStreamingHttpResponse(StreamingHttpResponse):
+    """
+    Streaming response over an async iterator. Django 3.2 only iterates
+    streaming responses synchronously: StreamingASGIHandler sends it as
+    the chunks come, other handlers get them through the shared
+    background loop.
+    """
+
+    is_async = True
+
+    @property
+    def streaming_content(self) -> AsyncIterator[bytes]:
+        async def content() -> AsyncIterator[bytes]:
+            async for part in self._iterator:
+                yield self.make_bytes(part)
+        return content()
+
+    @streaming_content.setter
+    def streaming_content(self, value: AsyncIterator[bytes]) -> None:
+        self._iterator = value.__aiter__()
+
+    async def aclose(self) -> None:
+        aclose = getattr(self._iterator, 'aclose', None)
+        if aclose is not None:
+            await aclose()
+
+    def __iter__(self) -> Iterator[bytes]:
+        return map(self.make_bytes, _iterate_on_loop(self._iterator))
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """ASGIHandler that sends AsyncStreamingHttpResponse chunks as they come"""
+
+    async def send_response(self, response, send):
+        if not getattr(response, 'is_async', False):
+            return await super().send_response(response, send)
+        headers = [(str(header).encode('ascii'), str(value).encode('latin1')) for header, value in response.items()]
+        headers += [(b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values()]
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+        try:
+            async for part in response.streaming_content:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        finally:
+            await response.aclose()
+        await send({'type': 'http.response.body'})
+        await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def wants_event_stream(request: HttpRequest) -> bool:
+    return (request.GET.get('stream', '').lower() in ('1', 'true')
+            or 'text/event-stream' in request.headers.get('Accept', ''))
+
+
+def _iterate_on_loop(content: AsyncIterator[bytes]) -> Iterator[bytes]:
+    iterator = content.__aiter__()
+    try:
+        while True:
+            try:
+                yield ai_loop.run(iterator.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        ai_loop.run(iterator.aclose())
+
+
+def event_stream_response(content: AsyncIterator[bytes]) -> StreamingHttpResponse:
+    """
+    text/event-stream response relaying `content` chunk by chunk. Under
+    WSGI (AI_ASYNC_VIEWS=False) each chunk is awaited on the shared
+    background loop.
+    """
+    if settings.AI_ASYNC_VIEWS:
+        response = AsyncStreamingHttpResponse(content, content_type='text/event-stream')
+    else:
+        response = StreamingHttpResponse(_iterate_on_loop(content), content_type='text/event-stream')
+    for header, value in EVENT_STREAM_HEADERS.items():
+        response[header] = value
+    return response
@@ -66,6 +66,11 @@ urlpatterns = [
         CommentView.as_view(),
         name="recipe_comments"
     ),
+    path(
+        "comments/",
+        CommentView.as_view(http_method_names=['get', 'head', 'options']),
+        name="comments"
+    ),
     path(
         "recipes/<int:recipe_id>/comments/<int:comment_id>/",
         CommentView.as_view(),
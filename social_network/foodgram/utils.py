@@ -1,14 +1,21 @@
-from typing import Any, Dict
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404
-from rest_framework import status
+from rest_framework import exceptions, status
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
 from rest_framework.response import Response
-import requests
-from django.conf import settings
-
-from .models import Recipe
-
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from users.models import Follow
 
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
+from .models import Recipe, Favorite, ShoppingCart
+from .services.ai_loop import ai_loop
 
 
 def custom_post(self: Any, request: Any, id: int, custom_serializer: Any, field: str) -> Response:
@@ -28,18 +35,88 @@ def custom_delete(self: Any, request: Any, id: int, model: Any) -> Response:
     return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-def send_telegram_notify(telegram_id: str, message: str) -> None:
-    print(f"[TELEGRAM_NOTIFY] Попытка отправки: {telegram_id=}, {message=}")
-    if not telegram_id:
-        print("[TELEGRAM_NOTIFY] Нет telegram_id, не отправляю")
-        return
-    data = {
-        "chat_id": telegram_id,
-        "text": message,
-        "parse_mode": "HTML"
+def load_recipe_flags(user: Any, recipe_ids: Iterable[int], author_ids: Iterable[int]) -> Dict[str, Set[int]]:
+    """
+    Loads is_favorited / is_in_shopping_cart / is_subscribed membership
+    for a whole page of recipes at once, so serializers don't query per row.
+    """
+    recipe_ids, author_ids = list(recipe_ids), set(author_ids)
+    if not user.is_authenticated or not recipe_ids:
+        return {'favorited_ids': set(), 'in_shopping_cart_ids': set(), 'subscribed_author_ids': set()}
+    return {
+        'favorited_ids': set(
+            Favorite.objects.filter(user=user, recipe_id__in=recipe_ids).values_list('recipe_id', flat=True)),
+        'in_shopping_cart_ids': set(
+            ShoppingCart.objects.filter(user=user, recipe_id__in=recipe_ids).values_list('recipe_id', flat=True)),
+        'subscribed_author_ids': set(
+            Follow.objects.filter(user=user, author_id__in=author_ids).values_list('author_id', flat=True)),
     }
+
+
+def get_recipe_flags_context(user: Any, recipes: Iterable[Recipe]) -> Dict[str, Set[int]]:
+    recipes = list(recipes)
+    return load_recipe_flags(user, [recipe.id for recipe in recipes], [recipe.author_id for recipe in recipes])
+
+
+def json_response(data: Any, status_code: int = status.HTTP_200_OK) -> JsonResponse:
+    return JsonResponse(data, status=status_code, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+def _authenticated_request(request: HttpRequest) -> Tuple[Optional[HttpResponse], Request]:
+    """
+    Wraps the request the way @api_view does (authentication, parsed
+    request.data) and checks that the user is authenticated.
+    """
+    drf_request = Request(request, parsers=[JSONParser(), FormParser(), MultiPartParser()],
+        authenticators=[authenticator() for authenticator in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    if request.method != 'POST':
+        return json_response({'detail': f'Метод "{request.method}" не разрешен.'},
+            status.HTTP_405_METHOD_NOT_ALLOWED), drf_request
     try:
-        resp = requests.post(TELEGRAM_API_URL, data=data, timeout=5)
-        print(f"[TELEGRAM_NOTIFY] Ответ Telegram: {resp.status_code} {resp.text}")
-    except Exception as e:
-        print(f"[TELEGRAM_NOTIFY] Ошибка отправки: {e}")
+        if not drf_request.user.is_authenticated:
+            raise exceptions.NotAuthenticated()
+        drf_request.data
+    except exceptions.APIException as e:
+        return json_response({'detail': str(e.detail)}, e.status_code), drf_request
+    return None, drf_request
+
+
+def ai_api_view(view: Callable[[Request], Awaitable[HttpResponse]]) -> Callable[[HttpRequest], Any]:
+    """
+    Turns a coroutine that only awaits the AI backend into a POST endpoint
+    for authenticated users.
+
+    With AI_ASYNC_VIEWS (set by backend/asgi.py) the endpoint is an
+    async view, so an in-flight AI call holds no worker thread. Otherwise
+    it is a sync view that runs the coroutine on the shared background
+    loop, for WSGI servers including runserver.
+
+    Like @api_view, the endpoint exposes a view class as `cls`, so
+    @swagger_auto_schema(method='post', ...) above it documents it.
+    """
+    if settings.AI_ASYNC_VIEWS:
+        @wraps(view)
+        async def endpoint(request: HttpRequest) -> HttpResponse:
+            error, drf_request = await sync_to_async(_authenticated_request)(request)
+            return error or await view(drf_request)
+    else:
+        @wraps(view)
+        def endpoint(request: HttpRequest) -> HttpResponse:
+            error, drf_request = _authenticated_request(request)
+            return error or ai_loop.run(view(drf_request))
+    endpoint.csrf_exempt = True
+    endpoint.cls, endpoint.initkwargs = _schema_view(view), {}
+    return endpoint
+
+
+def _schema_view(view: Callable[[Request], Awaitable[HttpResponse]]) -> type:
+    """
+    POST-only APIView for `view`: drf-yasg reads the schema from it, and
+    its post runs the coroutine on the shared background loop like the
+    sync endpoint does.
+    """
+    def post(self: APIView, request: Request) -> HttpResponse:
+        return ai_loop.run(view(request))
+
+    return type(view.__name__, (APIView,), {'__doc__': view.__doc__, 'http_method_names': ['post'], 'post': post,
+        'permission_classes': [IsAuthenticated], 'parser_classes': [JSONParser, FormParser, MultiPartParser]})
@@ -1,26 +1,24 @@
-import asyncio
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.core.paginator import Paginator
-from django.db import IntegrityError
-from django.db.models import Prefetch, Sum, Q
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch, Sum
 from django.http import HttpResponse
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils.cache import patch_cache_control
 from django.template.loader import render_to_string
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfgen import canvas
 from rest_framework import status
 from rest_framework import viewsets
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -30,10 +28,21 @@ from . import models, serializers
 from .filters import IngredientFilter, RecipeFilter
 from .forms import RecipeForm, IngredientForm
 from .models import Recipe, IngredientInRecipe, Favorite, Comment, Ingredient
-from .pagination import CartCustomPagination
+from .pagination import CartCustomPagination, FeedPagination
 from .permissions import IsOwnerOrReadOnly
 from .services.ai_service import AIService
-from .utils import custom_delete, custom_post, send_telegram_notify
+from .services.ingredient_index import INGREDIENTS, ingredient_index
+from .services.ingredient_resolver import resolve_ingredients
+from .services.recipe_cache import apply_live_fields, recipe_list_cache_key, versioned_key
+from .services.recipe_enrichment import enqueue as enqueue_enrichment, expansion_prefetches, parse_expand
+from .services.recipe_search import search_recipes
+from .services.shopping_list import aggregate_shopping_list, shopping_list_by_recipe
+from .services.shopping_list_pdf import render_shopping_list_pdf, shopping_list_cache_key
+from .services.subscription_feed import subscription_feed
+from .services.telegram_outbox import enqueue_notification
+from .services.view_counter import recipe_view_counter
+from .streaming import event_stream_response, wants_event_stream
+from .utils import ai_api_view, custom_delete, custom_post, get_recipe_flags_context, json_response, load_recipe_flags
 
 User = get_user_model()
 
@@ -45,12 +54,9 @@ def index(request):
     subscription_recipes = []
     has_subscriptions = False
     if request.user.is_authenticated:
-        follows = Follow.objects.filter(user=request.user)
-        if follows.exists():
-            has_subscriptions = True
-            authors = [f.author for f in follows]
-            subscription_recipes = models.Recipe.objects.filter(author__in=authors).select_related(
-                'author').prefetch_related('ingredients', 'tags').order_by('-created_at')[:6]
+        has_subscriptions = Follow.objects.filter(user=request.user).exists()
+        if has_subscriptions:
+            subscription_recipes, _ = subscription_feed(request.user, 6)
 
     return render(request, 'index.html',
                   {'latest_recipes': latest_recipes, 'subscription_recipes': subscription_recipes,
@@ -67,9 +73,7 @@ def recipe_list(request):
 
     search_query = request.GET.get('search')
     if search_query:
-        recipes = recipes.filter(Q(name__icontains=search_query) | Q(text__icontains=search_query) | Q(
-            author__username__icontains=search_query) | Q(ingredients__name__icontains=search_query) | Q(
-            tags__name__icontains=search_query)).distinct()
+        recipes = search_recipes(recipes, search_query)
 
     paginator = Paginator(recipes, 9)
     page_number = request.GET.get('page')
@@ -85,11 +89,10 @@ def recipe_list(request):
 
 
 def recipe_detail(request, pk):
+    recipe_view_counter.record(pk)
     recipe = models.Recipe.objects.select_related('author').prefetch_related('ingredients', 'tags',
         'ingredients_amount', 'comments').get(pk=pk)
-
-    recipe.views_count += 1
-    recipe.save()
+    recipe.views_count = (recipe.views_count or 0) + recipe_view_counter.pending(recipe.pk)
 
     is_in_shopping_cart = False
     is_subscribed = False
@@ -117,22 +120,9 @@ def favorites(request):
 
 @login_required
 def shopping_list(request):
-    shopping_cart = models.ShoppingCart.objects.filter(user=request.user).select_related('recipe')
-
-    ingredients_by_recipe = {}
-    for cart_item in shopping_cart:
-        recipe = cart_item.recipe
-        recipe_ingredients = models.IngredientInRecipe.objects.filter(recipe=recipe).select_related('ingredient')
-
-        if recipe not in ingredients_by_recipe:
-            ingredients_by_recipe[recipe] = []
-
-        for ingredient in recipe_ingredients:
-            ingredients_by_recipe[recipe].append({'name': ingredient.ingredient.name, 'amount': ingredient.amount,
-                'unit': ingredient.ingredient.measurement_unit})
-
     return render(request, 'shopping_list.html',
-                  {'ingredients_by_recipe': ingredients_by_recipe, 'shopping_cart': shopping_cart})
+                  {'ingredients_by_recipe': shopping_list_by_recipe(request.user),
+                      'buying_list': aggregate_shopping_list(request.user)})
 
 
 @login_required
@@ -166,7 +156,7 @@ def profile(request, username):
 
     user_recipes = models.Recipe.objects.filter(author=user).select_related('author').prefetch_related('ingredients',
         'tags')
-    total_subscribers = Follow.objects.filter(author=user).count()
+    total_subscribers = user.followers_count
     total_favorites = Favorite.objects.filter(recipe__author=user).count()
     total_views = models.Recipe.objects.filter(author=user).aggregate(total_views=Sum('views_count'))[
                       'total_views'] or 0
@@ -308,6 +298,47 @@ class IngredientsView(viewsets.ModelViewSet):
                 return Response(serializer.data, status=200)
             return Response({'error': 'Ингредиент уже существует, но не найден.'}, status=400)
 
+    @swagger_auto_schema(operation_description="Список ингредиентов. Ответ помечается ETag, который меняется при "
+                                               "любом изменении справочника; If-None-Match дает 304 без обращения к БД",
+        responses={200: serializers.IngredientSerializer(many=True), 304: "Not Modified"})
+    def list(self, request, *args, **kwargs):
+        etag = f'"{versioned_key(INGREDIENTS, sorted(request.query_params.lists()))}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+        response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+    @swagger_auto_schema(operation_description="Найти ингредиенты по названиям без учета регистра и создать "
+                                                "недостающие. Ответ в порядке запроса",
+        request_body=serializers.IngredientResolveSerializer(many=True),
+        responses={200: serializers.IngredientSerializer(many=True), 400: "Bad Request"})
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def resolve(self, request):
+        serializer = serializers.IngredientResolveSerializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        items = [(item['name'], item['measurement_unit']) for item in serializer.validated_data]
+        return Response(resolve_ingredients(items))
+
+    @swagger_auto_schema(operation_description="Автодополнение ингредиентов по началу или части названия",
+        manual_parameters=[
+            openapi.Parameter('name', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER)],
+        responses={200: serializers.IngredientSerializer(many=True)})
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def autocomplete(self, request):
+        """
+        Served from the in-memory ingredient index, without touching the database.
+        """
+        try:
+            limit = int(request.query_params.get('limit', 10))
+        except ValueError:
+            return Response({'error': 'Параметр limit должен быть числом.'}, status=400)
+        limit = max(1, min(limit, settings.INGREDIENT_AUTOCOMPLETE_MAX_LIMIT))
+        response = Response(ingredient_index.search(request.query_params.get('name', ''), limit))
+        patch_cache_control(response, public=True, max_age=settings.INGREDIENT_AUTOCOMPLETE_MAX_AGE)
+        return response
+
 
 class TagView(viewsets.ModelViewSet):
     """
@@ -327,11 +358,11 @@ class RecipeView(viewsets.ModelViewSet):
     """
     queryset = models.Recipe.objects.select_related('author').prefetch_related(
         Prefetch('ingredients', queryset=models.Ingredient.objects.only('name', 'measurement_unit')),
-        Prefetch('tags', queryset=models.Tag.objects.only('name', 'color', 'slug')), 'ingredients_amount')
+        Prefetch('tags', queryset=models.Tag.objects.only('name', 'color', 'slug')), 'ingredients_amount__ingredient')
     serializer_class = serializers.CreateRecipeSerializer
     permission_classes = (IsOwnerOrReadOnly,)
     filterset_class = RecipeFilter
-    pagination_class = CartCustomPagination
+    pagination_class = FeedPagination
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
@@ -341,14 +372,47 @@ class RecipeView(viewsets.ModelViewSet):
     @swagger_auto_schema(operation_description="Получить список рецептов",
         responses={200: serializers.ShowRecipeSerializer(many=True)})
     def list(self, request, *args, **kwargs):
-        cache_key = f'recipe_list_{request.query_params}'
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return Response(cached_data)
-
-        response = super().list(request, *args, **kwargs)
-        cache.set(cache_key, response.data, settings.CACHE_TTL)
-        return response
+        cache_key = recipe_list_cache_key(request)
+        data = cache.get(cache_key)
+        if data is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset)
+            recipes = page if page is not None else queryset
+            context = self.get_serializer_context()
+            context.update(load_recipe_flags(AnonymousUser(), [], []))
+            serializer = self.get_serializer(recipes, many=True, context=context)
+            data = self.get_paginated_response(serializer.data).data if page is not None else serializer.data
+            cache.set(cache_key, data, settings.RECIPE_CACHE_TTL)
+        return Response(apply_live_fields(request.user, data))
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related(*expansion_prefetches(getattr(self, 'expand', [])))
+        return queryset
+
+    @swagger_auto_schema(operation_description="Получить рецепт. ?expand=history,advice,pairings добавляет "
+                                               "сохраненные историю блюда, советы шефа и напитки",
+        manual_parameters=[openapi.Parameter('expand', openapi.IN_QUERY, type=openapi.TYPE_STRING)],
+        responses={200: serializers.ShowRecipeSerializer, 400: "Bad Request", 404: "Not Found"})
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            self.expand = parse_expand(request.query_params.get('expand', ''))
+        except ValueError as e:
+            return Response({'expand': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        instance = self.get_object()
+        data = self.get_serializer(instance).data
+        if 'history' in self.expand:
+            history = instance.history.all()
+            data['history'] = serializers.RecipeHistorySerializer(history[0]).data if history else None
+            if not history:
+                enqueue_enrichment([instance.pk], changed=False)
+        if 'advice' in self.expand:
+            advice = instance.chef_advice.all()
+            data['advice'] = serializers.ChefAdviceSerializer(advice[0]).data if advice else None
+        if 'pairings' in self.expand:
+            data['pairings'] = serializers.DrinkPairingSerializer(instance.drink_pairings.all(), many=True).data
+        return Response(data)
 
     @swagger_auto_schema(operation_description="Создать новый рецепт", request_body=serializers.CreateRecipeSerializer,
         responses={201: serializers.CreateRecipeSerializer, 400: "Bad Request", 401: "Unauthorized"})
@@ -419,45 +483,13 @@ class ShoppingCartView(APIView):
 @api_view(["GET"])
 @permission_classes([IsAuthenticatedOrReadOnly])
 def download_shopping_cart(request):
-    cache_key = f'shopping_cart_{request.user.id}'
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return cached_data
-
-    shopping_cart = models.ShoppingCart.objects.select_related('recipe').prefetch_related(
-        'recipe__ingredients_amount__ingredient').filter(user=request.user)
-
-    buying_list = {}
-    for record in shopping_cart:
-        recipe = record.recipe
-        ingredients = models.IngredientInRecipe.objects.filter(recipe=recipe)
-        for ingredient in ingredients:
-            amount = ingredient.amount
-            name = ingredient.ingredient.name
-            measurement_unit = ingredient.ingredient.measurement_unit
-            if name not in buying_list:
-                buying_list[name] = {"measurement_unit": measurement_unit, "amount": amount, }
-            else:
-                buying_list[name]["amount"] = (buying_list[name]["amount"] + amount)
-    wishlist = []
-    for name, data in buying_list.items():
-        wishlist.append(f"{name} - {data['amount']} ({data['measurement_unit']})\n")
-    pdfmetrics.registerFont(TTFont("RunicRegular", "data/RunicRegular.ttf", "UTF-8"))
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = ('attachment; '
-                                       'filename="shopping_list.pdf"')
-    page = canvas.Canvas(response)
-    page.setFont('RunicRegular', size=32)
-    page.drawString(200, 800, 'Buying list')
-    page.setFont('RunicRegular', size=18)
-    height = 760
-    for i, (name, data) in enumerate(buying_list.items(), 1):
-        page.drawString(55, height, (f'{i}. {name} - {data["amount"]} '
-                                     f'{data["measurement_unit"]}'))
-        height -= 30
-    page.showPage()
-    page.save()
-    cache.set(cache_key, response, settings.CACHE_TTL)
+    cache_key = shopping_list_cache_key(request.user.id)
+    pdf = cache.get(cache_key)
+    if pdf is None:
+        pdf = render_shopping_list_pdf(aggregate_shopping_list(request.user))
+        cache.set(cache_key, pdf, settings.CACHE_TTL)
+    response = HttpResponse(pdf, content_type='application/pdf')
+    response['Content-Disposition'] = 'attachment; filename="shopping_list.pdf"'
     return response
 
 
@@ -472,11 +504,26 @@ class CommentView(APIView):
     def get_queryset(self, recipe_id):
         return models.Comment.objects.filter(recipe_id=recipe_id).select_related('author')
 
-    @swagger_auto_schema(operation_description="Получить список комментариев к рецепту",
-        responses={200: serializers.CommentSerializer(many=True), 404: "Not Found"})
-    def get(self, request, recipe_id):
-        comments = self.get_queryset(recipe_id)
-        serializer = self.serializer_class(comments, many=True)
+    @swagger_auto_schema(operation_description="Получить список комментариев к рецепту. Без рецепта в URL - "
+                                               "последние комментарии ко всем рецептам или к ?recipe__in=1,2,3",
+        manual_parameters=[openapi.Parameter('recipe__in', openapi.IN_QUERY, type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY, type=openapi.TYPE_INTEGER)],
+        responses={200: serializers.CommentSerializer(many=True), 400: "Bad Request", 404: "Not Found"})
+    def get(self, request, recipe_id=None):
+        if recipe_id is not None:
+            comments = self.get_queryset(recipe_id)
+            serializer = self.serializer_class(comments, many=True)
+            return Response(serializer.data)
+        try:
+            limit = min(int(request.query_params.get('limit', 50)), settings.COMMENTS_MAX_LIMIT)
+            recipe_ids = [int(pk) for pk in request.query_params.get('recipe__in', '').split(',') if pk]
+        except ValueError:
+            return Response({'error': 'Параметры limit и recipe__in должны быть числами.'}, status=400)
+        comments = models.Comment.objects.select_related('author')
+        if recipe_ids:
+            comments = comments.filter(recipe_id__in=recipe_ids)
+        serializer = serializers.RecipeCommentSerializer(comments.order_by('-created', '-id')[:max(limit, 0)],
+            many=True)
         return Response(serializer.data)
 
     @swagger_auto_schema(operation_description="Добавить комментарий к рецепту",
@@ -486,14 +533,15 @@ class CommentView(APIView):
         recipe = get_object_or_404(Recipe, id=recipe_id)
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
-            comment = serializer.save(author=request.user, recipe=recipe)
-            # Уведомление владельцу рецепта
-            author = recipe.author
-            if author.telegram_id and getattr(author, 'telegram_notify', False):
-                url = request.build_absolute_uri(recipe.get_absolute_url()) if hasattr(recipe,
-                                                                                       'get_absolute_url') else ''
-                msg = f'📝 Новый комментарий к вашему рецепту "{recipe.name}":\n{comment.text}\n{url}'
-                send_telegram_notify(author.telegram_id, msg)
+            with transaction.atomic():
+                comment = serializer.save(author=request.user, recipe=recipe)
+                # Уведомление владельцу рецепта
+                author = recipe.author
+                if author.telegram_id and getattr(author, 'telegram_notify', False):
+                    url = request.build_absolute_uri(recipe.get_absolute_url()) if hasattr(recipe,
+                                                                                           'get_absolute_url') else ''
+                    msg = f'📝 Новый комментарий к вашему рецепту "{recipe.name}":\n{comment.text}\n{url}'
+                    enqueue_notification(author.telegram_id, msg)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -514,26 +562,27 @@ class ProfileView(APIView):
     """
     permission_classes = [IsAuthenticatedOrReadOnly]
     serializer_class = serializers.ShowRecipeSerializer
-    pagination_class = CartCustomPagination
+    pagination_class = FeedPagination
 
     @swagger_auto_schema(operation_description="Получить профиль пользователя и его рецепты",
         responses={200: serializers.ShowRecipeSerializer(many=True), 404: "Not Found"})
     def get(self, request, username):
         user = get_object_or_404(User, username=username)
-        recipes = Recipe.objects.filter(author=user)
+        recipes = RecipeView.queryset.filter(author=user)
 
-        total_subscribers = Follow.objects.filter(author=user).count()
+        total_subscribers = user.followers_count
         total_favorites = Favorite.objects.filter(recipe__author=user).count()
         total_views = Recipe.objects.filter(author=user).aggregate(total_views=Sum('views_count'))['total_views'] or 0
 
         paginator = self.pagination_class()
-        page = paginator.paginate_queryset(recipes, request)
+        page = paginator.paginate_queryset(recipes, request, view=self)
 
+        context = {'request': request, **get_recipe_flags_context(request.user, page if page is not None else recipes)}
         if page is not None:
-            serializer = self.serializer_class(page, many=True, context={'request': request})
+            serializer = self.serializer_class(page, many=True, context=context)
             return paginator.get_paginated_response(serializer.data)
 
-        serializer = self.serializer_class(recipes, many=True, context={'request': request})
+        serializer = self.serializer_class(recipes, many=True, context=context)
         return Response(serializer.data)
 
 
@@ -543,17 +592,15 @@ def add_comment(request, recipe_id):
     if request.method == 'POST':
         text = request.POST.get('text')
         if text:
-            Comment.objects.create(recipe=recipe, author=request.user, text=text)
-            # Уведомление владельцу рецепта
-            author = recipe.author
-            print(
-                f"[DEBUG] author.telegram_id={getattr(author, 'telegram_id', None)}, author.telegram_notify={getattr(author, 'telegram_notify', None)}")
-            if author.telegram_id and getattr(author, 'telegram_notify', False):
-                url = request.build_absolute_uri(recipe.get_absolute_url()) if hasattr(recipe,
-                                                                                       'get_absolute_url') else ''
-                msg = f'📝 Новый комментарий к вашему рецепту "{recipe.name}":\n{text}\n{url}'
-                print(f"[DEBUG] Отправляю уведомление: {msg}")
-                send_telegram_notify(author.telegram_id, msg)
+            with transaction.atomic():
+                Comment.objects.create(recipe=recipe, author=request.user, text=text)
+                # Уведомление владельцу рецепта
+                author = recipe.author
+                if author.telegram_id and getattr(author, 'telegram_notify', False):
+                    url = request.build_absolute_uri(recipe.get_absolute_url()) if hasattr(recipe,
+                                                                                           'get_absolute_url') else ''
+                    msg = f'📝 Новый комментарий к вашему рецепту "{recipe.name}":\n{text}\n{url}'
+                    enqueue_notification(author.telegram_id, msg)
     return redirect('recipe_detail', pk=recipe_id)
 
 
@@ -567,18 +614,9 @@ def delete_comment(request, recipe_id, comment_id):
 
 @login_required
 def my_subscriptions(request):
-    follows = Follow.objects.filter(user=request.user).select_related('author')
-    authors = [f.author for f in follows]
-    recipes = models.Recipe.objects.filter(author__in=authors).select_related('author').prefetch_related('ingredients',
-                                                                                                         'tags').order_by(
-        '-created_at')
-
-    paginator = Paginator(recipes, 6)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
+    recipes, next_cursor = subscription_feed(request.user, 6, request.GET.get('cursor'))
     return render(request, 'my_subscriptions.html',
-                  {'recipes': page_obj, 'authors': authors, 'is_paginated': True, 'page_obj': page_obj})
+                  {'recipes': recipes, 'next_cursor': next_cursor, 'is_first_page': not request.GET.get('cursor')})
 
 
 @swagger_auto_schema(method='post', operation_description="Сгенерировать рецепт на основе текстового описания",
@@ -594,27 +632,23 @@ def my_subscriptions(request):
             'cooking_time': openapi.Schema(type=openapi.TYPE_INTEGER),
             'difficulty': openapi.Schema(type=openapi.TYPE_STRING)}), 400: "Bad Request", 401: "Unauthorized",
         500: "Internal Server Error"})
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def generate_recipe_by_text(request):
+@ai_api_view
+async def generate_recipe_by_text(request):
+    """Recipe generated by the AI backend from a prompt, cooking time and difficulty."""
     try:
         prompt = request.data.get('prompt')
         cooking_time = request.data.get('cooking_time', 30)
         difficulty = request.data.get('difficulty', 'medium')
 
         if not prompt:
-            return Response({'error': 'Необходимо указать название рецепта'}, status=status.HTTP_400_BAD_REQUEST)
+            return json_response({'error': 'Необходимо указать название рецепта'}, status.HTTP_400_BAD_REQUEST)
 
         ai_service = AIService()
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        recipe = loop.run_until_complete(
-            ai_service.generate_recipe(prompt=prompt, cooking_time=cooking_time, difficulty=difficulty))
-        loop.close()
+        recipe = await ai_service.generate_recipe(prompt=prompt, cooking_time=cooking_time, difficulty=difficulty)
 
-        return Response(recipe)
+        return json_response(recipe)
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return json_response({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
 @swagger_auto_schema(method='post', operation_description="Сгенерировать изображение рецепта",
@@ -622,52 +656,55 @@ def generate_recipe_by_text(request):
         properties={'prompt': openapi.Schema(type=openapi.TYPE_STRING)}),
     responses={200: openapi.Response(description="Изображение рецепта", content={'image/png': {}}), 400: "Bad Request",
         401: "Unauthorized", 500: "Internal Server Error"})
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def generate_recipe_image(request):
+@ai_api_view
+async def generate_recipe_image(request):
+    """PNG image of a dish generated by the AI backend from a prompt."""
     try:
         prompt = request.data.get('prompt')
         if not prompt:
-            return Response({'error': 'Необходимо указать промпт для генерации изображения'},
-                status=status.HTTP_400_BAD_REQUEST)
+            return json_response({'error': 'Необходимо указать промпт для генерации изображения'},
+                status.HTTP_400_BAD_REQUEST)
 
         ai_service = AIService()
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        image_data = loop.run_until_complete(ai_service.generate_image(prompt))
-        loop.close()
+        image_data = await ai_service.generate_image(prompt)
 
         if not image_data:
-            return Response({'error': 'Не удалось сгенерировать изображение'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return json_response({'error': 'Не удалось сгенерировать изображение'},
+                status.HTTP_500_INTERNAL_SERVER_ERROR)
 
         return HttpResponse(image_data, content_type='image/png')
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return json_response({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
-@swagger_auto_schema(method='post', operation_description="Задать вопрос AI ассистенту",
+@swagger_auto_schema(method='post', operation_description="Задать вопрос AI ассистенту. С ?stream=1 или "
+                                                           "Accept: text/event-stream ответ приходит потоком "
+                                                           "server-sent events: recipes, delta..., done",
+    manual_parameters=[openapi.Parameter('stream', openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN)],
     request_body=openapi.Schema(type=openapi.TYPE_OBJECT, required=['question'],
         properties={'question': openapi.Schema(type=openapi.TYPE_STRING)}), responses={
         200: openapi.Schema(type=openapi.TYPE_OBJECT, properties={'answer': openapi.Schema(type=openapi.TYPE_STRING)}),
         400: "Bad Request", 401: "Unauthorized", 500: "Internal Server Error"})
-@api_view(['POST'])
-@permission_classes([IsAuthenticated])
-def ask_ai(request):
+@ai_api_view
+async def ask_ai(request):
+    """
+    Answer of the AI assistant to a question, with relevant recipes.
+    With ?stream=1 or Accept: text/event-stream the answer is relayed as
+    server-sent events (recipes, delta..., done) while it is generated.
+    """
     try:
         question = request.data.get('question')
         if not question:
-            return Response({'error': 'Необходимо указать вопрос'}, status=status.HTTP_400_BAD_REQUEST)
+            return json_response({'error': 'Необходимо указать вопрос'}, status.HTTP_400_BAD_REQUEST)
 
         ai_service = AIService()
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        response = loop.run_until_complete(ai_service.ask(question))
-        loop.close()
+        if wants_event_stream(request):
+            return event_stream_response(ai_service.ask_stream(question))
+        response = await ai_service.ask(question)
 
         if 'error' in response:
-            return Response({'error': response['error']}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return json_response({'error': response['error']}, status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        return Response(response)
+        return json_response(response)
     except Exception as e:
-        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return json_response({'error': str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -1,4 +1,11 @@
-from foodgram.models import Recipe, Tag, Ingredient, IngredientInRecipe
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from foodgram.models import Recipe, Tag, Ingredient, IngredientInRecipe, Favorite
+from foodgram.services import recipe_search
+from foodgram.services.recipe_search import search_recipes
 from rest_framework import status
 from rest_framework.test import APITestCase
 from users.models import User
@@ -6,6 +13,7 @@ from users.models import User
 
 class RecipeTests(APITestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
         self.client.force_authenticate(user=self.user)
 
@@ -60,3 +68,141 @@ class RecipeTests(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Recipe.objects.count(), 0)
+
+    def _create_recipes(self, count):
+        for i in range(count):
+            recipe = Recipe.objects.create(author=self.user, name=f'Recipe {i}', text='Text', cooking_time=30)
+            recipe.tags.add(self.tag)
+            IngredientInRecipe.objects.create(recipe=recipe, ingredient=self.ingredient, amount=100)
+
+    def _count_list_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/recipes/?limit=50')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_recipe_list_query_count_does_not_grow_with_page(self):
+        self._create_recipes(1)
+        single = self._count_list_queries()
+        self._create_recipes(5)
+        several = self._count_list_queries()
+        self.assertEqual(single, several)
+
+    def test_recipe_list_user_flags(self):
+        self._create_recipes(2)
+        favorite = Recipe.objects.first()
+        Favorite.objects.create(user=self.user, recipe=favorite)
+        response = self.client.get('/api/recipes/')
+        flags = {item['id']: item['is_favorited'] for item in response.data['results']}
+        self.assertTrue(flags[favorite.id])
+        self.assertEqual(sum(flags.values()), 1)
+
+    def test_recipe_list_cache_invalidated_on_change(self):
+        self._create_recipes(1)
+        self.client.get('/api/recipes/')
+        recipe = Recipe.objects.get()
+        recipe.name = 'Renamed Recipe'
+        recipe.save()
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.data['results'][0]['name'], 'Renamed Recipe')
+
+    def test_recipe_list_cache_does_not_leak_user_flags(self):
+        self._create_recipes(1)
+        Favorite.objects.create(user=self.user, recipe=Recipe.objects.get())
+        response = self.client.get('/api/recipes/')
+        self.assertTrue(response.data['results'][0]['is_favorited'])
+
+        other_user = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        self.client.force_authenticate(user=other_user)
+        response = self.client.get('/api/recipes/')
+        self.assertFalse(response.data['results'][0]['is_favorited'])
+
+    def test_recipe_list_counters_are_not_cached(self):
+        self._create_recipes(1)
+        self.client.get('/api/recipes/')
+        Recipe.objects.update(views_count=7, favorites_count=2)
+        result = self.client.get('/api/recipes/').data['results'][0]
+        self.assertEqual((result['views_count'], result['favorites_count']), (7, 2))
+
+    def test_recipe_list_cache_invalidated_on_author_change(self):
+        self._create_recipes(1)
+        self.client.get('/api/recipes/')
+        self.user.first_name = 'Иван'
+        self.user.save()
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.data['results'][0]['author']['first_name'], 'Иван')
+
+    def test_search_recipes(self):
+        self._create_recipes(2)
+        soup = Recipe.objects.create(author=self.user, name='Борщ', text='Text', cooking_time=30)
+        beet = Ingredient.objects.create(name='свекла', measurement_unit='g')
+        IngredientInRecipe.objects.create(recipe=soup, ingredient=beet, amount=300)
+        self.assertEqual(list(search_recipes(Recipe.objects.all(), 'свекла')), [soup])
+        self.assertEqual(list(search_recipes(Recipe.objects.all(), 'Борщ')), [soup])
+
+    def test_recipe_list_cursor_pagination(self):
+        self._create_recipes(5)
+        response = self.client.get('/api/recipes/?pagination=cursor&limit=2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        names = [item['name'] for item in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            names += [item['name'] for item in response.data['results']]
+        self.assertEqual(names, [f'Recipe {i}' for i in reversed(range(5))])
+
+        response = self.client.get('/api/recipes/?pagination=cursor&count=true')
+        self.assertEqual(response.data['count'], 5)
+
+    def test_cursor_pagination_keys_on_created_at_and_id(self):
+        self._create_recipes(5)
+        created_at = Recipe.objects.first().created_at
+        Recipe.objects.update(created_at=created_at)
+        first = self.client.get('/api/recipes/?pagination=cursor&limit=2')
+        Recipe.objects.create(author=self.user, name='Recipe 5', text='Text', cooking_time=30)
+        Recipe.objects.filter(name='Recipe 5').update(created_at=created_at)
+
+        names = [item['name'] for item in first.data['results']]
+        response = first
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            names += [item['name'] for item in response.data['results']]
+        self.assertEqual(names, [f'Recipe {i}' for i in reversed(range(5))])
+
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual([item['name'] for item in previous.data['results']], ['Recipe 2', 'Recipe 1'])
+        self.assertEqual(self.client.get('/api/recipes/?cursor=bogus').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_search_vector_follows_searchable_changes_only(self):
+        self._create_recipes(2)
+        recipe = Recipe.objects.first()
+        with patch.object(recipe_search, 'full_text_search_enabled', return_value=True), \
+                patch.object(recipe_search, 'update_search_vectors') as update:
+            recipe.favorites_count += 1
+            recipe.save()
+            update.assert_not_called()
+
+            recipe.name = 'Борщ'
+            recipe.save()
+            self.assertEqual(list(update.call_args[0][0]), [recipe])
+
+            update.reset_mock()
+            self.tag.name = 'Супы'
+            self.tag.save()
+            update.assert_called_once()
+            self.assertEqual(set(update.call_args[0][0]), set(Recipe.objects.all()))
+
+            update.reset_mock()
+            self.user.username = 'chef'
+            self.user.save()
+            update.assert_called_once()
+            self.assertEqual(set(update.call_args[0][0]), set(Recipe.objects.all()))
+
+    def test_search_vector_follows_tag_clear(self):
+        self._create_recipes(2)
+        recipes = set(Recipe.objects.all())
+        with patch.object(recipe_search, 'full_text_search_enabled', return_value=True), \
+                patch.object(recipe_search, 'update_search_vectors') as update:
+            self.tag.recipes.clear()
+        self.assertEqual(set(update.call_args[0][0]), recipes)
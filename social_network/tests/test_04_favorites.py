@@ -1,4 +1,8 @@
-from foodgram.models import Recipe, Favorite, ShoppingCart
+import re
+
+from foodgram.models import Recipe, Favorite, ShoppingCart, Ingredient, IngredientInRecipe
+from foodgram.services.shopping_list import aggregate_shopping_list
+from foodgram.services.shopping_list_pdf import render_shopping_list_pdf
 from rest_framework import status
 from rest_framework.test import APITestCase
 from users.models import User
@@ -43,3 +47,36 @@ class FavoriteAndCartTests(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+    def test_download_shopping_cart_is_cached_until_cart_changes(self):
+        url = '/api/recipes/download_shopping_cart/'
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        first = self.client.get(url).content
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).content, first)
+
+        other_recipe = Recipe.objects.create(author=self.user, name='Other Recipe', text='Text', cooking_time=10)
+        IngredientInRecipe.objects.create(recipe=other_recipe,
+            ingredient=Ingredient.objects.create(name='flour', measurement_unit='g'), amount=100)
+        ShoppingCart.objects.create(user=self.user, recipe=other_recipe)
+        self.assertNotEqual(self.client.get(url).content, first)
+
+    def test_aggregate_shopping_list(self):
+        other_recipe = Recipe.objects.create(author=self.user, name='Other Recipe', text='Text', cooking_time=10)
+        flour = Ingredient.objects.create(name='flour', measurement_unit='g')
+        milk = Ingredient.objects.create(name='milk', measurement_unit='ml')
+        IngredientInRecipe.objects.create(recipe=self.recipe, ingredient=flour, amount=100)
+        IngredientInRecipe.objects.create(recipe=other_recipe, ingredient=flour, amount=50)
+        IngredientInRecipe.objects.create(recipe=other_recipe, ingredient=milk, amount=200)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.user, recipe=other_recipe)
+        with self.assertNumQueries(1):
+            buying_list = aggregate_shopping_list(self.user)
+        self.assertEqual(buying_list, [{'name': 'flour', 'measurement_unit': 'g', 'amount': 150},
+                                       {'name': 'milk', 'measurement_unit': 'ml', 'amount': 200}])
+
+    def test_long_shopping_list_is_paginated(self):
+        buying_list = [{'name': f'ingredient {i}', 'measurement_unit': 'g', 'amount': i} for i in range(100)]
+        pdf = render_shopping_list_pdf(buying_list)
+        self.assertGreater(len(re.findall(rb'/Type /Page\b(?!s)', pdf)), 1)
@@ -1,3 +1,5 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
 
@@ -37,3 +39,10 @@ class ProfileTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data['results']), 1)
         self.assertEqual(response.data['results'][0]['id'], self.other_user.id)
+
+    def test_profile_does_not_count_follows(self):
+        Follow.objects.create(user=self.user, author=self.other_user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/profile/{self.other_user.username}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse([query for query in queries.captured_queries if 'users_follow' in query['sql']])
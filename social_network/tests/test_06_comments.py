@@ -26,3 +26,22 @@ class CommentTests(APITestCase):
         response = self.client.delete(url)
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Comment.objects.count(), 0)
+
+    def test_latest_comments_across_recipes(self):
+        other = Recipe.objects.create(author=self.user, name='Other Recipe', text='Text', cooking_time=10)
+        hidden = Recipe.objects.create(author=self.user, name='Hidden Recipe', text='Text', cooking_time=10)
+        for i in range(3):
+            Comment.objects.create(recipe=self.recipe, author=self.user, text=f'First {i}')
+            Comment.objects.create(recipe=other, author=self.user, text=f'Other {i}')
+        Comment.objects.create(recipe=hidden, author=self.user, text='Hidden')
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/comments/?recipe__in={self.recipe.id},{other.id}&limit=4')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([comment['text'] for comment in response.data], ['Other 2', 'First 2', 'Other 1', 'First 1'])
+        self.assertEqual(response.data[0]['recipe'], other.id)
+
+        self.assertEqual(self.client.get('/api/comments/?recipe__in=x').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.post('/api/comments/', {'text': 'x'}, format='json').status_code,
+            status.HTTP_405_METHOD_NOT_ALLOWED)
+        self.assertEqual(self.client.delete('/api/comments/').status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
@@ -0,0 +1,50 @@
+import threading
+from unittest.mock import patch
+
+from foodgram import views
+from foodgram.models import Recipe
+from foodgram.services.view_counter import RecipeViewCounter
+from rest_framework.test import APITestCase
+from users.models import User
+
+
+class RecipeViewCounterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+        self.recipe = Recipe.objects.create(author=self.user, name='Test Recipe', text='Test Description',
+            cooking_time=30)
+
+    def test_views_are_buffered_until_flush(self):
+        counter = RecipeViewCounter(flush_interval=3600, max_pending=100)
+        for _ in range(3):
+            counter.record(self.recipe.id)
+        self.assertEqual(counter.pending(self.recipe.id), 3)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.views_count, 0)
+
+        self.assertEqual(counter.flush(), 3)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.views_count, 3)
+        self.assertEqual(counter.pending(self.recipe.id), 0)
+
+    def test_flush_when_interval_elapsed(self):
+        counter = RecipeViewCounter(flush_interval=0, max_pending=100)
+        counter.record(self.recipe.id)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.views_count, 1)
+
+    def test_page_that_triggers_flush_shows_its_view(self):
+        with patch.object(views, 'recipe_view_counter', RecipeViewCounter(flush_interval=0, max_pending=100)):
+            response = self.client.get(f'/recipes/{self.recipe.id}/')
+        self.assertEqual(response.context['recipe'].views_count, 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.views_count, 1)
+
+    def test_idle_counter_is_flushed_by_timer(self):
+        counter = RecipeViewCounter(flush_interval=1, max_pending=100)
+        flushed = threading.Event()
+        with patch.object(counter, 'flush', side_effect=lambda: flushed.set()) as flush:
+            counter.record(self.recipe.id)
+            self.assertFalse(flush.called)
+            self.assertTrue(flushed.wait(5))
+            counter.close()
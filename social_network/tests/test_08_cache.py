@@ -0,0 +1,60 @@
+import tempfile
+
+from backend.cache import TwoTierCache
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from fakeredis import FakeConnection, FakeServer
+
+SHARED_DIR = tempfile.mkdtemp()
+
+
+def worker_cache(l1_alias):
+    return TwoTierCache('', {'OPTIONS': {'L1': l1_alias, 'L2': 'shared', 'L1_TIMEOUT': 60}})
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'worker_1': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker_1'},
+    'worker_2': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker_2'},
+    'shared': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': SHARED_DIR},
+})
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.worker_1 = worker_cache('worker_1')
+        self.worker_2 = worker_cache('worker_2')
+        self.worker_1.clear()
+        self.worker_2.clear()
+
+    def test_value_set_by_one_worker_is_read_by_another(self):
+        self.worker_1.set('recipe', {'name': 'borsch'})
+        self.assertEqual(self.worker_2.get('recipe'), {'name': 'borsch'})
+        self.assertEqual(caches['worker_2'].get('recipe'), {'name': 'borsch'})
+
+    def test_missing_key_returns_default(self):
+        self.assertEqual(self.worker_1.get('missing', 'default'), 'default')
+
+    def test_incr_is_shared_and_drops_local_copy(self):
+        self.worker_1.set('generation', 1)
+        self.assertEqual(self.worker_2.get('generation'), 1)
+        self.assertEqual(self.worker_1.incr('generation'), 2)
+        self.assertEqual(self.worker_1.get('generation'), 2)
+        caches['worker_2'].delete('generation')
+        self.assertEqual(self.worker_2.get('generation'), 2)
+
+    def test_delete_removes_both_tiers(self):
+        self.worker_1.set('recipe', 'value')
+        self.worker_1.delete('recipe')
+        self.assertIsNone(self.worker_1.get('recipe'))
+        self.assertIsNone(self.worker_2.get('recipe'))
+
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'worker_1': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker_1'},
+    'worker_2': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker_2'},
+    'shared': {'BACKEND': settings.SHARED_CACHE_BACKENDS['redis'], 'LOCATION': 'redis://localhost:6379/1',
+        'OPTIONS': {'CONNECTION_POOL_KWARGS': {'connection_class': FakeConnection, 'server': FakeServer()}}},
+})
+class RedisTwoTierCacheTests(TwoTierCacheTests):
+    """The same checks with django-redis as the shared tier, talking to an in-process fakeredis server"""
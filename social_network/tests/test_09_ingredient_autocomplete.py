@@ -0,0 +1,67 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from foodgram.models import Ingredient
+from foodgram.services.ingredient_index import INGREDIENTS, ingredient_index
+from foodgram.services.recipe_cache import bump_generation
+from rest_framework.test import APITestCase
+
+
+class IngredientAutocompleteTests(APITestCase):
+    url = '/api/ingredients/autocomplete/'
+
+    def setUp(self):
+        cache.clear()
+        for name, unit in [('Сахар', 'г'), ('сахарная пудра', 'г'), ('Ванильный сахар', 'г'), ('Соль', 'г'),
+                           ('Молоко', 'мл')]:
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+
+    def test_prefix_matches_come_before_infix_matches(self):
+        response = self.client.get(self.url, {'name': 'САХ'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item['name'] for item in response.data], ['Сахар', 'сахарная пудра', 'Ванильный сахар'])
+        self.assertEqual(set(response.data[0]), {'id', 'name', 'measurement_unit'})
+        self.assertIn('max-age=', response['Cache-Control'])
+
+    def test_limit(self):
+        response = self.client.get(self.url, {'name': 'сах', 'limit': 1})
+        self.assertEqual([item['name'] for item in response.data], ['Сахар'])
+        self.assertEqual(self.client.get(self.url, {'name': 'сах', 'limit': 'x'}).status_code, 400)
+
+    def test_warm_index_does_not_query_database(self):
+        self.client.get(self.url, {'name': 'мол'})
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'name': 'мол'})
+        self.assertEqual([item['name'] for item in response.data], ['Молоко'])
+
+    def test_index_refreshes_on_ingredient_changes(self):
+        self.client.get(self.url, {'name': 'сол'})
+        salt = Ingredient.objects.get(name='Соль')
+        salt.name = 'Соль морская'
+        salt.save()
+        Ingredient.objects.create(name='Солод', measurement_unit='г')
+        response = self.client.get(self.url, {'name': 'сол'})
+        self.assertEqual([item['name'] for item in response.data], ['Солод', 'Соль морская'])
+        salt.delete()
+        response = self.client.get(self.url, {'name': 'сол'})
+        self.assertEqual([item['name'] for item in response.data], ['Солод'])
+
+    def test_warmed_index_serves_first_request_without_database(self):
+        ingredient_index.warm()
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'name': 'мол'})
+        self.assertEqual([item['name'] for item in response.data], ['Молоко'])
+
+    def test_generation_is_checked_once_per_interval(self):
+        ingredient_index.warm()
+        Ingredient.objects.filter(name='Соль').update(name='Солод')
+        bump_generation(INGREDIENTS)  # as another worker would after its edit
+        later = time.monotonic() + 60
+        with patch.object(ingredient_index, 'check_interval', 60):
+            with self.assertNumQueries(0):
+                response = self.client.get(self.url, {'name': 'сол'})
+            self.assertEqual([item['name'] for item in response.data], ['Соль'])
+            with patch.object(time, 'monotonic', return_value=later):
+                response = self.client.get(self.url, {'name': 'сол'})
+        self.assertEqual([item['name'] for item in response.data], ['Солод'])
@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from foodgram.models import FeedEntry, Recipe
+from foodgram.services.subscription_feed import refresh_celebrities, subscription_feed
+from users.models import Follow, User
+
+
+class SubscriptionFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='reader', email='reader@example.com', password='testpass123')
+        self.authors = [
+            User.objects.create_user(username=f'author{i}', email=f'author{i}@example.com', password='testpass123')
+            for i in range(3)]
+
+    def _publish(self, author, name):
+        return Recipe.objects.create(author=author, name=name, text='Text', cooking_time=10)
+
+    def test_new_recipes_are_fanned_out_to_followers(self):
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        recipe = self._publish(self.authors[0], 'Followed')
+        self._publish(self.authors[1], 'Not followed')
+        self.assertTrue(FeedEntry.objects.filter(user=self.reader, recipe=recipe).exists())
+        recipes, next_cursor = subscription_feed(self.reader, 6)
+        self.assertEqual(recipes, [recipe])
+        self.assertIsNone(next_cursor)
+
+    def test_follow_backfills_and_unfollow_clears(self):
+        recipe = self._publish(self.authors[0], 'Older')
+        follow = Follow.objects.create(user=self.reader, author=self.authors[0])
+        self.assertEqual(subscription_feed(self.reader, 6)[0], [recipe])
+        follow.delete()
+        self.assertEqual(subscription_feed(self.reader, 6)[0], [])
+
+    def test_cursor_pages_are_newest_first(self):
+        for author in self.authors:
+            Follow.objects.create(user=self.reader, author=author)
+        published = [self._publish(self.authors[i % 3], f'Recipe {i}') for i in range(5)]
+        names, cursor = [], None
+        while True:
+            recipes, cursor = subscription_feed(self.reader, 2, cursor)
+            names += [recipe.name for recipe in recipes]
+            if cursor is None:
+                break
+        self.assertEqual(names, [recipe.name for recipe in reversed(published)])
+
+    def test_page_cost_does_not_depend_on_follow_count(self):
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        self._publish(self.authors[0], 'Recipe')
+        subscription_feed(self.reader, 6)
+        with self.assertNumQueries(4):
+            subscription_feed(self.reader, 6)
+        for author in self.authors[1:]:
+            Follow.objects.create(user=self.reader, author=author)
+            self._publish(author, 'Recipe')
+        with self.assertNumQueries(4):
+            subscription_feed(self.reader, 6)
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=1)
+    def test_celebrity_recipes_are_read_on_demand(self):
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        self.assertEqual(refresh_celebrities(), (1, 0))
+        recipe = self._publish(self.authors[0], 'Celebrity')
+        self.assertFalse(FeedEntry.objects.exists())
+        self.assertEqual(subscription_feed(self.reader, 6)[0], [recipe])
+
+    def test_follower_counts_are_maintained(self):
+        follow = Follow.objects.create(user=self.reader, author=self.authors[0])
+        Follow.objects.create(user=self.authors[1], author=self.authors[0])
+        self.authors[0].refresh_from_db()
+        self.assertEqual(self.authors[0].followers_count, 2)
+        follow.delete()
+        self.authors[0].refresh_from_db()
+        self.assertEqual(self.authors[0].followers_count, 1)
+
+    @override_settings(FEED_CELEBRITY_FOLLOWERS=1)
+    def test_demoted_celebrity_is_backfilled_by_refresh(self):
+        Follow.objects.create(user=self.reader, author=self.authors[0])
+        refresh_celebrities()
+        recipe = self._publish(self.authors[0], 'Celebrity')
+        with override_settings(FEED_CELEBRITY_FOLLOWERS=2):
+            self.assertEqual(subscription_feed(self.reader, 6)[0], [recipe])
+            self.assertFalse(FeedEntry.objects.exists())
+            self.assertEqual(refresh_celebrities(), (0, 1))
+            self.assertTrue(FeedEntry.objects.filter(user=self.reader, recipe=recipe).exists())
+            self.assertEqual(subscription_feed(self.reader, 6)[0], [recipe])
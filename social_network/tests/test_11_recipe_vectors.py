@@ -0,0 +1,77 @@
+import hashlib
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+from django.test import TestCase, override_settings
+from foodgram.models import Ingredient, IngredientInRecipe, Recipe, RecipeVectorQueue, Tag
+from foodgram.services import ai_service
+from foodgram.services.ai_service import CircuitBreaker
+from foodgram.services.recipe_vectors import RecipeVectorIndexer, content_hash, embed, recipe_payload
+from users.models import User
+
+
+def encode(texts):
+    """Deterministic stand-in for the sentence model: 8 floats from a text digest."""
+    return [[byte / 255 for byte in hashlib.sha256(text.encode()).digest()[:8]] for text in texts]
+
+
+@override_settings(QDRANT_URL='http://qdrant:6333')
+class RecipeVectorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='cook', email='cook@example.com', password='testpass123')
+        self.recipe = Recipe.objects.create(author=self.user, name='Борщ', text='Сварить', cooking_time=60)
+        IngredientInRecipe.objects.create(recipe=self.recipe,
+            ingredient=Ingredient.objects.create(name='свекла', measurement_unit='г'), amount=300)
+        self.recipe.tags.add(Tag.objects.create(name='Обед', slug='lunch'))
+
+    def test_payload_has_fields_read_by_ask(self):
+        payload = recipe_payload(self.recipe)
+        self.assertEqual(payload, {'id': self.recipe.pk, 'name': 'Борщ', 'text': 'Сварить', 'ingredients': ['свекла'],
+            'amounts': [300.0], 'units': ['г'], 'tags': ['Обед']})
+        self.recipe.name = 'Борщ украинский'
+        self.assertNotEqual(content_hash(payload), content_hash(recipe_payload(self.recipe)))
+
+    def test_changes_are_queued(self):
+        queued = set(RecipeVectorQueue.objects.values_list('recipe_id', flat=True))
+        self.assertEqual(queued, {self.recipe.pk})
+        RecipeVectorQueue.objects.all().delete()
+        recipe_id = self.recipe.pk
+        self.recipe.delete()
+        self.assertIn(recipe_id, RecipeVectorQueue.objects.values_list('recipe_id', flat=True))
+
+    @override_settings(QDRANT_URL='')
+    def test_nothing_queued_without_qdrant(self):
+        RecipeVectorQueue.objects.all().delete()
+        self.recipe.save()
+        self.assertFalse(RecipeVectorQueue.objects.exists())
+
+    def test_index_against_in_memory_qdrant(self):
+        qdrant_client = pytest.importorskip('qdrant_client')
+        client = qdrant_client.QdrantClient(':memory:')
+        encoded = []
+        indexer = RecipeVectorIndexer(client, lambda texts: encoded.extend(texts) or encode(texts), 'recipes')
+
+        self.assertEqual(indexer.drain_queue(10), 1)
+        self.assertFalse(RecipeVectorQueue.objects.exists())
+        point = client.retrieve('recipes', ids=[self.recipe.pk])[0]
+        self.assertEqual(point.payload['ingredients'], ['свекла'])
+
+        self.assertEqual(indexer.index([self.recipe.pk]), (0, 1, 0))
+        self.assertEqual(len(encoded), 1)
+
+        recipe_id = self.recipe.pk
+        self.recipe.delete()
+        self.assertEqual(indexer.drain_queue(10), 1)
+        self.assertEqual(client.retrieve('recipes', ids=[recipe_id]), [])
+
+    def test_embed_through_ai_backend(self):
+        def handler(request):
+            self.assertEqual(request.url.path, '/api/v1/embeddings')
+            return httpx.Response(200, json={'vectors': encode(json.loads(request.content)['texts'])})
+
+        client = httpx.AsyncClient(base_url='http://ai', transport=httpx.MockTransport(handler))
+        with patch.object(ai_service, 'get_client', return_value=client), \
+                patch.object(ai_service, 'circuit_breaker', CircuitBreaker(1, 3600)):
+            self.assertEqual(embed(['Борщ']), encode(['Борщ']))
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from foodgram.models import Ingredient
+from rest_framework.test import APITestCase
+
+User = get_user_model()
+
+
+class IngredientResolveTests(APITestCase):
+    url = '/api/ingredients/resolve/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cook', email='cook@example.com', password='password')
+        self.sugar = Ingredient.objects.create(name='Сахар', measurement_unit='г')
+        self.milk = Ingredient.objects.create(name='Молоко', measurement_unit='мл')
+
+    def test_requires_authentication(self):
+        response = self.client.post(self.url, [{'name': 'Сахар', 'measurement_unit': 'г'}], format='json')
+        self.assertEqual(response.status_code, 401)
+
+    def test_resolves_existing_and_creates_missing_in_request_order(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, [{'name': 'мука', 'measurement_unit': 'г'},
+            {'name': 'САХАР', 'measurement_unit': 'ст. л.'}, {'name': 'молоко', 'measurement_unit': 'мл'},
+            {'name': 'Мука', 'measurement_unit': 'г'}], format='json')
+        self.assertEqual(response.status_code, 200)
+        flour = Ingredient.objects.get(name='мука')
+        self.assertEqual([item['id'] for item in response.data], [flour.id, self.sugar.id, self.milk.id, flour.id])
+        self.assertEqual(Ingredient.objects.count(), 3)
+
+        response = self.client.get('/api/ingredients/autocomplete/', {'name': 'мук'})
+        self.assertEqual([item['id'] for item in response.data], [flour.id])
+
+    def test_validation(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(self.url, [{'name': 'Соль'}], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_list_etag(self):
+        response = self.client.get('/api/ingredients/')
+        etag = response['ETag']
+        response = self.client.get('/api/ingredients/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        response = self.client.get('/api/ingredients/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,113 @@
+from unittest.mock import AsyncMock, patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from foodgram.models import ChefAdvice, DrinkPairing, Ingredient, IngredientInRecipe, Recipe, RecipeEnrichmentQueue, \
+    RecipeHistory
+from foodgram.services.ai_service import AIService
+from foodgram.services.recipe_enrichment import drain_queue
+from rest_framework.test import APITestCase
+from users.models import User
+
+HISTORY = {'history': 'Старинное блюдо', 'interesting_facts': ['Факт'], 'cultural_significance': 'Праздничное'}
+ADVICE = {'tips': ['Не торопиться'], 'variations': [], 'common_mistakes': [], 'serving_suggestions': ['Горячим']}
+PAIRINGS = {'pairings': [{'name': 'Квас', 'type': 'напиток', 'description': 'Хлебный', 'pairing_reason': 'Классика'}],
+    'general_advice': 'Холодное'}
+
+
+def ai_patches(history=HISTORY):
+    history_mock = AsyncMock(side_effect=history) if callable(history) else AsyncMock(return_value=history)
+    return [patch.object(AIService, 'generate_recipe_history', history_mock),
+        patch.object(AIService, 'generate_chef_advice', AsyncMock(return_value=ADVICE)),
+        patch.object(AIService, 'generate_drink_pairings', AsyncMock(return_value=PAIRINGS))]
+
+
+@override_settings(RECIPE_ENRICHMENT_ENABLED=True)
+class RecipeEnrichmentTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='cook', email='cook@example.com', password='testpass123')
+        self.recipe = Recipe.objects.create(author=self.user, name='Борщ', text='Сварить', cooking_time=60)
+        IngredientInRecipe.objects.create(recipe=self.recipe,
+            ingredient=Ingredient.objects.create(name='свекла', measurement_unit='г'), amount=300)
+
+    def drain(self, history=HISTORY):
+        patches = ai_patches(history)
+        for p in patches:
+            p.start()
+        try:
+            return drain_queue(10)
+        finally:
+            for p in patches:
+                p.stop()
+
+    def test_enrichments_are_generated_once_per_content(self):
+        self.assertEqual(self.drain(), (1, 0))
+        self.assertFalse(RecipeEnrichmentQueue.objects.exists())
+        self.assertEqual(RecipeHistory.objects.get(recipe=self.recipe).history_text, 'Старинное блюдо')
+        self.assertEqual(DrinkPairing.objects.filter(recipe=self.recipe).count(), 1)
+
+        self.recipe.favorites_count = 1
+        self.recipe.save()
+        self.assertEqual(self.drain(), (0, 0))
+
+        self.recipe.name = 'Борщ украинский'
+        self.recipe.save()
+        self.assertEqual(self.drain(), (1, 0))
+        self.assertEqual(RecipeHistory.objects.filter(recipe=self.recipe).count(), 1)
+        self.assertEqual(ChefAdvice.objects.filter(recipe=self.recipe).count(), 1)
+
+    def test_failed_recipes_stay_queued(self):
+        self.assertEqual(self.drain(history={'error': 'timeout'}), (0, 1))
+        self.assertTrue(RecipeEnrichmentQueue.objects.filter(recipe_id=self.recipe.pk).exists())
+        self.assertFalse(RecipeHistory.objects.exists())
+
+    @override_settings(RECIPE_ENRICHMENT_MAX_ATTEMPTS=2)
+    def test_malformed_response_is_retried_then_parked(self):
+        other = Recipe.objects.create(author=self.user, name='Щи', text='Сварить', cooking_time=40)
+
+        def history(payload):
+            return HISTORY if payload['name'] == 'Щи' else {'text': 'Без истории'}
+
+        self.assertEqual(self.drain(history), (1, 1))
+        self.assertTrue(RecipeHistory.objects.filter(recipe=other).exists())
+        row = RecipeEnrichmentQueue.objects.get()
+        self.assertEqual((row.recipe_id, row.attempts), (self.recipe.pk, 1))
+        self.assertIn('Без истории', row.last_error)
+
+        self.assertEqual(self.drain(history), (0, 1))
+        self.assertEqual(self.drain(history), (0, 0))
+        self.assertEqual(RecipeEnrichmentQueue.objects.get().attempts, 2)
+
+        self.recipe.name = 'Борщ зеленый'
+        self.recipe.save()
+        self.assertEqual(RecipeEnrichmentQueue.objects.get().attempts, 0)
+        self.assertEqual(self.drain(), (1, 0))
+
+    def test_reads_and_counter_saves_do_not_queue(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        for _ in range(3):
+            self.client.get(url, {'expand': 'history'})
+        self.assertEqual(RecipeEnrichmentQueue.objects.count(), 1)
+
+        RecipeEnrichmentQueue.objects.all().delete()
+        self.recipe.favorites_count = 5
+        self.recipe.save()
+        self.assertFalse(RecipeEnrichmentQueue.objects.exists())
+
+    def test_detail_expand(self):
+        url = f'/api/recipes/{self.recipe.id}/'
+        response = self.client.get(url, {'expand': 'history,pairings'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['history'])
+        self.assertEqual(response.data['pairings'], [])
+        self.assertNotIn('advice', response.data)
+
+        self.drain()
+        response = self.client.get(url, {'expand': 'history,advice,pairings'})
+        self.assertEqual(response.data['history']['history_text'], 'Старинное блюдо')
+        self.assertEqual(response.data['advice']['tips'], ['Не торопиться'])
+        self.assertEqual(response.data['pairings'][0]['name'], 'Квас')
+
+        self.assertNotIn('history', self.client.get(url).data)
+        self.assertEqual(self.client.get(url, {'expand': 'calories'}).status_code, 400)
@@ -0,0 +1,103 @@
+from django.test import override_settings
+from django.utils import timezone
+from foodgram.models import Recipe, TelegramNotification
+from foodgram.services.telegram_outbox import MAX_MESSAGE_LENGTH, TelegramOutbox, digest
+from rest_framework.test import APITestCase
+from users.models import User
+
+
+class FakeTelegram:
+    def __init__(self, errors=()):
+        self.errors = list(errors)
+        self.sent = []
+
+    async def __call__(self, client, chat_id, text):
+        self.sent.append((chat_id, text))
+        if self.errors:
+            return self.errors.pop(0)
+        return None, None
+
+
+@override_settings(TELEGRAM_BOT_TOKEN='token', TELEGRAM_CHAT_INTERVAL=0, TELEGRAM_RETRY_BASE=5)
+class TelegramOutboxTests(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', email='author@example.com', password='testpass123',
+            telegram_id='100', telegram_notify=True)
+        self.reader = User.objects.create_user(username='reader', email='reader@example.com', password='testpass123')
+        self.recipe = Recipe.objects.create(author=self.author, name='Борщ', text='Сварить', cooking_time=60)
+        self.client.force_authenticate(user=self.reader)
+
+    def comment(self, text):
+        response = self.client.post(f'/api/recipes/{self.recipe.id}/comments/', {'text': text}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_comment_queues_notification(self):
+        self.comment('Вкусно')
+        notification = TelegramNotification.objects.get()
+        self.assertEqual(notification.chat_id, '100')
+        self.assertIn('Вкусно', notification.text)
+
+    def test_burst_is_sent_as_one_digest(self):
+        self.comment('Первый')
+        self.comment('Второй')
+        telegram = FakeTelegram()
+        self.assertEqual(TelegramOutbox(send=telegram).drain(100), (2, 0))
+        self.assertEqual(len(telegram.sent), 1)
+        self.assertIn('Первый', telegram.sent[0][1])
+        self.assertIn('Второй', telegram.sent[0][1])
+        self.assertFalse(TelegramNotification.objects.exists())
+
+    def test_failures_are_retried_with_backoff(self):
+        self.comment('Вкусно')
+        outbox = TelegramOutbox(send=FakeTelegram(errors=[('502 Bad Gateway', None)]))
+        self.assertEqual(outbox.drain(100), (0, 1))
+        notification = TelegramNotification.objects.get()
+        self.assertEqual(notification.attempts, 1)
+        self.assertGreater(notification.next_attempt_at, timezone.now())
+        self.assertEqual(outbox.drain(100), (0, 0))
+
+        TelegramNotification.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.drain(100), (1, 0))
+
+    @override_settings(TELEGRAM_MAX_ATTEMPTS=1)
+    def test_delivery_is_given_up_after_max_attempts(self):
+        self.comment('Вкусно')
+        TelegramOutbox(send=FakeTelegram(errors=[('403 Forbidden', None)])).drain(100)
+        notification = TelegramNotification.objects.get()
+        self.assertIsNone(notification.next_attempt_at)
+        self.assertEqual(notification.last_error, '403 Forbidden')
+
+    @override_settings(TELEGRAM_CHAT_INTERVAL=3600)
+    def test_chat_rate_limit(self):
+        self.comment('Первый')
+        outbox = TelegramOutbox(send=FakeTelegram())
+        self.assertEqual(outbox.drain(100), (1, 0))
+        self.comment('Второй')
+        self.assertEqual(outbox.drain(100), (0, 0))
+        self.assertTrue(TelegramNotification.objects.exists())
+
+    def test_long_burst_is_split_across_passes(self):
+        for i in range(5):
+            TelegramNotification.objects.create(chat_id='100', text=f'{i} ' + 'а' * 1500)
+        telegram = FakeTelegram()
+        outbox = TelegramOutbox(send=telegram)
+        self.assertEqual(outbox.drain(100), (2, 0))
+        self.assertEqual(outbox.drain(100), (2, 0))
+        self.assertEqual(outbox.drain(100), (1, 0))
+        self.assertFalse(TelegramNotification.objects.exists())
+        self.assertTrue(all(len(text) <= MAX_MESSAGE_LENGTH for _, text in telegram.sent))
+        self.assertEqual([text.count('а' * 1500) for _, text in telegram.sent], [2, 2, 1])
+
+    def test_text_is_escaped_and_cut_outside_entities(self):
+        self.assertEqual(digest(['<b>Вкусно</b> & просто']), ('&lt;b&gt;Вкусно&lt;/b&gt; &amp; просто', 1))
+        text, count = digest(['а' * (MAX_MESSAGE_LENGTH - 3) + '&&'])
+        self.assertEqual(count, 1)
+        self.assertTrue(text.endswith('а…'))
+        self.assertLessEqual(len(text), MAX_MESSAGE_LENGTH)
+
+    def test_busy_chat_does_not_starve_others(self):
+        TelegramNotification.objects.bulk_create([TelegramNotification(chat_id='100', text='Шумно') for _ in range(5)])
+        TelegramNotification.objects.create(chat_id='200', text='Тихо')
+        telegram = FakeTelegram()
+        self.assertEqual(TelegramOutbox(send=telegram).drain(2), (6, 0))
+        self.assertEqual(sorted(chat_id for chat_id, _ in telegram.sent), ['100', '200'])
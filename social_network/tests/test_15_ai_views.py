@@ -0,0 +1,50 @@
+from unittest.mock import AsyncMock, patch
+
+from django.test import RequestFactory, override_settings
+from foodgram.services.ai_service import AIService
+from foodgram.utils import ai_api_view, json_response
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from users.models import User
+
+
+class AIViewTests(APITestCase):
+    url = '/api/ask/'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cook', email='cook@example.com', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+
+    def test_requires_authentication_and_post(self):
+        self.assertEqual(self.client.post(self.url, {'question': 'Что приготовить?'}, format='json').status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+
+    def test_ask(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        answer = {'answer': 'Борщ', 'relevant_recipes': []}
+        with patch.object(AIService, 'ask', AsyncMock(return_value=answer)) as ask:
+            response = self.client.post(self.url, {'question': 'Что приготовить?'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), answer)
+        ask.assert_awaited_once_with('Что приготовить?')
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, 400)
+
+    @override_settings(AI_ASYNC_VIEWS=False)
+    def test_sync_fallback_runs_on_background_loop(self):
+        async def echo(request):
+            return json_response({'question': request.data['question']})
+
+        view = ai_api_view(echo)
+        for endpoint in (view, view.cls.as_view()):
+            request = RequestFactory().post(self.url, {'question': 'Суп?'}, content_type='application/json',
+                HTTP_AUTHORIZATION=f'Token {self.token.key}')
+            response = endpoint(request)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.content.decode(), '{"question": "Суп?"}')
+
+    def test_endpoints_are_documented(self):
+        paths = self.client.get('/swagger/?format=openapi').json()['paths']
+        for path in ('/api/recipes/generate-by-text/', '/api/recipes/generate-image/', '/api/ask/'):
+            self.assertIn('post', paths[path])
+        self.assertIn('stream', [parameter['name'] for parameter in paths['/api/ask/']['post']['parameters']])
@@ -0,0 +1,107 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+from django.test import SimpleTestCase
+from foodgram.services import ai_service
+from foodgram.services.ai_service import AIService, CircuitBreaker
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def test_opens_after_threshold_and_lets_one_trial_through(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_failure()
+        self.assertTrue(breaker.is_open)
+
+        self.assertTrue(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.allow())
+
+    def test_stays_open_until_reset_timeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=3600)
+        breaker.record_failure()
+        self.assertFalse(breaker.allow())
+
+
+class AIServiceTests(SimpleTestCase):
+    def run_with(self, handler, coroutine_factory, breaker):
+        def client():
+            return httpx.AsyncClient(base_url='http://ai', transport=httpx.MockTransport(handler))
+
+        async def run():
+            async with client() as shared:
+                with patch.object(ai_service, 'get_client', return_value=shared), \
+                        patch.object(ai_service, 'circuit_breaker', breaker):
+                    return await coroutine_factory()
+
+        return asyncio.run(run())
+
+    def test_fails_fast_while_backend_is_down(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request.url.path)
+            raise httpx.ConnectError('connection refused', request=request)
+
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=3600)
+
+        async def ask_three_times():
+            return [await AIService().ask('Что приготовить?') for _ in range(3)]
+
+        results = self.run_with(handler, ask_three_times, breaker)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(results[2], {'error': AIService.UNAVAILABLE})
+
+    def test_client_errors_do_not_open_circuit(self):
+        def handler(request):
+            return httpx.Response(422, json={'detail': 'invalid'})
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=3600)
+        result = self.run_with(handler, lambda: AIService().ask(''), breaker)
+        self.assertIn('error', result)
+        self.assertFalse(breaker.is_open)
+
+    def test_cancelled_trial_reopens_circuit(self):
+        async def handler(request):
+            await asyncio.sleep(10)
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+
+        async def cancelled_ask():
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(AIService().ask('Что приготовить?'), 0.01)
+
+        self.run_with(handler, cancelled_ask, breaker)
+        self.assertTrue(breaker.is_open)
+        self.assertTrue(breaker.allow())
+
+    def test_endpoint_timeouts(self):
+        service = AIService()
+        self.assertLess(service._timeout('/api/v1/recipes/ask').read, service._timeout('/generate-image').read)
+
+    def test_submit_and_poll_job(self):
+        def handler(request):
+            if request.method == 'POST':
+                self.assertEqual(request.url.path, '/api/v1/jobs')
+                return httpx.Response(202, json={'id': 'abc', 'kind': 'image', 'status': 'queued'})
+            self.assertEqual(request.url.path, '/api/v1/jobs/abc')
+            return httpx.Response(200, json={'id': 'abc', 'kind': 'image', 'status': 'done',
+                'result': {'image_base64': 'AAAA'}})
+
+        async def submit_and_poll():
+            service = AIService()
+            job = await service.submit_job('image', {'prompt': 'Борщ'})
+            return job, await service.get_job(job['id'])
+
+        job, done = self.run_with(handler, submit_and_poll, CircuitBreaker(failure_threshold=1, reset_timeout=3600))
+        self.assertEqual(job['status'], 'queued')
+        self.assertEqual(done['result'], {'image_base64': 'AAAA'})
@@ -0,0 +1,118 @@
+import asyncio
+from unittest.mock import patch
+
+import httpx
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from foodgram.services import ai_service
+from foodgram.services.ai_service import AIService, CircuitBreaker, sse_event
+from foodgram.streaming import AsyncStreamingHttpResponse, StreamingASGIHandler
+from foodgram.utils import ai_api_view
+from foodgram.views import ask_ai
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+from users.models import User
+
+EVENTS = [sse_event('recipes', []), sse_event('delta', 'Борщ'), sse_event('done', {})]
+
+
+async def fake_stream(self, question):
+    for event in EVENTS:
+        yield event
+
+
+class AskStreamTests(APITestCase):
+    url = '/api/ask/?stream=1'
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='cook', email='cook@example.com', password='testpass123')
+        self.token = Token.objects.create(user=self.user)
+
+    def post(self):
+        return RequestFactory().post(self.url, {'question': 'Что приготовить?'}, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    @override_settings(AI_ASYNC_VIEWS=True)
+    def test_async_view_streams_through_asgi_handler(self):
+        messages = []
+
+        async def send(message):
+            messages.append(message)
+
+        view = ai_api_view(ask_ai.__wrapped__)
+        with patch.object(AIService, 'ask_stream', fake_stream):
+            response = async_to_sync(view)(self.post())
+            self.assertIsInstance(response, AsyncStreamingHttpResponse)
+            async_to_sync(StreamingASGIHandler().send_response)(response, send)
+
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn((b'Content-Type', b'text/event-stream'), messages[0]['headers'])
+        self.assertIn((b'X-Accel-Buffering', b'no'), messages[0]['headers'])
+        self.assertEqual([message['body'] for message in messages[1:-1]], EVENTS)
+        self.assertEqual(messages[-1], {'type': 'http.response.body'})
+
+    @override_settings(AI_ASYNC_VIEWS=False)
+    def test_sync_fallback_streams_from_background_loop(self):
+        view = ai_api_view(ask_ai.__wrapped__)
+        with patch.object(AIService, 'ask_stream', fake_stream):
+            response = view(self.post())
+            self.assertTrue(response.streaming)
+            self.assertEqual(list(response.streaming_content), EVENTS)
+
+
+class EventStream(httpx.AsyncByteStream):
+    async def __aiter__(self):
+        for event in EVENTS:
+            yield event
+
+
+class AskStreamServiceTests(SimpleTestCase):
+    def run_with(self, handler, breaker, consume):
+        async def run():
+            async with httpx.AsyncClient(base_url='http://ai', transport=httpx.MockTransport(handler)) as client:
+                with patch.object(ai_service, 'get_client', return_value=client), \
+                        patch.object(ai_service, 'circuit_breaker', breaker):
+                    return await consume(AIService().ask_stream('Суп?'))
+
+        return asyncio.run(run())
+
+    def collect(self, handler, breaker):
+        async def consume(stream):
+            return b''.join([chunk async for chunk in stream])
+
+        return self.run_with(handler, breaker, consume)
+
+    def test_relays_backend_events(self):
+        def handler(request):
+            self.assertEqual(request.url.path, '/api/v1/recipes/ask/stream')
+            return httpx.Response(200, stream=EventStream(), headers={'Content-Type': 'text/event-stream'})
+
+        self.assertEqual(self.collect(handler, CircuitBreaker(1, 3600)), b''.join(EVENTS))
+
+    def test_backend_failure_becomes_error_event(self):
+        breaker = CircuitBreaker(1, 3600)
+        body = self.collect(lambda request: httpx.Response(502, text='Bad Gateway'), breaker)
+        self.assertTrue(body.startswith(b'event: error\n'))
+        self.assertTrue(breaker.is_open)
+        self.assertEqual(self.collect(lambda request: httpx.Response(200), breaker),
+            sse_event('error', {'detail': AIService.UNAVAILABLE}))
+
+    def test_cancelled_trial_reopens_circuit(self):
+        async def handler(request):
+            await asyncio.sleep(10)
+
+        async def cancelled(stream):
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(stream.__anext__(), 0.01)
+
+        breaker = CircuitBreaker(1, 0)
+        breaker.record_failure()
+        self.run_with(handler, breaker, cancelled)
+        self.assertTrue(breaker.is_open)
+        self.assertTrue(breaker.allow())
+
+
+class AsyncStreamingResponseTests(SimpleTestCase):
+    def test_sync_iteration_runs_on_background_loop(self):
+        response = AsyncStreamingHttpResponse(fake_stream(None, 'Суп?'), content_type='text/event-stream')
+        self.assertEqual(list(response), EVENTS)
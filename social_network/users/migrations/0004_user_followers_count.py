@@ -0,0 +1,35 @@
+# Generated by Django 3.2.20 on 2026-10-18 03:24
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_followers(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    followers = apps.get_model('users', 'Follow').objects.filter(author=OuterRef('pk')).values('author').annotate(
+        total=Count('pk')).values('total')
+    User.objects.update(followers_count=Coalesce(Subquery(followers), 0))
+    User.objects.filter(followers_count__gte=settings.FEED_CELEBRITY_FOLLOWERS).update(feed_celebrity=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_telegram_notify'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_celebrity',
+            field=models.BooleanField(db_index=True, default=False, help_text='Recipes are read into subscription feeds on demand instead of being fanned out', verbose_name='Feed celebrity'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, help_text='Number of subscribers, maintained automatically', verbose_name='Followers count'),
+        ),
+        migrations.RunPython(count_followers, migrations.RunPython.noop),
+    ]
@@ -17,6 +17,10 @@ class User(AbstractUser):
     telegram_id = models.CharField("Telegram ID", max_length=100, blank=True, null=True, help_text='Ваш Telegram ID')
     telegram_notify = models.BooleanField(default=False, verbose_name='Уведомления в Telegram',
         help_text='Получать уведомления в Telegram')
+    followers_count = models.PositiveIntegerField(default=0, db_index=True, verbose_name='Followers count',
+        help_text='Number of subscribers, maintained automatically')
+    feed_celebrity = models.BooleanField(default=False, db_index=True, verbose_name='Feed celebrity',
+        help_text='Recipes are read into subscription feeds on demand instead of being fanned out')
 
 
 class Follow(models.Model):
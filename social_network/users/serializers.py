@@ -33,6 +33,9 @@ class CustomUserManipulateSerializer(UserCreateSerializer):
         model = models.User
 
     def get_is_subscribed(self, obj):
+        subscribed_author_ids = self.context.get('subscribed_author_ids')
+        if subscribed_author_ids is not None:
+            return obj.id in subscribed_author_ids
         request = self.context.get('request')
         if request is None or request.user.is_anonymous:
             return False
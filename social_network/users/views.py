@@ -5,7 +5,7 @@ from django.shortcuts import get_object_or_404, redirect, render
 from djoser.views import UserViewSet as DjoserUserViewSet
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from foodgram.pagination import CartCustomPagination
+from foodgram.pagination import FeedPagination
 from rest_framework import status, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import action, api_view, permission_classes
@@ -28,7 +28,8 @@ class CustomUserViewSet(DjoserUserViewSet):
     queryset = User.objects.all()
     serializer_class = CustomUserManipulateSerializer
     permission_classes = [AllowAny]
-    pagination_class = CartCustomPagination
+    pagination_class = FeedPagination
+    cursor_ordering = ('-id',)
 
     @swagger_auto_schema(operation_description="Получить информацию о текущем пользователе",
         responses={200: CustomUserSerializer, 401: "Unauthorized"})
@@ -8,15 +8,46 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = "foodgram"
     
     GEMINI_API_KEY: str = ""
+    IMAGE_GENERATION_CONCURRENCY: int = 2
+    IMAGE_GENERATION_TIMEOUT: float = 120
+    # Текстовые запросы к Gemini (обычные и потоковые): не больше LLM_CONCURRENCY
+    # одновременно на процесс, LLM_TIMEOUT секунд на ожидание очереди и ответа
+    LLM_CONCURRENCY: int = 8
+    LLM_TIMEOUT: float = 60
     DJANGO_API_URL: str = "http://localhost:8000/api/"
     DJANGO_AUTH_TOKEN: str = ""
     DJANGO_AUTH_URL: str = "http://localhost:8000/api/auth/token/login/"
+    DJANGO_API_TIMEOUT: float = 30
+    DJANGO_API_CONNECT_TIMEOUT: float = 5
+    DJANGO_API_MAX_CONNECTIONS: int = 20
+    DJANGO_API_RETRIES: int = 2
+    DJANGO_API_CONCURRENCY: int = 8
+    INGREDIENT_CATALOG_TTL: float = 300
+    # Кэш ответов Gemini: срок жизни записи в секундах (0 - кэш выключен)
+    # и максимальное число записей, сверх которого вытесняются давно не использованные
+    LLM_CACHE_TTL: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 10000
+    # Фоновые задачи генерации: число воркеров и максимальная длина очереди
+    # (сверх нее POST /api/v1/jobs отвечает 503)
+    JOB_WORKERS: int = 4
+    JOB_QUEUE_SIZE: int = 100
+    JOB_CALLBACK_TIMEOUT: float = 10
+    # Хосты для callback_url через запятую; пусто - только хост DJANGO_API_URL
+    JOB_CALLBACK_HOSTS: str = ""
+    # Сколько секунд хранить завершенные задачи (0 - не удалять) и как часто их чистить
+    JOB_RETENTION: int = 7 * 24 * 3600
+    JOB_SWEEP_INTERVAL: int = 3600
     
     API_KEY: str = "123"
     
     QDRANT_URL: str = "http://localhost:6333"
     QDRANT_API_KEY: str = ""
     EMBEDDING_MODEL_NAME: str = "ai-forever/sbert_large_nlu_ru"
+    QDRANT_COLLECTION: str = "recipes"
+    # qdrant - поиск в Qdrant (локальное хранилище, если есть, используется как запасное);
+    # local - только локальное хранилище NumPy, без внешних сервисов
+    VECTOR_STORE: str = "qdrant"
+    LOCAL_VECTOR_STORE_PATH: str = "data/vectors"
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,145 @@
+import importlib.util
+import logging
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class DjangoAPIError(Exception):
+    """Django API ответил неожиданным статусом"""
+
+    def __init__(self, message: str, response: Optional[httpx.Response] = None):
+        super().__init__(message)
+        self.response = response
+
+
+class DjangoAPIClient:
+    """
+    Типизированный клиент Django API поверх одного httpx.AsyncClient на
+    процесс: соединения переиспользуются (keep-alive, HTTP/2 при наличии
+    пакета h2), у запросов есть таймауты, а ошибки установки соединения
+    повторяются транспортом.
+    """
+
+    def __init__(self):
+        self._http: Optional[httpx.AsyncClient] = None
+
+    async def start(self) -> None:
+        if self._http is not None:
+            return
+        http2 = importlib.util.find_spec("h2") is not None
+        self._http = httpx.AsyncClient(base_url=settings.DJANGO_API_URL, http2=http2,
+            timeout=httpx.Timeout(settings.DJANGO_API_TIMEOUT, connect=settings.DJANGO_API_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=settings.DJANGO_API_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.DJANGO_API_MAX_CONNECTIONS),
+            transport=httpx.AsyncHTTPTransport(http2=http2, retries=settings.DJANGO_API_RETRIES))
+
+    async def close(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def _request(self, method: str, url: str, token: Optional[str] = None, **kwargs: Any) -> httpx.Response:
+        await self.start()
+        headers = kwargs.pop("headers", {})
+        if token:
+            headers["Authorization"] = f"Token {token}"
+        return await self._http.request(method, url, headers=headers, **kwargs)
+
+    async def login(self, email: str, password: str) -> Optional[str]:
+        """Токен пользователя или None при неверных учетных данных"""
+        response = await self._request("POST", settings.DJANGO_AUTH_URL, json={"email": email, "password": password})
+        if response.status_code != 200:
+            return None
+        return response.json()["auth_token"]
+
+    async def get_tags(self, token: str) -> List[Dict[str, Any]]:
+        response = await self._request("GET", "tags/", token)
+        if response.status_code != 200:
+            raise DjangoAPIError("Ошибка при получении тегов", response)
+        return response.json()
+
+    async def get_ingredients(self, token: str) -> List[Dict[str, Any]]:
+        response = await self._request("GET", "ingredients/", token)
+        if response.status_code != 200:
+            raise DjangoAPIError("Ошибка при получении ингредиентов", response)
+        return response.json()
+
+    async def get_ingredients_if_changed(self, token: str,
+            etag: Optional[str] = None) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        """Условный запрос справочника: (None, etag), если он не изменился с прошлой загрузки"""
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await self._request("GET", "ingredients/", token, headers=headers)
+        if response.status_code == 304:
+            return None, etag
+        if response.status_code != 200:
+            raise DjangoAPIError("Ошибка при получении ингредиентов", response)
+        return response.json(), response.headers.get("ETag")
+
+    async def resolve_ingredients(self, token: str, items: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+        """
+        Id ингредиентов по списку {"name", "measurement_unit"} одним запросом;
+        недостающие создаются Django. Ответ в порядке запроса.
+        """
+        response = await self._request("POST", "ingredients/resolve/", token, json=items)
+        if response.status_code != 200:
+            raise DjangoAPIError(f"Ошибка при сопоставлении ингредиентов: {response.text}", response)
+        return response.json()
+
+    async def create_ingredient(self, token: str, name: str, measurement_unit: str) -> Dict[str, Any]:
+        response = await self._request("POST", "ingredients/", token,
+            json={"name": name, "measurement_unit": measurement_unit})
+        if response.status_code not in (200, 201):
+            raise DjangoAPIError(f"Ошибка при создании ингредиента: {response.text}", response)
+        return response.json()
+
+    async def create_recipe(self, token: str, recipe: Dict[str, Any]) -> Dict[str, Any]:
+        response = await self._request("POST", "recipes/", token, json=recipe)
+        if response.status_code != 201:
+            raise DjangoAPIError(f"Ошибка при создании рецепта в Django: {response.text}", response)
+        return response.json()
+
+    async def get_recipes(self, token: str, limit: int = 50) -> List[Dict[str, Any]]:
+        response = await self._request("GET", "recipes/", token, params={"limit": limit})
+        if response.status_code != 200:
+            raise DjangoAPIError(f"Ошибка при получении рецептов: {response.status_code} - {response.text}",
+                response)
+        return response.json().get("results", [])
+
+    async def iter_recipes(self, token: str, page_size: int = 100) -> AsyncIterator[Dict[str, Any]]:
+        """Все рецепты, постранично по курсору"""
+        url: Optional[str] = "recipes/"
+        params: Optional[Dict[str, Any]] = {"pagination": "cursor", "limit": page_size}
+        while url:
+            response = await self._request("GET", url, token, params=params)
+            if response.status_code != 200:
+                raise DjangoAPIError(f"Ошибка при получении рецептов: {response.status_code} - {response.text}",
+                    response)
+            data = response.json()
+            for recipe in data["results"]:
+                yield recipe
+            url, params = data.get("next"), None
+
+    async def get_recipe_comments(self, token: str, recipe_id: int) -> List[Dict[str, Any]]:
+        response = await self._request("GET", f"recipes/{recipe_id}/comments/", token)
+        if response.status_code != 200:
+            raise DjangoAPIError(f"Ошибка при получении комментариев: {response.status_code}", response)
+        return response.json()
+
+    async def get_latest_comments(self, token: str, limit: int = 50,
+            recipe_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """Последние комментарии ко всем рецептам (или к recipe_ids) одним запросом"""
+        params: Dict[str, Any] = {"limit": limit}
+        if recipe_ids:
+            params["recipe__in"] = ",".join(str(recipe_id) for recipe_id in recipe_ids)
+        response = await self._request("GET", "comments/", token, params=params)
+        if response.status_code != 200:
+            raise DjangoAPIError(f"Ошибка при получении комментариев: {response.status_code}", response)
+        return response.json()
+
+
+django_api = DjangoAPIClient()
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from qdrant_client import QdrantClient
+from sentence_transformers import SentenceTransformer
+
+from config import settings
+from vector_store import LocalVectorStore, QdrantVectorStore, VectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """
+    Единственные на процесс экземпляры модели эмбеддингов, клиента Qdrant
+    и хранилища векторов.
+
+    Загружаются один раз при старте приложения (см. lifespan в main.py),
+    после чего переиспользуются всеми запросами. Инференс модели
+    сериализуется блокировкой, поэтому ее можно вызывать из нескольких
+    потоков одновременно.
+    """
+
+    def __init__(self):
+        self.model: Optional[SentenceTransformer] = None
+        self.qdrant: Optional[QdrantClient] = None
+        self.store: Optional[VectorStore] = None
+        self.fallback_store: Optional[VectorStore] = None
+        self.error: Optional[str] = None
+        self._encode_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embeddings")
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def load(self) -> None:
+        """Загрузка модели, прогрев и подключение к Qdrant (блокирующая операция)"""
+        try:
+            logger.info(f"Загрузка модели эмбеддингов {settings.EMBEDDING_MODEL_NAME}")
+            model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME)
+            model.encode(["прогрев модели"])
+            self.model = model
+            if settings.VECTOR_STORE == "local":
+                self.store = LocalVectorStore.load(settings.LOCAL_VECTOR_STORE_PATH)
+            else:
+                self.qdrant = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY or None)
+                self.store = QdrantVectorStore(self.qdrant, settings.QDRANT_COLLECTION)
+                if os.path.isdir(settings.LOCAL_VECTOR_STORE_PATH):
+                    self.fallback_store = LocalVectorStore.load(settings.LOCAL_VECTOR_STORE_PATH)
+            self._ready.set()
+            logger.info("Модель эмбеддингов загружена")
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Ошибка при загрузке модели эмбеддингов: {e}", exc_info=True)
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        if not self.ready:
+            raise RuntimeError("Модель эмбеддингов еще не загружена")
+        with self._encode_lock:
+            return self.model.encode(texts).tolist()
+
+    async def aencode(self, texts: List[str]) -> List[List[float]]:
+        """Батч-кодирование в отдельном потоке, не блокирующее event loop"""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.encode, texts)
+
+    def close(self) -> None:
+        if self.qdrant is not None:
+            self.qdrant.close()
+        self._ready.clear()
+
+
+registry = ModelRegistry()
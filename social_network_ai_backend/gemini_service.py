@@ -1,12 +1,12 @@
+import asyncio
 import base64
 import hashlib
 import json
 import logging
 import os
 from datetime import datetime, timedelta
-from typing import Optional, List, Type
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional, List, Tuple, Type, TypeVar
 
-import requests
 from dotenv import load_dotenv
 from google import genai
 from google.genai import types
@@ -15,19 +15,73 @@ from sqlalchemy import or_, func
 from sqlalchemy.orm import Session
 
 from config import settings
+from django_client import DjangoAPIError, django_api
 from models import RecipeResponse, GeneratedRecipe, RecipeByIngredientsRequest, RecipesResponse, \
     RecipeHistoryResponse, DrinkPairingResponse, ChefAdvice, SEODescription, TelegramPost, TelegramPostsResponse, \
     CleanedQuestion, Keywords, DietAdaptationRequest, IngredientReplacementRequest, \
     PortionAdjustmentRequest
+from response_cache import cache_key, response_cache
 
 load_dotenv()
 
 client = genai.Client(api_key=settings.GEMINI_API_KEY)
+# Ограничивает число одновременных генераций изображений на процесс
+image_semaphore = asyncio.Semaphore(settings.IMAGE_GENERATION_CONCURRENCY)
+# То же для текстовых запросов, включая потоковые
+llm_semaphore = asyncio.Semaphore(settings.LLM_CONCURRENCY)
+
+T = TypeVar("T")
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 
+def _llm_timeout_error() -> TimeoutError:
+    return TimeoutError(f"Превышено время ожидания ответа модели ({settings.LLM_TIMEOUT} с)")
+
+
+async def limited(call: Callable[[], Awaitable[T]]) -> T:
+    """
+    Запрос к модели в пределах LLM_CONCURRENCY одновременных запросов;
+    LLM_TIMEOUT ограничивает и ожидание очереди, и сам ответ.
+    """
+    async def run() -> T:
+        async with llm_semaphore:
+            return await call()
+
+    try:
+        return await asyncio.wait_for(run(), timeout=settings.LLM_TIMEOUT)
+    except asyncio.TimeoutError as e:
+        raise _llm_timeout_error() from e
+
+
+async def limited_stream(start: Callable[[], Awaitable[AsyncIterator[T]]]) -> AsyncIterator[T]:
+    """
+    Потоковый ответ модели с теми же ограничениями, что и limited: место
+    в llm_semaphore занято, пока поток открыт, а ожидание очереди, начала
+    ответа и каждого фрагмента укладывается в общие LLM_TIMEOUT секунд.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.LLM_TIMEOUT
+    try:
+        await asyncio.wait_for(llm_semaphore.acquire(), timeout=settings.LLM_TIMEOUT)
+    except asyncio.TimeoutError as e:
+        raise _llm_timeout_error() from e
+    try:
+        try:
+            stream = await asyncio.wait_for(start(), timeout=deadline - loop.time())
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(stream.__anext__(), timeout=max(deadline - loop.time(), 0))
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        except asyncio.TimeoutError as e:
+            raise _llm_timeout_error() from e
+    finally:
+        llm_semaphore.release()
+
+
 def calculate_fingerprint(recipe_data: dict) -> str:
     """Рассчитывает fingerprint рецепта на основе его данных"""
     # Сортируем данные для консистентности
@@ -42,14 +96,44 @@ def find_similar_recipe(db: Session, prompt: str, cooking_time: int = None, diff
     return db.query(GeneratedRecipe).order_by(GeneratedRecipe.created_at.desc()).limit(50).all()
 
 
+async def generate_structured(function: str, contents: str, schema: Type[BaseModel], key_parts: Any,
+        model: str = 'gemini-2.0-flash', use_cache: bool = True) -> BaseModel:
+    """
+    JSON-ответ Gemini по схеме с кэшированием: ключ строится из имени
+    функции, модели, схемы и key_parts - входных данных, от которых
+    зависит ответ (сам промпт может содержать изменчивый контекст).
+    """
+    key = cache_key(function, model, schema.__name__, key_parts)
+    if use_cache:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            logger.debug(f"Ответ {function} взят из кэша")
+            return schema.model_validate(cached)
+
+    response = await limited(lambda: client.aio.models.generate_content(model=model, contents=contents,
+        config={"response_mime_type": "application/json", "response_schema": schema}))
+    if use_cache:
+        await response_cache.set(key, function, model, response.parsed.model_dump(mode="json"))
+    return response.parsed
+
+
 async def generate_text(prompt: str) -> str:
     try:
-        response = await client.aio.models.generate_content(model='gemini-2.5-flash-preview-05-20', contents=prompt)
+        response = await limited(lambda: client.aio.models.generate_content(model='gemini-2.5-flash-preview-05-20',
+            contents=prompt))
         return response.text
     except Exception as e:
         raise Exception(f"Ошибка при генерации текста: {str(e)}")
 
 
+async def stream_text(prompt: str) -> AsyncIterator[str]:
+    """Текст ответа модели по фрагментам, по мере генерации"""
+    async for chunk in limited_stream(lambda: client.aio.models.generate_content_stream(
+            model='gemini-2.5-flash-preview-05-20', contents=prompt)):
+        if chunk.text:
+            yield chunk.text
+
+
 async def generate_image(prompt: str) -> bytes:
     """
     Генерация изображения с помощью Gemini.
@@ -63,10 +147,15 @@ async def generate_image(prompt: str) -> bytes:
     Raises:
         Exception: При ошибке генерации изображения
     """
+    async def generate():
+        # Ожидание места в очереди входит в IMAGE_GENERATION_TIMEOUT
+        async with image_semaphore:
+            return await client.aio.models.generate_content(model="gemini-2.0-flash-preview-image-generation",
+                contents=[{"parts": [{"text": prompt}]}],
+                config=types.GenerateContentConfig(response_modalities=["TEXT", "IMAGE"]))
+
     try:
-        response = client.models.generate_content(model="gemini-2.0-flash-preview-image-generation",
-            contents=[{"parts": [{"text": prompt}]}],
-            config=types.GenerateContentConfig(response_modalities=["TEXT", "IMAGE"]))
+        response = await asyncio.wait_for(generate(), timeout=settings.IMAGE_GENERATION_TIMEOUT)
 
         if not response.candidates:
             raise Exception("Нет кандидатов в ответе")
@@ -97,21 +186,22 @@ async def generate_image(prompt: str) -> bytes:
 
         raise Exception("Изображение не было сгенерировано")
 
+    except asyncio.TimeoutError:
+        logger.error(f"Превышено время генерации изображения ({settings.IMAGE_GENERATION_TIMEOUT} с)")
+        raise Exception("Превышено время ожидания генерации изображения")
     except Exception as e:
         logger.error(f"Ошибка при генерации изображения: {e}")
         raise Exception(f"Ошибка при генерации изображения: {str(e)}")
 
 
-async def generate_recipe(prompt: str, cooking_time: int = None, difficulty: str = None, db: Session = None,
-        response_schema: Optional[Type[BaseModel]] = None) -> RecipeResponse:
-    try:
-        # Получаем последние 50 рецептов для контекста
-        context_recipes = []
-        if db:
-            context_recipes = find_similar_recipe(db, prompt, cooking_time, difficulty)
-            context_recipes = [RecipeResponse(**recipe.recipe_data) for recipe in context_recipes]
+def build_recipe_prompt(prompt: str, cooking_time: int = None, difficulty: str = None, db: Session = None) -> str:
+    # Получаем последние 50 рецептов для контекста
+    context_recipes = []
+    if db:
+        context_recipes = find_similar_recipe(db, prompt, cooking_time, difficulty)
+        context_recipes = [RecipeResponse(**recipe.recipe_data) for recipe in context_recipes]
 
-        recipe_prompt = f"""
+    return f"""
         Ты - шеф-повар. Сгенерируй рецепт на основе запроса: "{prompt}"
         {f'Время приготовления должно быть {cooking_time} минут' if cooking_time else ''}
         {f'Сложность должна быть {difficulty}' if difficulty else ''}
@@ -136,15 +226,44 @@ async def generate_recipe(prompt: str, cooking_time: int = None, difficulty: str
         {[recipe.model_dump() for recipe in context_recipes]}
         """
 
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=recipe_prompt,
-            config={"response_mime_type": "application/json", "response_schema": response_schema or RecipeResponse})
 
-        print("Gemini response:", response.text)
-        return response.parsed
+async def generate_recipe(prompt: str, cooking_time: int = None, difficulty: str = None, db: Session = None,
+        response_schema: Optional[Type[BaseModel]] = None, use_cache: bool = True) -> RecipeResponse:
+    try:
+        recipe_prompt = build_recipe_prompt(prompt, cooking_time, difficulty, db)
+        return await generate_structured('generate_recipe', recipe_prompt, response_schema or RecipeResponse,
+            key_parts=[prompt, cooking_time, difficulty], use_cache=use_cache)
     except Exception as e:
         raise Exception(f"Ошибка при генерации рецепта: {str(e)}")
 
 
+async def stream_recipe(prompt: str, cooking_time: int = None, difficulty: str = None,
+        db: Session = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Потоковая генерация рецепта: ("delta", фрагмент JSON) по мере ответа
+    модели, затем ("recipe", RecipeResponse). Ответ из кэша отдается сразу
+    одним событием "recipe".
+    """
+    model = 'gemini-2.0-flash'
+    key = cache_key('generate_recipe', model, RecipeResponse.__name__, [prompt, cooking_time, difficulty])
+    cached = await response_cache.get(key)
+    if cached is not None:
+        yield "recipe", RecipeResponse.model_validate(cached)
+        return
+
+    recipe_prompt = build_recipe_prompt(prompt, cooking_time, difficulty, db)
+    chunks = []
+    config = {"response_mime_type": "application/json", "response_schema": RecipeResponse}
+    async for chunk in limited_stream(lambda: client.aio.models.generate_content_stream(model=model,
+            contents=recipe_prompt, config=config)):
+        if chunk.text:
+            chunks.append(chunk.text)
+            yield "delta", chunk.text
+    recipe = RecipeResponse.model_validate_json("".join(chunks))
+    await response_cache.set(key, 'generate_recipe', model, recipe.model_dump(mode="json"))
+    yield "recipe", recipe
+
+
 async def generate_recipes_by_ingredients(request: RecipeByIngredientsRequest, db: Session = None) -> List[
     RecipeResponse]:
     """Генерация рецептов по списку ингредиентов"""
@@ -174,8 +293,8 @@ async def generate_recipes_by_ingredients(request: RecipeByIngredientsRequest, d
         """
 
         # Генерируем рецепты
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": RecipesResponse})
+        response = await limited(lambda: client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
+            config={"response_mime_type": "application/json", "response_schema": RecipesResponse}))
 
         print("Gemini response:", response.text)
         recipes_response = response.parsed
@@ -220,7 +339,7 @@ async def generate_daily_recipe(db: Session, days_not_shown: int = 7) -> RecipeR
         Также сгенерируй детальный промпт для создания фотографии этого блюда.
         Промпт должен описывать внешний вид, подачу, освещение и стиль фотографии.
         """
-        recipe = await generate_recipe(prompt, db=db)
+        recipe = await generate_recipe(prompt, db=db, use_cache=False)
 
         # Обновляем дату последнего показа
         db_recipe = db.query(GeneratedRecipe).filter(
@@ -252,9 +371,8 @@ async def generate_recipe_history(recipe: RecipeResponse,
         3. Культурное значение блюда
         """
 
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": RecipeHistoryResponse})
-        return response.parsed
+        return await generate_structured('generate_recipe_history', prompt, RecipeHistoryResponse,
+            key_parts=[recipe.model_dump(), additional_context])
     except Exception as e:
         raise Exception(f"Ошибка при генерации истории блюда: {str(e)}")
 
@@ -277,9 +395,8 @@ async def generate_drink_pairings(recipe: RecipeResponse,
         3. Общие рекомендации по выбору напитков
         """
 
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": DrinkPairingResponse})
-        return response.parsed
+        return await generate_structured('generate_drink_pairings', prompt, DrinkPairingResponse,
+            key_parts=[recipe.model_dump(), additional_context])
     except Exception as e:
         raise Exception(f"Ошибка при генерации рекомендаций по напиткам: {str(e)}")
 
@@ -303,9 +420,8 @@ async def generate_chef_advice(recipe: RecipeResponse, additional_context: Optio
         4. Рекомендации по подаче
         """
 
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": ChefAdvice})
-        return response.parsed
+        return await generate_structured('generate_chef_advice', prompt, ChefAdvice,
+            key_parts=[recipe.model_dump(), additional_context])
     except Exception as e:
         raise Exception(f"Ошибка при генерации советов шеф-повара: {str(e)}")
 
@@ -329,9 +445,8 @@ async def generate_seo_description(recipe: RecipeResponse, additional_context: O
         4. Полное SEO-описание
         """
 
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": SEODescription})
-        return response.parsed
+        return await generate_structured('generate_seo_description', prompt, SEODescription,
+            key_parts=[recipe.model_dump(), additional_context])
     except Exception as e:
         raise Exception(f"Ошибка при генерации SEO-описания: {str(e)}")
 
@@ -359,8 +474,8 @@ async def adapt_recipe_for_diet(request: DietAdaptationRequest, db: Session = No
         Также сгенерируй детальный промпт для создания фотографии адаптированного блюда.
         """
 
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": RecipeResponse})
+        response = await limited(lambda: client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
+            config={"response_mime_type": "application/json", "response_schema": RecipeResponse}))
         return response.parsed
     except Exception as e:
         raise Exception(f"Ошибка при адаптации рецепта: {str(e)}")
@@ -392,8 +507,8 @@ async def replace_recipe_ingredients(request: IngredientReplacementRequest, db:
         Также сгенерируй детальный промпт для создания фотографии блюда с новыми ингредиентами.
         """
 
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": RecipeResponse})
+        response = await limited(lambda: client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
+            config={"response_mime_type": "application/json", "response_schema": RecipeResponse}))
         return response.parsed
     except Exception as e:
         raise Exception(f"Ошибка при замене ингредиентов: {str(e)}")
@@ -423,8 +538,8 @@ async def adjust_recipe_portions(request: PortionAdjustmentRequest) -> RecipeRes
         Также сгенерируй детальный промпт для создания фотографии блюда.
         """
 
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": RecipeResponse})
+        response = await limited(lambda: client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
+            config={"response_mime_type": "application/json", "response_schema": RecipeResponse}))
         return response.parsed
     except Exception as e:
         raise Exception(f"Ошибка при корректировке порций: {str(e)}")
@@ -433,36 +548,39 @@ async def adjust_recipe_portions(request: PortionAdjustmentRequest) -> RecipeRes
 async def get_recipes_from_django(limit: int = 50, auth_token: str = None) -> List[dict]:
     """Получение рецептов через Django API"""
     try:
-        response = requests.get(f"{settings.DJANGO_API_URL}recipes/", 
-            headers={"Authorization": f"Token {auth_token or settings.DJANGO_AUTH_TOKEN}"},
-            params={"limit": limit})
-        if response.status_code == 200:
-            return response.json().get("results", [])
-        logger.error(f"Ошибка при получении рецептов: {response.status_code} - {response.text}")
-        return []
+        return await django_api.get_recipes(auth_token or settings.DJANGO_AUTH_TOKEN, limit)
     except Exception as e:
         logger.error(f"Ошибка при получении рецептов: {e}")
         return []
 
 
 async def get_comments_from_django(limit: int = 50, auth_token: str = None) -> List[dict]:
-    """Получение комментариев через Django API"""
+    """Получение последних комментариев через Django API"""
     try:
-        # Получаем комментарии через эндпоинт рецептов
-        recipes = await get_recipes_from_django(limit, auth_token)
-        comments = []
-        for recipe in recipes:
-            recipe_id = recipe.get("id")
-            if recipe_id:
-                response = requests.get(f"{settings.DJANGO_API_URL}recipes/{recipe_id}/comments/",
-                    headers={"Authorization": f"Token {auth_token}"})
-                if response.status_code == 200:
-                    comments.extend(response.json())
-        return comments[:limit]
+        return await django_api.get_latest_comments(auth_token, limit)
+    except DjangoAPIError as e:
+        if e.response is None or e.response.status_code != 404:
+            logger.error(f"Ошибка при получении комментариев: {e}")
+            return []
     except Exception as e:
         logger.error(f"Ошибка при получении комментариев: {e}")
         return []
 
+    # Django без общего эндпоинта комментариев: запросы по рецептам идут параллельно
+    semaphore = asyncio.Semaphore(settings.DJANGO_API_CONCURRENCY)
+
+    async def recipe_comments(recipe_id: int) -> List[dict]:
+        async with semaphore:
+            try:
+                return await django_api.get_recipe_comments(auth_token, recipe_id)
+            except Exception as e:
+                logger.error(f"Ошибка при получении комментариев рецепта {recipe_id}: {e}")
+                return []
+
+    recipes = await get_recipes_from_django(limit, auth_token)
+    results = await asyncio.gather(*(recipe_comments(recipe["id"]) for recipe in recipes if recipe.get("id")))
+    return [comment for comments in results for comment in comments][:limit]
+
 
 async def generate_telegram_posts(count: int = 1, include_comments: bool = True, include_recipes: bool = True,
         max_length: int = 2500, auth_token: str = None) -> List[TelegramPost]:
@@ -475,7 +593,7 @@ async def generate_telegram_posts(count: int = 1, include_comments: bool = True,
         if include_recipes:
             recipes = await get_recipes_from_django(auth_token=auth_token)
         if include_comments:
-            comments = await get_comments_from_django(auth_token=auth_token)
+            comments = await get_comments_from_django(limit=5, auth_token=auth_token)
 
         # Формируем промпт
         prompt = f"""
@@ -520,8 +638,8 @@ async def generate_telegram_posts(count: int = 1, include_comments: bool = True,
         Комментарии: {comments[:5]}
         """
 
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": TelegramPostsResponse})
+        response = await limited(lambda: client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
+            config={"response_mime_type": "application/json", "response_schema": TelegramPostsResponse}))
 
         return response.parsed.posts
     except Exception as e:
@@ -543,8 +661,8 @@ async def clean_question(question: str) -> CleanedQuestion:
         """
 
         logger.debug(f"Отправка запроса на очистку вопроса: {question}")
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": CleanedQuestion})
+        response = await limited(lambda: client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
+            config={"response_mime_type": "application/json", "response_schema": CleanedQuestion}))
         logger.debug(f"Получен ответ: {response.text}")
         return response.parsed
     except Exception as e:
@@ -566,8 +684,8 @@ async def extract_keywords(question: str) -> Keywords:
         """
 
         logger.debug(f"Отправка запроса на извлечение ключевых слов: {question}")
-        response = await client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
-            config={"response_mime_type": "application/json", "response_schema": Keywords})
+        response = await limited(lambda: client.aio.models.generate_content(model='gemini-2.0-flash', contents=prompt,
+            config={"response_mime_type": "application/json", "response_schema": Keywords}))
         logger.debug(f"Получен ответ: {response.text}")
         return response.parsed
     except Exception as e:
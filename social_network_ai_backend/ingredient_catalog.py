@@ -0,0 +1,60 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from django_client import django_api
+
+logger = logging.getLogger(__name__)
+
+
+class IngredientCatalog:
+    """
+    Копия справочника ингредиентов Django в памяти процесса: словарь по
+    названию в нижнем регистре. Обновляется не чаще раза в ttl секунд
+    условным запросом с ETag, так что неизменившийся справочник не
+    передается повторно.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        self._etag: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, token: str) -> None:
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.ttl:
+                return
+            ingredients, self._etag = await django_api.get_ingredients_if_changed(token, self._etag)
+            self._checked_at = time.monotonic()
+            if ingredients is not None:
+                self._by_name = {}
+                self._remember(ingredients)
+                logger.info(f"Справочник ингредиентов обновлен: {len(self._by_name)} названий")
+
+    def _remember(self, ingredients: List[Dict[str, Any]]) -> None:
+        for ingredient in ingredients:
+            self._by_name.setdefault(ingredient["name"].strip().lower(), ingredient)
+
+    async def resolve(self, token: str, items: List[Dict[str, str]]) -> List[int]:
+        """
+        Id ингредиентов для списка {"name", "measurement_unit"}: известные
+        берутся из словаря, остальные сопоставляются (и при необходимости
+        создаются) одним запросом к Django.
+        """
+        await self.refresh(token)
+        ids: List[Optional[int]] = []
+        missing = []
+        for item in items:
+            known = self._by_name.get(item["name"].strip().lower())
+            ids.append(known["id"] if known else None)
+            if known is None:
+                missing.append(item)
+        if missing:
+            resolved = await django_api.resolve_ingredients(token, missing)
+            self._remember(resolved)
+            found = iter(resolved)
+            ids = [ingredient_id if ingredient_id is not None else next(found)["id"] for ingredient_id in ids]
+        return ids
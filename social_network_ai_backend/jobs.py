@@ -0,0 +1,255 @@
+import asyncio
+import base64
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Type
+from urllib.parse import urlsplit
+
+import httpx
+from pydantic import BaseModel
+
+from config import settings
+from database import SessionLocal
+from models import GenerationJob, ImageRequest, JobResponse, RecipeRequest
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFullError(Exception):
+    """Очередь задач заполнена, клиенту стоит повторить запрос позже"""
+
+
+async def run_recipe_job(params: Dict[str, Any]) -> dict:
+    from gemini_service import generate_recipe
+
+    request = RecipeRequest(**params)
+    db = SessionLocal()
+    try:
+        recipe = await generate_recipe(prompt=request.prompt, cooking_time=request.cooking_time,
+            difficulty=request.difficulty, db=db)
+    finally:
+        db.close()
+    return recipe.model_dump()
+
+
+async def run_image_job(params: Dict[str, Any]) -> dict:
+    from gemini_service import generate_image
+
+    image_data = await generate_image(ImageRequest(**params).prompt)
+    return {"image_base64": base64.b64encode(image_data).decode()}
+
+
+HANDLERS: Dict[str, Callable[[Dict[str, Any]], Awaitable[dict]]] = {"recipe": run_recipe_job, "image": run_image_job}
+PARAMS: Dict[str, Type[BaseModel]] = {"recipe": RecipeRequest, "image": ImageRequest}
+
+
+def callback_hosts() -> Set[str]:
+    """Хосты, на которые можно отправлять результаты: JOB_CALLBACK_HOSTS или хост DJANGO_API_URL"""
+    hosts = {host.strip().lower() for host in settings.JOB_CALLBACK_HOSTS.split(",") if host.strip()}
+    return hosts or {urlsplit(settings.DJANGO_API_URL).hostname}
+
+
+def check_callback_url(url: str) -> None:
+    """
+    Не дает превратить callback в запрос от имени сервиса на произвольный
+    адрес (SSRF): разрешены только http(s) на хосты из callback_hosts().
+
+    Raises:
+        ValueError: если URL ведет на другой хост
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or (parts.hostname or "").lower() not in callback_hosts():
+        raise ValueError(f"callback_url должен вести на один из хостов: {', '.join(sorted(callback_hosts()))}")
+
+
+def _job_response(job: GenerationJob) -> JobResponse:
+    return JobResponse(id=job.id, kind=job.kind, status=job.status, result=job.result, error=job.error,
+        created_at=job.created_at, finished_at=job.finished_at)
+
+
+class JobQueue:
+    """
+    Долгие генерации в фоне: задача сохраняется в Postgres, ее id кладется
+    в ограниченную очередь в памяти и разбирается JOB_WORKERS воркерами.
+    Когда очередь заполнена, новые задачи не принимаются. Задачи,
+    не завершенные до перезапуска, ставятся в очередь заново при старте
+    по мере ее освобождения. Завершенные задачи вместе с результатами
+    (в том числе изображениями) удаляются через JOB_RETENTION секунд.
+
+    Воркер забирает задачу атомарным переходом queued -> running, так что
+    задача не выполняется дважды, даже если ее поставили в очередь
+    несколько процессов. Но при старте задачи в статусе running считаются
+    прерванными перезапуском и возвращаются в queued: это верно, только
+    пока задачи разбирает один процесс (uvicorn без --workers).
+    """
+
+    def __init__(self, workers: int, max_size: int):
+        self.workers = workers
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._tasks: List[asyncio.Task] = []
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def _create(self, kind: str, params: Dict[str, Any], callback_url: Optional[str]) -> JobResponse:
+        with SessionLocal() as db:
+            job = GenerationJob(id=uuid.uuid4().hex, kind=kind, status=QUEUED, params=params,
+                callback_url=callback_url)
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            return _job_response(job)
+
+    def _delete(self, job_id: str) -> None:
+        with SessionLocal() as db:
+            db.query(GenerationJob).filter(GenerationJob.id == job_id).delete()
+            db.commit()
+
+    def _get(self, job_id: str) -> Optional[JobResponse]:
+        with SessionLocal() as db:
+            job = db.get(GenerationJob, job_id)
+            return _job_response(job) if job else None
+
+    def _update(self, job_id: str, **fields: Any) -> Optional[GenerationJob]:
+        with SessionLocal() as db:
+            job = db.get(GenerationJob, job_id)
+            for name, value in fields.items():
+                setattr(job, name, value)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+            return job
+
+    def _claim(self, job_id: str) -> Optional[GenerationJob]:
+        """Переводит задачу из queued в running; None, если ее уже забрали"""
+        with SessionLocal() as db:
+            claimed = db.query(GenerationJob).filter(GenerationJob.id == job_id,
+                GenerationJob.status == QUEUED).update({GenerationJob.status: RUNNING}, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                return None
+            job = db.get(GenerationJob, job_id)
+            db.expunge(job)
+            return job
+
+    def _unfinished(self) -> List[str]:
+        with SessionLocal() as db:
+            # Рассчитано на один процесс: его running-задачи прервал перезапуск
+            db.query(GenerationJob).filter(GenerationJob.status == RUNNING).update(
+                {GenerationJob.status: QUEUED}, synchronize_session=False)
+            db.commit()
+            jobs = db.query(GenerationJob.id).filter(GenerationJob.status == QUEUED).order_by(
+                GenerationJob.created_at).all()
+            return [job_id for job_id, in jobs]
+
+    def _delete_finished(self, before: datetime) -> int:
+        with SessionLocal() as db:
+            deleted = db.query(GenerationJob).filter(GenerationJob.status.in_([DONE, FAILED]),
+                GenerationJob.finished_at < before).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+
+    async def start(self) -> None:
+        self._http = httpx.AsyncClient(timeout=settings.JOB_CALLBACK_TIMEOUT)
+        backlog = await asyncio.to_thread(self._unfinished)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._requeue(backlog)))
+        if settings.JOB_RETENTION > 0:
+            self._tasks.append(asyncio.create_task(self._sweep_periodically()))
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def submit(self, kind: str, params: Dict[str, Any], callback_url: Optional[str] = None) -> JobResponse:
+        if kind not in HANDLERS:
+            raise ValueError(f"Неизвестный тип задачи: {kind}. Допустимые: {', '.join(HANDLERS)}")
+        params = PARAMS[kind](**params).model_dump()
+        if callback_url:
+            check_callback_url(callback_url)
+        if self._queue.full():
+            raise QueueFullError(f"Очередь задач заполнена ({self._queue.maxsize})")
+        job = await asyncio.to_thread(self._create, kind, params, callback_url)
+        try:
+            self._queue.put_nowait(job.id)
+        except asyncio.QueueFull:
+            await asyncio.to_thread(self._delete, job.id)
+            raise QueueFullError(f"Очередь задач заполнена ({self._queue.maxsize})")
+        return job
+
+    async def get(self, job_id: str) -> Optional[JobResponse]:
+        return await asyncio.to_thread(self._get, job_id)
+
+    async def _requeue(self, job_ids: List[str]) -> None:
+        """Возвращает в очередь задачи прошлого запуска, ожидая свободного места"""
+        if job_ids:
+            logger.info(f"Возобновление незавершенных задач: {len(job_ids)}")
+        for job_id in job_ids:
+            await self._queue.put(job_id)
+
+    async def sweep(self) -> int:
+        """Удаляет задачи, завершенные раньше чем JOB_RETENTION секунд назад"""
+        before = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_RETENTION)
+        return await asyncio.to_thread(self._delete_finished, before)
+
+    async def _sweep_periodically(self) -> None:
+        while True:
+            try:
+                deleted = await self.sweep()
+                if deleted:
+                    logger.info(f"Удалено завершенных задач: {deleted}")
+            except Exception as e:
+                logger.error(f"Ошибка при удалении завершенных задач: {e}", exc_info=True)
+            await asyncio.sleep(settings.JOB_SWEEP_INTERVAL)
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Ошибка при обработке задачи {job_id}: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self._claim, job_id)
+        if job is None:
+            logger.info(f"Задача {job_id} уже выполняется или завершена, пропуск")
+            return
+        try:
+            result = await HANDLERS[job.kind](job.params)
+            job = await asyncio.to_thread(self._update, job_id, status=DONE, result=result,
+                finished_at=datetime.now(timezone.utc))
+        except Exception as e:
+            logger.warning(f"Задача {job_id} ({job.kind}) завершилась ошибкой: {e}")
+            job = await asyncio.to_thread(self._update, job_id, status=FAILED, error=str(e),
+                finished_at=datetime.now(timezone.utc))
+        if job.callback_url:
+            await self._notify(job)
+
+    async def _notify(self, job: GenerationJob) -> None:
+        try:
+            # Задачи, поставленные до ограничения хостов, тоже проверяются
+            check_callback_url(job.callback_url)
+        except ValueError as e:
+            logger.warning(f"Результат задачи {job.id} не отправлен: {e}")
+            return
+        try:
+            response = await self._http.post(job.callback_url, json=_job_response(job).model_dump(mode="json"))
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logger.warning(f"Не удалось отправить результат задачи {job.id} на {job.callback_url}: {e}")
+
+
+job_queue = JobQueue(settings.JOB_WORKERS, settings.JOB_QUEUE_SIZE)
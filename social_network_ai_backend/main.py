@@ -1,35 +1,58 @@
+import asyncio
 import base64
+import json
 import logging
-import os
-from typing import List
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Tuple
 
-import requests
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Request, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
-from pydantic import BaseModel, Field
-from qdrant_client import QdrantClient
-from sentence_transformers import SentenceTransformer
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from sqlalchemy.orm import Session
 
 from config import settings
-from database import engine, Base, get_db
+from database import engine, Base, SessionLocal, get_db
+from django_client import django_api
+from embeddings import registry
+from ingredient_catalog import IngredientCatalog
+from jobs import QueueFullError, job_queue
+from recipe_search import search_recipes
 from gemini_service import (generate_text, generate_image, generate_recipe, generate_recipes_by_ingredients,
                             generate_daily_recipe, generate_recipe_history, generate_drink_pairings,
                             generate_chef_advice, generate_seo_description, generate_telegram_posts, clean_question,
-                            extract_keywords, adapt_recipe_for_diet, replace_recipe_ingredients, adjust_recipe_portions)
+                            extract_keywords, adapt_recipe_for_diet, replace_recipe_ingredients, adjust_recipe_portions,
+                            stream_recipe, stream_text)
 from models import (RecipeRequest, RecipeResponse, RecipeByIngredientsRequest, DietAdaptationRequest,
                     IngredientReplacementRequest, PortionAdjustmentRequest, RecipeHistoryRequest,
                     RecipeHistoryResponse, DrinkPairingResponse, ChefAdvice, SEODescription, DjangoAuthRequest,
-                    DjangoAuthResponse, TelegramPostRequest, TelegramPostsResponse)
+                    DjangoAuthResponse, TelegramPostRequest, TelegramPostsResponse, JobRequest, JobResponse,
+                    EmbeddingRequest, EmbeddingResponse)
 
 load_dotenv()
 
 # Создаем таблицы при запуске
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="AI Backend", description="""
+ingredient_catalog = IngredientCatalog(ttl=settings.INGREDIENT_CATALOG_TTL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Модель грузится в фоне: сервис сразу отвечает на /health, а /ready
+    # возвращает 503, пока модель не загружена и не прогрета
+    loading = asyncio.create_task(asyncio.to_thread(registry.load))
+    await django_api.start()
+    await job_queue.start()
+    yield
+    await job_queue.close()
+    await django_api.close()
+    await loading
+    registry.close()
+
+
+app = FastAPI(lifespan=lifespan, title="AI Backend", description="""
     API для генерации текста, изображений и рецептов с использованием Google Gemini.
     
     ## Аутентификация
@@ -57,7 +80,7 @@ def verify_api_key(x_api_key: str = Header(...)):
 
 @app.middleware("http")
 async def api_key_middleware(request: Request, call_next):
-    if request.url.path not in ["/health", "/docs", "/redoc", "/openapi.json", "/api/v1/auth/token",
+    if request.url.path not in ["/health", "/ready", "/docs", "/redoc", "/openapi.json", "/api/v1/auth/token",
                                 "/api/v1/recipes/generate-random"]:
         api_key = request.headers.get("X-API-Key")
         if not api_key or api_key != settings.API_KEY:
@@ -77,6 +100,19 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready", tags=["Системные"])
+async def readiness_check():
+    """
+    Проверка готовности сервиса: модель эмбеддингов загружена и прогрета.
+    
+    Returns:
+        dict: Статус готовности (503, пока модель загружается)
+    """
+    if not registry.ready:
+        return JSONResponse(status_code=503, content={"status": "loading", "error": registry.error})
+    return {"status": "ready"}
+
+
 @app.get("/", tags=["Системные"])
 async def root():
     """
@@ -158,6 +194,60 @@ async def generate_image_endpoint(request: TextRequest, api_key: str = Depends(v
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/v1/embeddings", response_model=EmbeddingResponse, tags=["Поиск"])
+async def embeddings(request: EmbeddingRequest, api_key: str = Depends(verify_api_key)):
+    """
+    Эмбеддинги текстов той же моделью, которой кодируются вопросы /recipes/ask.
+    Ими Django индексирует рецепты, не загружая модель у себя.
+
+    Raises:
+        HTTPException: 503, пока модель загружается
+    """
+    if not registry.ready:
+        raise HTTPException(status_code=503, detail="Модель эмбеддингов еще загружается")
+    return EmbeddingResponse(vectors=await registry.aencode(request.texts))
+
+
+@app.post("/api/v1/jobs", response_model=JobResponse, status_code=202, tags=["Задачи"])
+async def submit_job(request: JobRequest, api_key: str = Depends(verify_api_key)):
+    """
+    Постановка долгой генерации в очередь. Ответ приходит сразу, результат
+    можно получить через GET /api/v1/jobs/{id} или на callback_url.
+
+    Args:
+        request (JobRequest): Запрос с параметрами:
+            - kind (str): recipe (параметры как у generate-by-text) или image (prompt)
+            - params (dict): Параметры генерации
+            - callback_url (str, optional): URL для POST с результатом
+
+    Returns:
+        JobResponse: Задача в статусе queued
+
+    Raises:
+        HTTPException: 422 при неверных параметрах, 503 с Retry-After при заполненной очереди
+    """
+    try:
+        return await job_queue.submit(request.kind, request.params, request.callback_url)
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.get("/api/v1/jobs/{job_id}", response_model=JobResponse, tags=["Задачи"])
+async def get_job(job_id: str, api_key: str = Depends(verify_api_key)):
+    """
+    Статус задачи и ее результат, когда status == done.
+
+    Raises:
+        HTTPException: 404, если задачи нет
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    return job
+
+
 @app.post("/api/v1/recipes/generate-by-text", response_model=RecipeResponse, tags=["Рецепты"])
 async def generate_recipe_endpoint(request: RecipeRequest, api_key: str = Depends(verify_api_key),
         db: Session = Depends(get_db)):
@@ -183,6 +273,45 @@ async def generate_recipe_endpoint(request: RecipeRequest, api_key: str = Depend
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def sse(event: str, data) -> str:
+    """Одно событие server-sent events с данными в JSON"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def event_stream(events: AsyncIterator[str]) -> StreamingResponse:
+    # X-Accel-Buffering отключает буферизацию ответа в nginx
+    return StreamingResponse(events, media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/api/v1/recipes/generate-by-text/stream", tags=["Рецепты"])
+async def generate_recipe_stream_endpoint(request: RecipeRequest, api_key: str = Depends(verify_api_key)):
+    """
+    Потоковая генерация рецепта по текстовому описанию (text/event-stream).
+
+    Параметры те же, что у generate-by-text. События:
+        - delta: фрагмент JSON рецепта по мере генерации
+        - recipe: готовый RecipeResponse
+        - error: {"detail": ...}, после него поток завершается
+        - done: конец потока
+    """
+
+    async def events() -> AsyncIterator[str]:
+        db = SessionLocal()
+        try:
+            async for kind, data in stream_recipe(prompt=request.prompt, cooking_time=request.cooking_time,
+                    difficulty=request.difficulty, db=db):
+                yield sse(kind, data.model_dump() if kind == "recipe" else data)
+            yield sse("done", {})
+        except Exception as e:
+            logger.error(f"Ошибка потоковой генерации рецепта: {e}", exc_info=True)
+            yield sse("error", {"detail": str(e)})
+        finally:
+            db.close()
+
+    return event_stream(events())
+
+
 @app.post("/api/v1/recipes/generate-by-ingredients", response_model=List[RecipeResponse], tags=["Рецепты"])
 async def generate_recipes_by_ingredients_endpoint(request: RecipeByIngredientsRequest,
         api_key: str = Depends(verify_api_key), db: Session = Depends(get_db)):
@@ -463,10 +592,10 @@ async def get_auth_token(request: DjangoAuthRequest):
         HTTPException: При ошибке авторизации
     """
     try:
-        response = requests.post(settings.DJANGO_AUTH_URL, json={"email": request.email, "password": request.password})
+        auth_token = await django_api.login(request.email, request.password)
 
-        if response.status_code == 200:
-            return DjangoAuthResponse(auth_token=response.json()["auth_token"])
+        if auth_token:
+            return DjangoAuthResponse(auth_token=auth_token)
         else:
             raise HTTPException(status_code=401, detail="Неверные учетные данные")
 
@@ -477,26 +606,14 @@ async def get_auth_token(request: DjangoAuthRequest):
 @app.post("/api/v1/recipes/generate-random", response_model=RecipeResponse, tags=["Рецепты"])
 async def generate_random_recipe(request: DjangoAuthRequest, db: Session = Depends(get_db)):
     try:
-        auth_response = requests.post(settings.DJANGO_AUTH_URL, json={"email": request.email, "password": request.password})
-
-        if auth_response.status_code != 200:
+        auth_token = await django_api.login(request.email, request.password)
+        if not auth_token:
             raise HTTPException(status_code=401, detail="Неверные учетные данные")
 
-        auth_token = auth_response.json()["auth_token"]
-
-        tags_response = requests.get(f"{settings.DJANGO_API_URL}tags/", headers={"Authorization": f"Token {auth_token}"})
-        if tags_response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Ошибка при получении тегов")
-        tags = tags_response.json()
+        tags = await django_api.get_tags(auth_token)
         if not tags:
             raise HTTPException(status_code=500, detail="Нет доступных тегов")
 
-        ingredients_response = requests.get(f"{settings.DJANGO_API_URL}ingredients/",
-            headers={"Authorization": f"Token {auth_token}"})
-        if ingredients_response.status_code != 200:
-            raise HTTPException(status_code=500, detail="Ошибка при получении ингредиентов")
-        existing_ingredients = ingredients_response.json()
-
         name_prompt = "Придумай оригинальное название блюда в формате: 'Название блюда'"
         name = await generate_text(name_prompt)
 
@@ -504,32 +621,15 @@ async def generate_random_recipe(request: DjangoAuthRequest, db: Session = Depen
 
         image_data = await generate_image(recipe.image_generation_prompt)
 
-        recipe_ingredients = []
-        for ing in recipe.ingredients:
-            existing_ing = next((i for i in existing_ingredients if i["name"].lower() == ing.name.lower()), None)
-
-            if existing_ing:
-                recipe_ingredients.append({"id": existing_ing["id"], "amount": float(ing.amount)})
-            else:
-                new_ing_response = requests.post(f"{settings.DJANGO_API_URL}ingredients/",
-                    json={"name": ing.name, "measurement_unit": ing.unit},
-                    headers={"Authorization": f"Token {auth_token}"})
-
-                if new_ing_response.status_code != 201:
-                    raise HTTPException(status_code=500,
-                                        detail=f"Ошибка при создании ингредиента: {new_ing_response.text}")
-
-                new_ing = new_ing_response.json()
-                recipe_ingredients.append({"id": new_ing["id"], "amount": float(ing.amount)})
+        ingredient_ids = await ingredient_catalog.resolve(auth_token,
+            [{"name": ing.name, "measurement_unit": ing.unit} for ing in recipe.ingredients])
+        recipe_ingredients = [{"id": ingredient_id, "amount": float(ing.amount)}
+            for ingredient_id, ing in zip(ingredient_ids, recipe.ingredients)]
 
-        django_response = requests.post(f"{settings.DJANGO_API_URL}recipes/",
-            json={"name": recipe.name, "text": recipe.description, "cooking_time": recipe.cooking_time,
+        await django_api.create_recipe(auth_token,
+            {"name": recipe.name, "text": recipe.description, "cooking_time": recipe.cooking_time,
                 "ingredients": recipe_ingredients, "tags": [tags[0]["id"]],
-                "image": f"data:image/png;base64,{base64.b64encode(image_data).decode()}", "steps": recipe.steps},
-            headers={"Authorization": f"Token {auth_token}"})
-
-        if django_response.status_code != 201:
-            raise HTTPException(status_code=500, detail=f"Ошибка при создании рецепта в Django: {django_response.text}")
+                "image": f"data:image/png;base64,{base64.b64encode(image_data).decode()}", "steps": recipe.steps})
 
         return recipe
     except Exception as e:
@@ -601,13 +701,10 @@ async def generate_telegram_posts_endpoint(request: TelegramPostRequest, api_key
         ```
     """
     try:
-        auth_response = requests.post(settings.DJANGO_AUTH_URL, json={"email": request.email, "password": request.password})
-
-        if auth_response.status_code != 200:
+        auth_token = await django_api.login(request.email, request.password)
+        if not auth_token:
             raise HTTPException(status_code=401, detail="Неверные учетные данные")
 
-        auth_token = auth_response.json()["auth_token"]
-
         posts = await generate_telegram_posts(count=request.count, include_comments=request.include_comments,
             include_recipes=request.include_recipes, max_length=request.max_length, auth_token=auth_token)
         return TelegramPostsResponse(posts=posts)
@@ -615,12 +712,6 @@ async def generate_telegram_posts_endpoint(request: TelegramPostRequest, api_key
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# Конфигурация Qdrant
-QDRANT_CONFIG = {'url': os.getenv('QDRANT_URL', 'http://localhost:6333'), 'api_key': os.getenv('QDRANT_API_KEY', None)}
-
-EMBEDDING_MODEL_NAME = os.getenv('EMBEDDING_MODEL_NAME', 'ai-forever/sbert_large_nlu_ru')
-
-
 class QuestionRequest(BaseModel):
     question: str = Field(..., description="Вопрос пользователя")
 
@@ -630,105 +721,109 @@ class QuestionResponse(BaseModel):
     relevant_recipes: List[dict] = Field(..., description="Релевантные рецепты")
 
 
-@app.post("/api/v1/recipes/ask", response_model=QuestionResponse, tags=["Рецепты"])
-async def ask_question(request: QuestionRequest, api_key: str = Depends(verify_api_key)):
-    try:
-        logger.debug(f"Получен вопрос: {request.question}")
+async def build_answer_prompt(question: str) -> Tuple[str, List[dict]]:
+    """Промпт для ответа на вопрос и до трех релевантных рецептов; промпт пустой, если рецептов нет"""
+    logger.debug(f"Получен вопрос: {question}")
 
-        cleaned = await clean_question(request.question)
-        logger.debug(f"Очищенный вопрос: {cleaned.model_dump()}")
+    cleaned = await clean_question(question)
+    logger.debug(f"Очищенный вопрос: {cleaned.model_dump()}")
 
-        keywords_data = await extract_keywords(cleaned.cleaned_question)
-        logger.debug(f"Извлеченные ключевые слова: {keywords_data.model_dump()}")
+    keywords_data = await extract_keywords(cleaned.cleaned_question)
+    logger.debug(f"Извлеченные ключевые слова: {keywords_data.model_dump()}")
 
-        qdrant_client = QdrantClient(url=settings.QDRANT_URL, api_key=settings.QDRANT_API_KEY)
-        model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME)
+    if not registry.ready:
+        raise HTTPException(status_code=503, detail="Модель эмбеддингов еще загружается")
 
-        all_recipes = []
-        search_terms = keywords_data.keywords + keywords_data.categories
-        logger.debug(f"Поисковые термины: {search_terms}")
+    search_terms = keywords_data.keywords + keywords_data.categories
+    logger.debug(f"Поисковые термины: {search_terms}")
+    try:
+        unique_recipes = await search_recipes(search_terms)
+    except Exception as e:
+        logger.error(f"Ошибка при поиске рецептов: {e}")
+        unique_recipes = []
 
-        for term in search_terms:
-            try:
-                term_vector = model.encode(term).tolist()
+    logger.debug(f"Найдено уникальных рецептов: {len(unique_recipes)}")
 
-                search_result = qdrant_client.search(collection_name="recipes", query_vector=term_vector, limit=10,
-                    query_filter={"should": [{"key": "ingredients", "match": {"text": term}},
-                        {"key": "name", "match": {"text": term}}, {"key": "text", "match": {"text": term}},
-                        {"key": "tags", "match": {"text": term}}]}, score_threshold=0.1)
+    if not unique_recipes:
+        return "", []
 
-                for hit in search_result:
-                    recipe = hit.payload
-                    score = hit.score
+    recipes_context = "\n\n".join([f"Рецепт {i + 1}:\n"
+                                   f"Название: {recipe['name']}\n"
+                                   f"Описание: {recipe['text']}\n"
+                                   f"Ингредиенты:\n" + "\n".join(
+        [f"- {ing}: {amount} {unit}" for ing, amount, unit in
+            zip(recipe['ingredients'], recipe.get('amounts', [0] * len(recipe['ingredients'])),
+                recipe.get('units', [''] * len(recipe['ingredients'])))]) + f"\nТеги: {', '.join(recipe['tags'])}"
+        for i, recipe in enumerate(unique_recipes[:3])])
 
-                    if term.lower() in [i.lower() for i in recipe.get('ingredients', [])]:
-                        score *= 1.5
-                    if term.lower() in recipe.get('name', '').lower():
-                        score *= 1.3
-                    if term.lower() in recipe.get('text', '').lower():
-                        score *= 1.2
+    prompt = f"""
+    Вопрос пользователя: {cleaned.cleaned_question}
+    Намерение: {cleaned.intent}
+    
+    Информация из рецептов:
+    {recipes_context}
+    
+    ВАЖНО: 
+    2. НЕ генерируй новые рецепты
+    4. Если нужно адаптировать порции - используй пропорции из существующего рецепта
+    5. При расчете пищевой ценности используй стандартные значения:
+       - Белки: 4 ккал/г
+       - Жиры: 9 ккал/г
+       - Углеводы: 4 ккал/г
+    6. При адаптации рецепта сохраняй пропорции ингредиентов
+    
+    Ответь на вопрос пользователя, используя информацию из рецептов.
+    """
 
-                    recipe['relevance_score'] = score
-                    all_recipes.append(recipe)
+    logger.debug(f"Отправка промпта в LLM: {prompt}")
+    return prompt, unique_recipes[:3]
 
-            except Exception as e:
-                logger.error(f"Ошибка при поиске по термину {term}: {e}")
-                continue
 
-        all_recipes.sort(key=lambda x: x.get('relevance_score', 0), reverse=True)
+NO_RECIPES_ANSWER = "К сожалению, я не нашел подходящих рецептов для ответа на ваш вопрос."
 
-        unique_recipes = []
-        seen_ids = set()
-        for recipe in all_recipes:
-            if recipe['id'] not in seen_ids:
-                seen_ids.add(recipe['id'])
-                unique_recipes.append(recipe)
-            else:
-                existing_recipe = next(r for r in unique_recipes if r['id'] == recipe['id'])
-                if recipe.get('relevance_score', 0) > existing_recipe.get('relevance_score', 0):
-                    existing_recipe['relevance_score'] = recipe['relevance_score']
-
-        logger.debug(f"Найдено уникальных рецептов: {len(unique_recipes)}")
-
-        if not unique_recipes:
-            return QuestionResponse(answer="К сожалению, я не нашел подходящих рецептов для ответа на ваш вопрос.",
-                relevant_recipes=[])
-
-        recipes_context = "\n\n".join([f"Рецепт {i + 1}:\n"
-                                       f"Название: {recipe['name']}\n"
-                                       f"Описание: {recipe['text']}\n"
-                                       f"Ингредиенты:\n" + "\n".join(
-            [f"- {ing}: {amount} {unit}" for ing, amount, unit in
-                zip(recipe['ingredients'], recipe.get('amounts', [0] * len(recipe['ingredients'])),
-                    recipe.get('units', [''] * len(recipe['ingredients'])))]) + f"\nТеги: {', '.join(recipe['tags'])}"
-            for i, recipe in enumerate(unique_recipes[:3])])
-
-        prompt = f"""
-        Вопрос пользователя: {cleaned.cleaned_question}
-        Намерение: {cleaned.intent}
-        Тип поиска: {keywords_data.search_type}
-        
-        Информация из рецептов:
-        {recipes_context}
-        
-        ВАЖНО: 
-        2. НЕ генерируй новые рецепты
-        4. Если нужно адаптировать порции - используй пропорции из существующего рецепта
-        5. При расчете пищевой ценности используй стандартные значения:
-           - Белки: 4 ккал/г
-           - Жиры: 9 ккал/г
-           - Углеводы: 4 ккал/г
-        6. При адаптации рецепта сохраняй пропорции ингредиентов
-        
-        Ответь на вопрос пользователя, используя информацию из рецептов.
-        """
 
-        logger.debug(f"Отправка промпта в LLM: {prompt}")
+@app.post("/api/v1/recipes/ask", response_model=QuestionResponse, tags=["Рецепты"])
+async def ask_question(request: QuestionRequest, api_key: str = Depends(verify_api_key)):
+    try:
+        prompt, recipes = await build_answer_prompt(request.question)
+        if not recipes:
+            return QuestionResponse(answer=NO_RECIPES_ANSWER, relevant_recipes=[])
 
         response = await generate_text(prompt)
         logger.debug(f"Получен ответ от LLM: {response}")
 
-        return QuestionResponse(answer=response, relevant_recipes=unique_recipes[:3])
+        return QuestionResponse(answer=response, relevant_recipes=recipes)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Ошибка в эндпоинте ask_question: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Произошла ошибка при обработке вопроса: {str(e)}")
+
+
+@app.post("/api/v1/recipes/ask/stream", tags=["Рецепты"])
+async def ask_question_stream(request: QuestionRequest, api_key: str = Depends(verify_api_key)):
+    """
+    Потоковый ответ на вопрос (text/event-stream). События:
+        - recipes: релевантные рецепты, приходит первым
+        - delta: фрагмент текста ответа
+        - error: {"detail": ...}, после него поток завершается
+        - done: конец потока
+    """
+
+    async def events() -> AsyncIterator[str]:
+        try:
+            prompt, recipes = await build_answer_prompt(request.question)
+            yield sse("recipes", recipes)
+            if not recipes:
+                yield sse("delta", NO_RECIPES_ANSWER)
+            else:
+                async for text in stream_text(prompt):
+                    yield sse("delta", text)
+            yield sse("done", {})
+        except HTTPException as e:
+            yield sse("error", {"detail": e.detail})
+        except Exception as e:
+            logger.error(f"Ошибка в эндпоинте ask_question_stream: {e}", exc_info=True)
+            yield sse("error", {"detail": f"Произошла ошибка при обработке вопроса: {str(e)}"})
+
+    return event_stream(events())
@@ -48,6 +48,30 @@ class GeneratedRecipe(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     last_shown_at = Column(DateTime(timezone=True), nullable=True)
 
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(String(32), primary_key=True)
+    kind = Column(String, index=True)
+    status = Column(String, index=True)
+    params = Column(JSONB)
+    result = Column(JSONB, nullable=True)
+    error = Column(String, nullable=True)
+    callback_url = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+class LLMResponseCache(Base):
+    __tablename__ = "llm_response_cache"
+
+    key = Column(String(64), primary_key=True)
+    function = Column(String, index=True)
+    model = Column(String)
+    response = Column(JSONB)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    hits = Column(Integer, default=0)
+
 class DietAdaptationRequest(BaseModel):
     recipe: RecipeResponse = Field(..., description="Исходный рецепт для адаптации")
     dietary_restrictions: List[str] = Field(..., description="Список диетических ограничений")
@@ -131,6 +155,29 @@ class TelegramPost(BaseModel):
 class TelegramPostsResponse(BaseModel):
     posts: List[TelegramPost]
 
+class ImageRequest(BaseModel):
+    prompt: str = Field(..., description="Описание изображения")
+
+class EmbeddingRequest(BaseModel):
+    texts: List[str] = Field(..., min_length=1, max_length=256, description="Тексты для кодирования")
+
+class EmbeddingResponse(BaseModel):
+    vectors: List[List[float]]
+
+class JobRequest(BaseModel):
+    kind: str = Field(..., description="Тип задачи: recipe или image")
+    params: dict = Field(..., description="Параметры: как у /api/v1/recipes/generate-by-text или /generate-image")
+    callback_url: Optional[str] = Field(None, description="URL, на который POST-ом придет результат (хост из JOB_CALLBACK_HOSTS)")
+
+class JobResponse(BaseModel):
+    id: str
+    kind: str
+    status: str = Field(..., description="queued, running, done или failed")
+    result: Optional[dict] = Field(None, description="Рецепт или {'image_base64': ...}")
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 class QuestionRequest(BaseModel):
     question: str = Field(..., description="Вопрос пользователя")
 
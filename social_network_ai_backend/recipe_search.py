@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Dict, List
+
+from embeddings import registry
+
+logger = logging.getLogger(__name__)
+
+RRF_K = 60
+
+
+def boosted_score(term: str, recipe: dict, score: float) -> float:
+    """Повышает оценку, если термин буквально встречается в ингредиентах, названии или описании"""
+    term = term.lower()
+    if term in [i.lower() for i in recipe.get('ingredients', [])]:
+        score *= 1.5
+    if term in recipe.get('name', '').lower():
+        score *= 1.3
+    if term in recipe.get('text', '').lower():
+        score *= 1.2
+    return score
+
+
+def reciprocal_rank_fusion(rankings: List[List[dict]], k: int = RRF_K) -> List[dict]:
+    """
+    Объединяет несколько ранжированных списков рецептов: каждый рецепт
+    получает сумму 1 / (k + позиция) по всем спискам, где он встретился.
+    """
+    fused: Dict[int, dict] = {}
+    for ranking in rankings:
+        for rank, recipe in enumerate(ranking, start=1):
+            entry = fused.setdefault(recipe['id'], {**recipe, 'relevance_score': 0.0})
+            entry['relevance_score'] += 1 / (k + rank)
+    return sorted(fused.values(), key=lambda recipe: recipe['relevance_score'], reverse=True)
+
+
+async def search_recipes(terms: List[str], limit: int = 10) -> List[dict]:
+    """
+    Семантический поиск рецептов по нескольким терминам: один батч-вызов
+    модели и один батч-запрос в хранилище векторов, результаты сливаются
+    через RRF.
+    """
+    if not terms:
+        return []
+    vectors = await registry.aencode(terms)
+    try:
+        results = await asyncio.to_thread(registry.store.search_batch, vectors, terms, limit, 0.1)
+    except Exception as e:
+        if registry.fallback_store is None:
+            raise
+        logger.warning(f"Основное хранилище векторов недоступно, используется локальное: {e}")
+        results = await asyncio.to_thread(registry.fallback_store.search_batch, vectors, terms, limit, 0.1)
+
+    rankings = []
+    for term, hits in zip(terms, results):
+        ranking = [{**payload, '_score': boosted_score(term, payload, score)} for payload, score in hits]
+        ranking.sort(key=lambda recipe: recipe['_score'], reverse=True)
+        rankings.append([{key: value for key, value in recipe.items() if key != '_score'} for recipe in ranking])
+    logger.debug(f"Найдено результатов по терминам: {[len(ranking) for ranking in rankings]}")
+    return reciprocal_rank_fusion(rankings)
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+from sqlalchemy import delete, select
+
+from config import settings
+from database import SessionLocal
+from models import LLMResponseCache
+
+logger = logging.getLogger(__name__)
+
+
+def _canonical(value: Any) -> Any:
+    """Убирает из строк различия в пробелах и регистре, не влияющие на ответ модели"""
+    if isinstance(value, str):
+        return re.sub(r"\s+", " ", value).strip().lower()
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def cache_key(function: str, model: str, schema: str, key_parts: Any) -> str:
+    data = json.dumps([function, model, schema, _canonical(key_parts)], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class ResponseCache:
+    """
+    Кэш структурированных ответов Gemini в Postgres. Запись живет
+    LLM_CACHE_TTL секунд; при переполнении вытесняются записи, которые
+    дольше всего не запрашивались (LRU по last_used_at). Запросы к БД
+    синхронные и выполняются в отдельном потоке.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _get(self, key: str) -> Optional[Any]:
+        with SessionLocal() as db:
+            entry = db.get(LLMResponseCache, key)
+            if entry is None:
+                return None
+            now = datetime.now(timezone.utc)
+            if entry.created_at < now - timedelta(seconds=self.ttl):
+                db.delete(entry)
+                db.commit()
+                return None
+            entry.last_used_at = now
+            entry.hits = (entry.hits or 0) + 1
+            db.commit()
+            return entry.response
+
+    def _set(self, key: str, function: str, model: str, response: Any) -> None:
+        with SessionLocal() as db:
+            db.merge(LLMResponseCache(key=key, function=function, model=model, response=response,
+                created_at=datetime.now(timezone.utc), last_used_at=datetime.now(timezone.utc), hits=0))
+            db.execute(delete(LLMResponseCache).where(
+                LLMResponseCache.created_at < datetime.now(timezone.utc) - timedelta(seconds=self.ttl)))
+            stale = select(LLMResponseCache.key).order_by(LLMResponseCache.last_used_at.desc()).offset(
+                self.max_entries)
+            db.execute(delete(LLMResponseCache).where(LLMResponseCache.key.in_(stale)))
+            db.commit()
+
+    async def get(self, key: str) -> Optional[Any]:
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._get, key)
+        except Exception as e:
+            logger.warning(f"Кэш ответов недоступен: {e}")
+            return None
+
+    async def set(self, key: str, function: str, model: str, response: Any) -> None:
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._set, key, function, model, response)
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить ответ в кэш: {e}")
+
+
+response_cache = ResponseCache(settings.LLM_CACHE_TTL, settings.LLM_CACHE_MAX_ENTRIES)
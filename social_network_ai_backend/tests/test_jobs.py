@@ -0,0 +1,107 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import jobs
+from config import settings
+from jobs import DONE, FAILED, QUEUED, RUNNING, JobQueue, check_callback_url
+from models import GenerationJob
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb(type_, compiler, **kw):
+    return "JSON"
+
+
+async def echo_job(params):
+    return {"prompt": params["prompt"]}
+
+
+class JobQueueTests(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        GenerationJob.__table__.create(engine)
+        self.Session = sessionmaker(bind=engine)
+        for patcher in (patch.object(jobs, "SessionLocal", self.Session),
+                patch.object(jobs, "HANDLERS", {"recipe": echo_job}),
+                patch.object(settings, "DJANGO_API_URL", "http://web:8000/api/"),
+                patch.object(settings, "JOB_CALLBACK_HOSTS", "")):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def add_job(self, job_id, status=QUEUED, finished_at=None):
+        with self.Session() as db:
+            db.add(GenerationJob(id=job_id, kind="recipe", status=status, params={"prompt": job_id},
+                finished_at=finished_at))
+            db.commit()
+
+    def statuses(self):
+        with self.Session() as db:
+            return {job.id: job.status for job in db.query(GenerationJob)}
+
+    def test_callback_url_is_limited_to_django_host(self):
+        check_callback_url("http://web:8000/api/jobs/done/")
+        for url in ("http://169.254.169.254/latest/meta-data/", "file:///etc/passwd", "http://web.evil.com/"):
+            with self.assertRaises(ValueError):
+                check_callback_url(url)
+        with patch.object(settings, "JOB_CALLBACK_HOSTS", "foodgram.example.com, web"):
+            check_callback_url("https://foodgram.example.com/hook")
+
+    async def test_submit_rejects_foreign_callback(self):
+        with self.assertRaises(ValueError):
+            await JobQueue(1, 10).submit("recipe", {"prompt": "Борщ"}, "http://10.0.0.1/hook")
+        self.assertEqual(self.statuses(), {})
+
+    async def test_restart_requeues_more_jobs_than_queue_holds(self):
+        for i in range(5):
+            self.add_job(f"job{i}", status=RUNNING if i == 0 else QUEUED)
+        queue = JobQueue(1, 2)
+        await queue.start()
+        try:
+            for _ in range(100):
+                if set(self.statuses().values()) == {DONE}:
+                    break
+                await asyncio.sleep(0.01)
+        finally:
+            await queue.close()
+        self.assertEqual(self.statuses(), {f"job{i}": DONE for i in range(5)})
+
+    async def test_job_queued_by_two_processes_runs_once(self):
+        runs = []
+
+        async def counting_job(params):
+            runs.append(params["prompt"])
+            return {}
+
+        for i in range(3):
+            self.add_job(f"job{i}")
+        queues = [JobQueue(2, 10), JobQueue(2, 10)]
+        with patch.object(jobs, "HANDLERS", {"recipe": counting_job}):
+            for queue in queues:
+                await queue.start()
+            try:
+                for _ in range(100):
+                    if set(self.statuses().values()) == {DONE} and all(queue.depth == 0 for queue in queues):
+                        break
+                    await asyncio.sleep(0.01)
+            finally:
+                for queue in queues:
+                    await queue.close()
+        self.assertEqual(sorted(runs), ["job0", "job1", "job2"])
+
+    async def test_sweep_deletes_only_old_finished_jobs(self):
+        now = datetime.now(timezone.utc)
+        old = now - timedelta(seconds=settings.JOB_RETENTION + 60)
+        self.add_job("old_done", DONE, old)
+        self.add_job("old_failed", FAILED, old)
+        self.add_job("recent", DONE, now)
+        self.add_job("queued")
+        self.assertEqual(await JobQueue(1, 10).sweep(), 2)
+        self.assertEqual(set(self.statuses()), {"recent", "queued"})
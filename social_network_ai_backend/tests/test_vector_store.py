@@ -0,0 +1,62 @@
+import tempfile
+import unittest
+
+import numpy as np
+
+from vector_store import LocalVectorStore, VectorStore, recipe_document, recipe_payload
+
+PAYLOADS = [
+    {"id": 10, "name": "Борщ", "text": "Суп со свеклой", "ingredients": ["свекла", "капуста"], "tags": ["Обед"]},
+    {"id": 20, "name": "Щи", "text": "Суп с капустой", "ingredients": ["капуста квашеная"], "tags": ["Обед"]},
+    {"id": 30, "name": "Оладьи", "text": "На кефире", "ingredients": ["мука", "кефир"], "tags": ["Завтрак"]},
+]
+VECTORS = [[1, 0, 0], [0.8, 0.6, 0], [0, 0, 1]]
+
+
+class LocalVectorStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        LocalVectorStore.save(self.path, [payload["id"] for payload in PAYLOADS], VECTORS, PAYLOADS)
+        self.store = LocalVectorStore.load(self.path)
+
+    def ids(self, hits):
+        return [payload["id"] for payload, _ in hits]
+
+    def test_is_memory_mapped(self):
+        self.assertIsInstance(self.store.vectors, np.memmap)
+        self.assertIsInstance(self.store.postings, np.memmap)
+
+    def test_only_rows_with_every_term_word_are_ranked(self):
+        cabbage, soup, quashed, missing = self.store.search_batch([[1, 0, 0]] * 4,
+            ["Капуста", "суп", "капуста квашеная", "рыба"], limit=10, score_threshold=0.1)
+        self.assertEqual(self.ids(cabbage), [10, 20])
+        self.assertAlmostEqual(cabbage[1][1], 0.8, places=5)
+        self.assertEqual(self.ids(soup), [10, 20])
+        self.assertEqual(self.ids(quashed), [20])
+        self.assertEqual(missing, [])
+
+    def test_limit_and_threshold(self):
+        [hits] = self.store.search_batch([[0, 1, 0]], ["обед"], limit=1, score_threshold=0.1)
+        self.assertEqual(self.ids(hits), [20])
+        [hits] = self.store.search_batch([[0, 0, 1]], ["обед"], limit=10, score_threshold=0.1)
+        self.assertEqual(hits, [])
+
+    def test_empty_store(self):
+        path = tempfile.mkdtemp()
+        LocalVectorStore.save(path, [], np.zeros((0, 3)), [])
+        self.assertEqual(LocalVectorStore.load(path).search_batch([[1, 0, 0]], ["суп"], 5, 0.1), [[]])
+
+    def test_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            VectorStore()
+
+
+class RecipePayloadTests(unittest.TestCase):
+    def test_payload_from_django_api_recipe(self):
+        recipe = {"id": 1, "name": "Борщ", "text": "Сварить", "author": {"id": 2},
+            "ingredients": [{"id": 5, "name": "свекла", "measurement_unit": "г", "amount": 300}],
+            "tags": [{"id": 1, "name": "Обед", "slug": "lunch"}]}
+        payload = recipe_payload(recipe)
+        self.assertEqual(payload, {"id": 1, "name": "Борщ", "text": "Сварить", "ingredients": ["свекла"],
+            "amounts": [300], "units": ["г"], "tags": ["Обед"]})
+        self.assertEqual(recipe_document(payload), "Борщ. Сварить\nИнгредиенты: свекла\nТеги: Обед")
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+logger = logging.getLogger(__name__)
+
+TEXT_FIELDS = ("ingredients", "name", "text", "tags")
+TOKEN_RE = re.compile(r"\w+")
+
+Hit = Tuple[dict, float]
+
+
+class VectorStore(ABC):
+    """
+    Общий интерфейс хранилищ векторов рецептов. Для каждого запроса
+    возвращает до limit пар (payload, score), отсортированных по убыванию
+    score; учитываются только рецепты, в текстовых полях которых
+    встречаются все слова термина запроса.
+    """
+
+    @abstractmethod
+    def search_batch(self, vectors: List[List[float]], terms: List[str], limit: int,
+            score_threshold: float) -> List[List[Hit]]:
+        """Батч поиска: по списку хитов на каждую пару (вектор, термин)"""
+
+
+class QdrantVectorStore(VectorStore):
+    def __init__(self, client: QdrantClient, collection: str):
+        self.client = client
+        self.collection = collection
+
+    def search_batch(self, vectors: List[List[float]], terms: List[str], limit: int,
+            score_threshold: float) -> List[List[Hit]]:
+        requests = [models.SearchRequest(vector=vector, limit=limit, score_threshold=score_threshold, with_payload=True,
+            filter=models.Filter(
+                should=[models.FieldCondition(key=field, match=models.MatchText(text=term)) for field in TEXT_FIELDS]))
+            for term, vector in zip(terms, vectors)]
+        results = self.client.search_batch(collection_name=self.collection, requests=requests)
+        return [[(hit.payload, hit.score) for hit in hits] for hits in results]
+
+
+def tokenize(text: str) -> List[str]:
+    """Слова в нижнем регистре, как у текстового индекса Qdrant с токенизатором word"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def _searchable_text(payload: dict) -> str:
+    parts = []
+    for field in TEXT_FIELDS:
+        value = payload.get(field) or ""
+        parts.append(" ".join(value) if isinstance(value, list) else str(value))
+    return "\n".join(parts)
+
+
+class LocalVectorStore(VectorStore):
+    """
+    Хранилище без внешних сервисов. С диска через mmap отображаются
+    матрица нормализованных float32 эмбеддингов и posting-листы
+    инвертированного индекса слов (номера строк по возрастанию); в памяти
+    остаются только словарь индекса и payload. Запрос сравнивается только
+    со строками, где есть все слова термина, top-k - через argpartition.
+    """
+
+    VECTORS_FILE = "vectors.npy"
+    IDS_FILE = "ids.npy"
+    PAYLOADS_FILE = "payloads.json"
+    POSTINGS_FILE = "postings.npy"
+    TOKENS_FILE = "tokens.json"
+
+    def __init__(self, vectors: np.ndarray, ids: np.ndarray, payloads: List[dict], postings: np.ndarray,
+            tokens: Dict[str, List[int]]):
+        self.vectors = vectors
+        self.ids = ids
+        self.payloads = payloads
+        self.postings = postings
+        self.tokens = tokens
+
+    @classmethod
+    def load(cls, path: str) -> "LocalVectorStore":
+        vectors = np.load(os.path.join(path, cls.VECTORS_FILE), mmap_mode="r")
+        ids = np.load(os.path.join(path, cls.IDS_FILE))
+        postings = np.load(os.path.join(path, cls.POSTINGS_FILE), mmap_mode="r")
+        with open(os.path.join(path, cls.PAYLOADS_FILE), encoding="utf-8") as f:
+            payloads = json.load(f)
+        with open(os.path.join(path, cls.TOKENS_FILE), encoding="utf-8") as f:
+            tokens = json.load(f)
+        logger.info(f"Загружено локальное хранилище векторов: {len(ids)} рецептов, {len(tokens)} слов")
+        return cls(vectors, ids, payloads, postings, tokens)
+
+    @classmethod
+    def save(cls, path: str, ids: Sequence[int], vectors: Any, payloads: List[dict]) -> None:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+
+        rows_by_token: Dict[str, List[int]] = {}
+        for row, payload in enumerate(payloads):
+            for token in set(tokenize(_searchable_text(payload))):
+                rows_by_token.setdefault(token, []).append(row)
+        tokens, postings = {}, []
+        for token, rows in rows_by_token.items():
+            tokens[token] = [len(postings), len(postings) + len(rows)]
+            postings.extend(rows)
+
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, cls.VECTORS_FILE), matrix)
+        np.save(os.path.join(path, cls.IDS_FILE), np.asarray(ids, dtype=np.int64))
+        np.save(os.path.join(path, cls.POSTINGS_FILE), np.asarray(postings, dtype=np.int32))
+        with open(os.path.join(path, cls.PAYLOADS_FILE), "w", encoding="utf-8") as f:
+            json.dump(payloads, f, ensure_ascii=False)
+        with open(os.path.join(path, cls.TOKENS_FILE), "w", encoding="utf-8") as f:
+            json.dump(tokens, f, ensure_ascii=False)
+
+    def _rows(self, term: str) -> np.ndarray:
+        """Номера строк, в тексте которых есть все слова термина"""
+        rows = None
+        for token in set(tokenize(term)):
+            span = self.tokens.get(token)
+            if span is None:
+                return np.empty(0, dtype=np.int32)
+            postings = self.postings[span[0]:span[1]]
+            rows = postings if rows is None else np.intersect1d(rows, postings, assume_unique=True)
+        return np.empty(0, dtype=np.int32) if rows is None else np.asarray(rows)
+
+    def search_batch(self, vectors: List[List[float]], terms: List[str], limit: int,
+            score_threshold: float) -> List[List[Hit]]:
+        queries = np.asarray(vectors, dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        results = []
+        for term, query in zip(terms, queries):
+            rows = self._rows(term)
+            scores = self.vectors[rows] @ query if len(rows) else np.empty(0, dtype=np.float32)
+            passed = scores >= score_threshold
+            rows, scores = rows[passed], scores[passed]
+            k = min(limit, len(rows))
+            if k == 0:
+                results.append([])
+                continue
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            results.append([(self.payloads[rows[i]], float(scores[i])) for i in top])
+        return results
+
+
+def export_qdrant_collection(client: QdrantClient, collection: str, path: str, batch_size: int = 256) -> int:
+    """Сохраняет коллекцию Qdrant в формате LocalVectorStore, возвращает число рецептов"""
+    ids, vectors, payloads = [], [], []
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=collection, limit=batch_size, offset=offset,
+            with_payload=True, with_vectors=True)
+        for point in points:
+            ids.append(point.id)
+            vectors.append(point.vector)
+            payloads.append(point.payload)
+        if offset is None:
+            break
+    LocalVectorStore.save(path, ids, vectors, payloads)
+    return len(ids)
+
+
+def recipe_payload(recipe: dict) -> dict:
+    """Payload рецепта из ответа Django API в том же виде, в каком его индексирует Django в Qdrant"""
+    ingredients = recipe.get("ingredients", [])
+    return {"id": recipe["id"], "name": recipe["name"], "text": recipe.get("text") or "",
+        "ingredients": [ingredient["name"] for ingredient in ingredients],
+        "amounts": [ingredient["amount"] for ingredient in ingredients],
+        "units": [ingredient["measurement_unit"] for ingredient in ingredients],
+        "tags": [tag["name"] for tag in recipe.get("tags", [])]}
+
+
+def recipe_document(payload: dict) -> str:
+    return (f"{payload['name']}. {payload['text']}\n"
+            f"Ингредиенты: {', '.join(payload['ingredients'])}\nТеги: {', '.join(payload['tags'])}")
+
+
+async def build_local_store(path: str, batch_size: int = 64) -> int:
+    """
+    Строит LocalVectorStore напрямую из рецептов Django API, без Qdrant.
+    Возвращает число рецептов.
+    """
+    from sentence_transformers import SentenceTransformer
+
+    from config import settings
+    from django_client import django_api
+
+    try:
+        payloads = [recipe_payload(recipe) async for recipe in django_api.iter_recipes(settings.DJANGO_AUTH_TOKEN)]
+    finally:
+        await django_api.close()
+    model = SentenceTransformer(settings.EMBEDDING_MODEL_NAME)
+    if payloads:
+        vectors = model.encode([recipe_document(payload) for payload in payloads], batch_size=batch_size)
+    else:
+        vectors = np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    LocalVectorStore.save(path, [payload["id"] for payload in payloads], vectors, payloads)
+    return len(payloads)
+
+
+if __name__ == "__main__":
+    from config import settings
+
+    parser = argparse.ArgumentParser(description="Локальное хранилище векторов рецептов")
+    parser.add_argument("source", choices=["django", "qdrant"],
+        help="django - рецепты из Django API и модель эмбеддингов, qdrant - экспорт коллекции Qdrant")
+    parser.add_argument("--path", default=settings.LOCAL_VECTOR_STORE_PATH)
+    args = parser.parse_args()
+    if args.source == "django":
+        count = asyncio.run(build_local_store(args.path))
+    else:
+        count = export_qdrant_collection(QdrantClient(url=settings.QDRANT_URL,
+            api_key=settings.QDRANT_API_KEY or None), settings.QDRANT_COLLECTION, args.path)
+    print(f"Сохранено рецептов: {count} -> {args.path}")